@@ -0,0 +1,63 @@
+"""compress ai_exam_cache results
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a0b1c2d3e4f5"
+down_revision: Union[str, Sequence[str], None] = "f9a0b1c2d3e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_cache = sa.table(
+    "ai_exam_cache",
+    sa.column("cache_id", sa.Uuid()),
+    sa.column("result_json", sa.Text()),
+    sa.column("result_blob", sa.LargeBinary()),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    ai_exam_cache_columns = {column["name"] for column in inspector.get_columns("ai_exam_cache")}
+    if "result_blob" not in ai_exam_cache_columns:
+        op.add_column("ai_exam_cache", sa.Column("result_blob", sa.LargeBinary(), nullable=True))
+
+    rows = bind.execute(
+        sa.select(_cache.c.cache_id, _cache.c.result_json).where(_cache.c.result_json.is_not(None))
+    ).all()
+    for cache_id, result_json in rows:
+        bind.execute(
+            _cache.update()
+            .where(_cache.c.cache_id == cache_id)
+            .values(result_blob=zlib.compress(result_json.encode("utf-8"), 6), result_json=None)
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    ai_exam_cache_columns = {column["name"] for column in inspector.get_columns("ai_exam_cache")}
+    if "result_blob" not in ai_exam_cache_columns:
+        return
+
+    rows = bind.execute(
+        sa.select(_cache.c.cache_id, _cache.c.result_blob).where(_cache.c.result_blob.is_not(None))
+    ).all()
+    for cache_id, result_blob in rows:
+        bind.execute(
+            _cache.update()
+            .where(_cache.c.cache_id == cache_id)
+            .values(result_json=zlib.decompress(result_blob).decode("utf-8"))
+        )
+    op.drop_column("ai_exam_cache", "result_blob")
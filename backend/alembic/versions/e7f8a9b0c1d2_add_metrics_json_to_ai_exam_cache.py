@@ -0,0 +1,32 @@
+"""add metrics_json to ai_exam_cache
+
+Revision ID: e7f8a9b0c1d2
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7f8a9b0c1d2"
+down_revision: Union[str, Sequence[str], None] = "d1e2f3a4b5c6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    ai_exam_cache_columns = {column["name"] for column in inspector.get_columns("ai_exam_cache")}
+    if "metrics_json" not in ai_exam_cache_columns:
+        op.add_column("ai_exam_cache", sa.Column("metrics_json", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    ai_exam_cache_columns = {column["name"] for column in inspector.get_columns("ai_exam_cache")}
+    if "metrics_json" in ai_exam_cache_columns:
+        op.drop_column("ai_exam_cache", "metrics_json")
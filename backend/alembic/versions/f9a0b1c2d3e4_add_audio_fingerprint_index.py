@@ -0,0 +1,54 @@
+"""add audio fingerprint index
+
+Revision ID: f9a0b1c2d3e4
+Revises: e7f8a9b0c1d2
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f9a0b1c2d3e4"
+down_revision: Union[str, Sequence[str], None] = "e7f8a9b0c1d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    audio_columns = {column["name"] for column in inspector.get_columns("audios")}
+    if "fingerprint_version" not in audio_columns:
+        op.add_column("audios", sa.Column("fingerprint_version", sa.String(length=32), nullable=True))
+    if "fingerprint_hash_count" not in audio_columns:
+        op.add_column("audios", sa.Column("fingerprint_hash_count", sa.Integer(), nullable=True))
+
+    if not inspector.has_table("audio_fingerprint_hashes"):
+        op.create_table(
+            "audio_fingerprint_hashes",
+            sa.Column("audio_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("hash", sa.Integer(), nullable=False),
+            sa.Column("frame", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["audio_id"], ["audios.audio_id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("audio_id", "hash", "frame"),
+        )
+        op.create_index(
+            op.f("ix_audio_fingerprint_hashes_hash"), "audio_fingerprint_hashes", ["hash"], unique=False
+        )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("audio_fingerprint_hashes"):
+        op.drop_index(op.f("ix_audio_fingerprint_hashes_hash"), table_name="audio_fingerprint_hashes")
+        op.drop_table("audio_fingerprint_hashes")
+
+    audio_columns = {column["name"] for column in inspector.get_columns("audios")}
+    if "fingerprint_hash_count" in audio_columns:
+        op.drop_column("audios", "fingerprint_hash_count")
+    if "fingerprint_version" in audio_columns:
+        op.drop_column("audios", "fingerprint_version")
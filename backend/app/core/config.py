@@ -53,6 +53,8 @@ class Settings(BaseSettings):
     CLOUDINARY_CLOUD_NAME: Optional[str] = None
     CLOUDINARY_API_KEY: Optional[str] = None
     CLOUDINARY_API_SECRET: Optional[str] = None
+    CLOUDINARY_UPLOAD_WORKERS: int = 4
+    CLOUDINARY_CHUNKED_UPLOAD_MB: int = 20
 
     # Google AI Settings
     GOOGLE_API_KEY: Optional[str] = None
@@ -88,6 +90,37 @@ class Settings(BaseSettings):
     AI_PHOTO_N_ITER: int = 1
     AI_PHOTO_USE_NEGATIVE_PROMPT: bool = False
 
+    # AI exam generation pipeline
+    AI_EXAM_ASR_BATCH_SIZE: int = 8
+    AI_EXAM_ASR_WORKERS: int = 0
+    AI_EXAM_ASR_THREADS_PER_WORKER: int = 1
+    AI_EXAM_ASR_PACK_TARGET_SEC: float = 10.0
+    AI_EXAM_ASR_SERVER_URL: str = ""  # e.g. http://127.0.0.1:8100 (`manage.py serve_asr`); empty = load the model here
+    AI_EXAM_ASR_SERVER_TIMEOUT_SEC: float = 600.0
+    AI_EXAM_ASR_SERVER_MAX_BATCH: int = 64
+    AI_EXAM_ASR_SERVER_BATCH_WAIT_MS: int = 20
+    AI_EXAM_ASR_SERVER_REQUEST_SEC: float = 300.0
+    AI_EXAM_ASR_SERVER_MAX_BODY_MB: int = 128
+    AI_EXAM_GENDER_MODE: str = "pitch"  # pitch | accurate (wav2vec2) | off
+    AI_EXAM_SPEAKER_CLUSTERING: bool = True
+    AI_EXAM_BELL_STREAMING: bool = False
+    AI_EXAM_BELL_MIN_SCORE: float = 0.8
+    AI_EXAM_ARTIFACT_DIR: str = "generated/ai-exam-artifacts"
+    AI_EXAM_ARTIFACT_MAX_AGE_SEC: int = 2592000
+    AI_EXAM_SEGMENT_ASR_CACHE: bool = True
+    AI_EXAM_JOB_STORE: str = "memory"  # memory | redis (shared by all API workers, uses REDIS_URL)
+    AI_EXAM_JOB_TTL_SEC: int = 86400
+    AI_EXAM_BLOB_DIR: str = "generated/ai-exam-blobs"
+    AI_EXAM_BLOB_MAX_AGE_SEC: int = 86400
+    AI_EXAM_UPLOAD_SPOOL_DIR: str = "generated/ai-exam-uploads"
+    AI_EXAM_UPLOAD_MAX_MB: int = 300
+    AI_EXAM_FINGERPRINT_DEDUP: bool = False
+    AI_EXAM_FINGERPRINT_MIN_CONFIDENCE: float = 0.25
+    AI_EXAM_CLIP_STORAGE: str = "cloudinary"  # cloudinary (on-the-fly transformations) | local (rendered once)
+    AI_EXAM_CLIP_DIR: str = "generated/ai-exam-clips"
+    AI_EXAM_CLIP_BITRATE: str = "64k"
+    AI_EXAM_CLIP_PREWARM: bool = False
+
 @lru_cache()
 def get_settings() -> Settings:
     return Settings()
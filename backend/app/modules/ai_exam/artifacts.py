@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_artifact_key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageArtifactStore:
+    """Content-addressed JSON artifacts of the expensive pipeline stages.
+
+    Each stage (bell split, ASR) has its own directory and its own key, so
+    changes to the text rules or to `PIPELINE_VERSION` can replay the cheap
+    stages on top of the stored audio results instead of re-running them.
+    Reads refresh an artifact's mtime, so `collect_garbage` evicts by last use.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage / key[:2] / f"{key}.json"
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        path = self._path(stage, key)
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                value = json.load(handle)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable %s artifact %s: %s", stage, key, exc)
+            return None
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        path = self._path(stage, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so concurrent readers never see a partial artifact.
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(value, handle, ensure_ascii=False)
+            os.replace(tmp_name, path)
+        except OSError as exc:
+            logger.warning("Failed to store %s artifact %s: %s", stage, key, exc)
+
+    def collect_garbage(self, max_age_sec: float) -> dict:
+        """Delete artifacts (and stray temp files) not read or written for `max_age_sec`."""
+        cutoff = time.time() - max_age_sec
+        removed = {"artifacts": 0, "bytes": 0}
+        for path in list(self.root.glob("*/*/*")):
+            try:
+                stat = path.stat()
+                if stat.st_mtime >= cutoff:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed["artifacts"] += 1
+            removed["bytes"] += stat.st_size
+        for directory in list(self.root.glob("*/*")):
+            if directory.is_dir() and not any(directory.iterdir()):
+                directory.rmdir()
+        logger.info("Collected %s stage artifact(s) (%s bytes).", removed["artifacts"], removed["bytes"])
+        return removed
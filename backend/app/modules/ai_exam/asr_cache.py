@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import threading
+from typing import Callable, Optional, Sequence
+
+from app.modules.ai_exam.artifacts import StageArtifactStore, make_artifact_key
+from app.modules.ai_exam.pcm import PCMBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentASRCache:
+    """Persistent ASR records of single segments, keyed by a hash of their PCM.
+
+    The same sample question in another upload, or the same upload submitted
+    at another JLPT level, skips inference entirely. Records hold the chunk
+    bounds relative to the segment, so a hit is re-based onto its new offset
+    when the transcript is formatted.
+    """
+
+    STAGE = "asr-segments"
+
+    def __init__(self, store: StageArtifactStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def segment_hash(audio: PCMBuffer) -> str:
+        digest = hashlib.sha256(str(audio.sample_rate).encode("ascii"))
+        digest.update(audio.to_int16().tobytes())
+        return digest.hexdigest()
+
+    def _key(self, audio: PCMBuffer, params: dict) -> str:
+        return make_artifact_key(self.segment_hash(audio), params)
+
+    def get(self, audio: PCMBuffer, params: dict) -> Optional[list[dict]]:
+        stored = self._store.get(self.STAGE, self._key(audio, params))
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if stored is None else stored["chunks"]
+
+    def put(self, audio: PCMBuffer, params: dict, records: list[dict]) -> None:
+        self._store.put(
+            self.STAGE,
+            self._key(audio, params),
+            {"raw_text": "".join(record["text"] for record in records), "chunks": records},
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def recognize(
+        self,
+        segments: Sequence[PCMBuffer],
+        params: dict,
+        recognize: Callable[[list[PCMBuffer]], list[list[dict]]],
+    ) -> list[list[dict]]:
+        """Return records for every segment, running `recognize` only on the misses."""
+        results = [self.get(audio, params) for audio in segments]
+        missing = [index for index, records in enumerate(results) if records is None]
+        if missing:
+            for index, records in zip(missing, recognize([segments[index] for index in missing])):
+                results[index] = records
+                self.put(segments[index], params, records)
+        stats = self.stats()
+        logger.info(
+            "Segment ASR cache: %s/%s hits in this call, %.0f%% overall.",
+            len(segments) - len(missing),
+            len(segments),
+            stats["hit_rate"] * 100,
+        )
+        return results
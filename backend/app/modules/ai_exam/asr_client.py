@@ -0,0 +1,98 @@
+import logging
+import threading
+from typing import Optional, Sequence, Union
+
+import httpx
+
+from app.modules.ai_exam.asr_cache import SegmentASRCache
+from app.modules.ai_exam.asr_server import encode_segments
+from app.modules.ai_exam.pcm import PCMBuffer
+from app.modules.ai_exam.service import ReazonTranscriber
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteTranscriber:
+    """Client of the ASR server (`manage.py serve_asr`) with the same interface as ReazonTranscriber.
+
+    No model is loaded in this process; segments are sent to the server in
+    requests of at most `max_request_sec` of audio each (a longer segment goes
+    alone). The segment cache stays local, keyed by the cache parameters the
+    server reports.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout_sec: float = 600.0,
+        segment_cache: Optional[SegmentASRCache] = None,
+        client: Optional[httpx.Client] = None,
+        max_request_sec: float = 300.0,
+    ):
+        self.url = url.rstrip("/")
+        self.max_request_sec = max_request_sec
+        self._client = client or httpx.Client(base_url=self.url, timeout=timeout_sec)
+        self._segment_cache = segment_cache
+        self._params: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def _load_model(self) -> None:
+        # The model lives in the ASR server.
+        return None
+
+    def cache_params(self) -> dict:
+        with self._lock:
+            if self._params is None:
+                response = self._client.get("/health")
+                response.raise_for_status()
+                self._params = response.json()["cache_params"]
+            return self._params
+
+    def recognize_many(self, segments: Sequence[Union[bytes, PCMBuffer]]) -> list[list[dict]]:
+        decoded = [audio if isinstance(audio, PCMBuffer) else PCMBuffer.from_bytes(audio) for audio in segments]
+        if self._segment_cache is not None:
+            return self._segment_cache.recognize(decoded, self.cache_params(), self._recognize_remote)
+        return self._recognize_remote(decoded)
+
+    def _batches(self, segments: Sequence[PCMBuffer]) -> list[list[PCMBuffer]]:
+        batches: list[list[PCMBuffer]] = []
+        batch_sec = 0.0
+        for audio in segments:
+            seconds = len(audio.samples) / audio.sample_rate
+            if not batches or batch_sec + seconds > self.max_request_sec:
+                batches.append([])
+                batch_sec = 0.0
+            batches[-1].append(audio)
+            batch_sec += seconds
+        return batches
+
+    def _recognize_remote(self, segments: Sequence[PCMBuffer]) -> list[list[dict]]:
+        records: list[list[dict]] = []
+        for batch in self._batches(segments):
+            records.extend(self._post(batch))
+        return records
+
+    def _post(self, segments: Sequence[PCMBuffer]) -> list[list[dict]]:
+        try:
+            response = self._client.post(
+                "/recognize",
+                content=encode_segments(segments),
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f"ASR server at {self.url} failed: {exc}") from exc
+        return response.json()["records"]
+
+    def transcribe(self, audio_bytes: Union[bytes, PCMBuffer], suffix: str = ".wav", base_offset_ms: int = 0) -> dict:
+        return self.transcribe_many([(audio_bytes, base_offset_ms)])[0]
+
+    def transcribe_many(self, segments: Sequence[tuple[Union[bytes, PCMBuffer], int]]) -> list[dict]:
+        records = self.recognize_many([audio for audio, _ in segments])
+        return [
+            ReazonTranscriber.format_transcript(segment_records, base_offset_ms)
+            for segment_records, (_, base_offset_ms) in zip(records, segments)
+        ]
+
+    def shutdown(self) -> None:
+        self._client.close()
@@ -0,0 +1,131 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional, Sequence, Union
+
+from app.modules.ai_exam import asr_worker
+from app.modules.ai_exam.asr_cache import SegmentASRCache
+from app.modules.ai_exam.pcm import PCMBuffer
+from app.modules.ai_exam.service import ASR_ARTIFACT_VERSION, ReazonTranscriber
+
+logger = logging.getLogger(__name__)
+
+
+def in_daemon_process() -> bool:
+    """True inside daemonic workers (e.g. Celery prefork children), which cannot start child processes."""
+    if multiprocessing.current_process().daemon:
+        return True
+    try:
+        from billiard.process import current_process as billiard_current_process
+    except ImportError:
+        return False
+    return bool(billiard_current_process().daemon)
+
+
+class ASRWorkerPool:
+    """Process pool of warm ReazonSpeech workers with the same interface as ReazonTranscriber.
+
+    Each worker loads the model once in its initializer and then pulls segments
+    from the executor's queue, so segments are transcribed in parallel while
+    results are still returned in submission order. The processes start on the
+    first segment, not when the pool is created. `transcriber_factory` replaces
+    ReazonTranscriber in the workers; it must be importable by reference.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        threads_per_worker: int = 1,
+        model_version: str = "reazonspeech-k2-v2",
+        batch_size: int = 1,
+        gender_mode: str = "pitch",
+        speaker_clustering: bool = True,
+        segment_cache: Optional[SegmentASRCache] = None,
+        pack_target_ms: int = 0,
+        transcriber_factory: Optional[Callable[..., Any]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.model_version = model_version
+        self.gender_mode = gender_mode
+        self.speaker_clustering = speaker_clustering
+        self.pack_target_ms = max(0, pack_target_ms)
+        self._segment_cache = segment_cache
+        cpu_count = os.cpu_count() or 1
+        if self.workers * self.threads_per_worker > cpu_count:
+            logger.warning(
+                "ASR pool uses %s workers x %s threads on %s cores; cores will be oversubscribed.",
+                self.workers,
+                self.threads_per_worker,
+                cpu_count,
+            )
+        self._transcriber_kwargs = {
+            "model_version": model_version,
+            "batch_size": batch_size,
+            "gender_mode": gender_mode,
+            "speaker_clustering": speaker_clustering,
+            "pack_target_ms": self.pack_target_ms,
+        }
+        self._transcriber_factory = transcriber_factory
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                if in_daemon_process():
+                    raise RuntimeError("ASR worker pool cannot start inside a daemonic process.")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=asr_worker.init_worker,
+                    initargs=(self.threads_per_worker, self._transcriber_kwargs, self._transcriber_factory),
+                )
+            return self._executor
+
+    def _load_model(self) -> None:
+        # Models live in the worker processes; nothing to load in the parent.
+        return None
+
+    def cache_params(self) -> dict:
+        return {
+            "version": ASR_ARTIFACT_VERSION,
+            "model_version": self.model_version,
+            "gender_mode": self.gender_mode,
+            "speaker_clustering": self.speaker_clustering,
+            "pack_target_ms": self.pack_target_ms,
+        }
+
+    def submit(self, audio: Union[bytes, PCMBuffer]) -> Future:
+        """Queue one segment; the future resolves to its recognized chunk records."""
+        if not isinstance(audio, PCMBuffer):
+            audio = PCMBuffer.from_bytes(audio)
+        return self._get_executor().submit(asr_worker.recognize, audio.samples, audio.sample_rate)
+
+    def recognize_many(self, segments: Sequence[Union[bytes, PCMBuffer]]) -> list[list[dict]]:
+        decoded = [audio if isinstance(audio, PCMBuffer) else PCMBuffer.from_bytes(audio) for audio in segments]
+        if self._segment_cache is not None:
+            return self._segment_cache.recognize(decoded, self.cache_params(), self._recognize_in_pool)
+        return self._recognize_in_pool(decoded)
+
+    def _recognize_in_pool(self, segments: Sequence[PCMBuffer]) -> list[list[dict]]:
+        futures = [self.submit(audio) for audio in segments]
+        return [future.result() for future in futures]
+
+    def transcribe(self, audio_bytes: Union[bytes, PCMBuffer], suffix: str = ".wav", base_offset_ms: int = 0) -> dict:
+        return self.transcribe_many([(audio_bytes, base_offset_ms)])[0]
+
+    def transcribe_many(self, segments: Sequence[tuple[Union[bytes, PCMBuffer], int]]) -> list[dict]:
+        records = self.recognize_many([audio for audio, _ in segments])
+        return [
+            ReazonTranscriber.format_transcript(segment_records, base_offset_ms)
+            for segment_records, (_, base_offset_ms) in zip(records, segments)
+        ]
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,172 @@
+import asyncio
+import io
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+
+from app.modules.ai_exam.pcm import PCMBuffer
+
+logger = logging.getLogger(__name__)
+
+
+def encode_segments(segments: Sequence[PCMBuffer]) -> bytes:
+    """Pack segments as an `.npz` body: one int16 array per segment plus their sample rates.
+
+    int16 halves the body compared with float32 and is what the segment
+    caches hash anyway, so cache keys are the same on both sides.
+    """
+    arrays = {f"samples_{index}": audio.to_int16() for index, audio in enumerate(segments)}
+    arrays["sample_rates"] = np.array([audio.sample_rate for audio in segments], dtype=np.int32)
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _to_float32(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32767.0
+    return samples.astype(np.float32, copy=False)
+
+
+def decode_segments(body: bytes) -> list[PCMBuffer]:
+    try:
+        with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+            sample_rates = archive["sample_rates"]
+            return [
+                PCMBuffer(samples=_to_float32(archive[f"samples_{index}"]), sample_rate=int(rate))
+                for index, rate in enumerate(sample_rates)
+            ]
+    except (KeyError, OSError, ValueError) as exc:
+        raise ValueError(f"Malformed ASR request body: {exc}") from exc
+
+
+@dataclass
+class _Request:
+    segments: list[PCMBuffer]
+    future: Future = field(default_factory=Future)
+
+
+class ASRBatcher:
+    """Merge concurrent recognition requests into one `recognize_many` call on a single thread.
+
+    Requests from every API and Celery process arriving within `max_wait_ms`
+    of each other (up to `max_segments` segments) share a model call, so
+    their silence chunks are batched together. The transcriber is only ever
+    used from the batcher thread.
+    """
+
+    def __init__(self, transcriber, max_segments: int = 64, max_wait_ms: int = 20):
+        self.transcriber = transcriber
+        self.max_segments = max(1, max_segments)
+        self.max_wait_sec = max(0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="asr-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, segments: Sequence[PCMBuffer]) -> Future:
+        """Queue segments; the future resolves to their recognized chunk records, in order."""
+        request = _Request(list(segments))
+        if not request.segments:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def _next_batch(self, first: _Request) -> tuple[list[_Request], bool]:
+        batch, size = [first], len(first.segments)
+        deadline = time.monotonic() + self.max_wait_sec
+        while size < self.max_segments:
+            try:
+                request = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += len(request.segments)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._next_batch(first)
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            segments = [audio for request in batch for audio in request.segments]
+            if not segments:
+                continue
+            try:
+                records = self.transcriber.recognize_many(segments)
+            except Exception as exc:
+                logger.exception("ASR batch of %s segment(s) failed.", len(segments))
+                for request in batch:
+                    request.future.set_exception(exc)
+                continue
+            logger.debug("Recognized %s segment(s) from %s request(s) in one call.", len(segments), len(batch))
+            cursor = 0
+            for request in batch:
+                request.future.set_result(records[cursor:cursor + len(request.segments)])
+                cursor += len(request.segments)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+def create_asr_app(
+    transcriber,
+    max_segments: int = 64,
+    max_wait_ms: int = 20,
+    max_body_bytes: int = 128 * 1024 * 1024,
+) -> FastAPI:
+    """HTTP front of a transcriber that owns the ReazonSpeech (and gender) models.
+
+    `POST /recognize` takes an `encode_segments` body of at most
+    `max_body_bytes` and returns the chunk records of every segment;
+    `GET /health` reports the transcriber's cache parameters so clients key
+    their caches by the model actually served.
+    """
+    batcher = ASRBatcher(transcriber, max_segments=max_segments, max_wait_ms=max_wait_ms)
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        # Load before accepting traffic, so a broken model install fails the server, not a job.
+        await asyncio.to_thread(transcriber._load_model)
+        logger.info("ASR server ready.")
+        yield
+        await asyncio.to_thread(batcher.close)
+
+    app = FastAPI(title="AI exam ASR server", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health() -> dict:
+        return {"status": "ok", "cache_params": transcriber.cache_params()}
+
+    @app.post("/recognize")
+    async def recognize(request: Request) -> dict:
+        too_large = HTTPException(status_code=413, detail=f"ASR request body exceeds {max_body_bytes} bytes.")
+        if int(request.headers.get("content-length") or 0) > max_body_bytes:
+            raise too_large
+        body = bytearray()
+        async for block in request.stream():
+            body += block
+            if len(body) > max_body_bytes:
+                raise too_large
+        try:
+            segments = decode_segments(bytes(body))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        records = await asyncio.wrap_future(batcher.submit(segments))
+        return {"records": records}
+
+    return app
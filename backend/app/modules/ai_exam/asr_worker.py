@@ -0,0 +1,46 @@
+import logging
+import os
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Runs inside ASR pool workers and must stay free of heavy imports: a spawned worker
+# imports this module before `init_worker` runs, and the thread-count variables only
+# take effect if they are set before numpy, torch or onnxruntime are first imported.
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# One warm transcriber per worker process, created by `init_worker`.
+_transcriber: Any = None
+
+
+def init_worker(
+    threads_per_worker: int,
+    transcriber_kwargs: dict,
+    transcriber_factory: Optional[Callable[..., Any]] = None,
+) -> None:
+    global _transcriber
+
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads_per_worker)
+    try:
+        import torch
+
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    if transcriber_factory is None:
+        from app.modules.ai_exam.service import ReazonTranscriber
+
+        transcriber_factory = ReazonTranscriber
+    _transcriber = transcriber_factory(num_threads=threads_per_worker, **transcriber_kwargs)
+    _transcriber._load_model()
+    logger.info("ASR worker %s ready with %s thread(s).", os.getpid(), threads_per_worker)
+
+
+def recognize(samples, sample_rate: int) -> list[dict]:
+    from app.modules.ai_exam.pcm import PCMBuffer
+
+    if _transcriber is None:
+        raise RuntimeError("ASR worker was not initialised.")
+    return _transcriber.recognize_many([PCMBuffer(samples=samples, sample_rate=sample_rate)])[0]
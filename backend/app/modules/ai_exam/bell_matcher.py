@@ -0,0 +1,449 @@
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.modules.ai_exam.pcm import PCMBuffer, decode_audio_bytes
+
+logger = logging.getLogger(__name__)
+
+# Both bell samples keep >99% of their energy below ~700 Hz, so a 2 kHz copy is
+# enough to find them; the exact position is then refined at the full rate.
+COARSE_SAMPLE_RATE = 2000
+FINE_SEARCH_MS = 20
+# Coarse candidates use a looser threshold so the fine stage still sees every
+# peak the full-rate correlation would have kept.
+COARSE_THRESHOLD_RATIO = 0.7
+# Cosine similarity between a template and the audio under it. Streaming cannot know
+# the global correlation maximum in advance, so it keeps peaks by this score instead;
+# a clean bell scores ~1.0, while the two bells only reach ~0.55-0.7 against each other.
+MIN_SIMILARITY = 0.8
+
+
+def _resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    if source_rate == target_rate:
+        return samples
+    import soxr
+
+    return np.ascontiguousarray(soxr.resample(samples, source_rate, target_rate), dtype=np.float32)
+
+
+@dataclass(frozen=True)
+class BellPeak:
+    label: str
+    position: int
+    sample_rate: int
+    score: float
+
+    @property
+    def time_sec(self) -> float:
+        return self.position / self.sample_rate
+
+
+@dataclass(eq=False)
+class BellTemplate:
+    """A decoded bell sample plus its low-rate copy and cached FFT spectra."""
+
+    label: str
+    samples: np.ndarray
+    sample_rate: int
+    coarse: np.ndarray
+    coarse_rate: int
+    _spectra: dict = field(default_factory=dict, repr=False)
+
+    def coarse_spectrum(self, n_fft: int) -> np.ndarray:
+        spectrum = self._spectra.get(n_fft)
+        if spectrum is None:
+            if len(self._spectra) >= 8:
+                self._spectra.pop(next(iter(self._spectra)))
+            spectrum = np.conj(np.fft.rfft(self.coarse, n_fft))
+            self._spectra[n_fft] = spectrum
+        return spectrum
+
+
+@lru_cache(maxsize=16)
+def _load_template(path: str, mtime_ns: int, sample_rate: int, coarse_rate: int) -> BellTemplate:
+    samples = decode_audio_bytes(Path(path).read_bytes(), sample_rate)
+    logger.info("Loaded bell template %s (%.2fs).", Path(path).name, len(samples) / sample_rate)
+    return BellTemplate(
+        label=Path(path).stem,
+        samples=samples,
+        sample_rate=sample_rate,
+        coarse=_resample(samples, sample_rate, coarse_rate),
+        coarse_rate=coarse_rate,
+    )
+
+
+def load_bell_template(path: Path, sample_rate: int, coarse_rate: int = COARSE_SAMPLE_RATE) -> BellTemplate:
+    """Decode a bell sample once per process (reloaded only if the file changes)."""
+    return _load_template(str(path), path.stat().st_mtime_ns, sample_rate, coarse_rate)
+
+
+def refine_match(
+    samples: np.ndarray,
+    template: np.ndarray,
+    centre: int,
+    radius: int,
+    max_shift: int,
+) -> tuple[int, float]:
+    """Return the full-rate (position, correlation) maximum closest to `centre`."""
+    from scipy import signal
+
+    last_start = len(samples) - len(template)
+    if last_start < 0:
+        return centre, 0.0
+    origin = centre
+    while True:
+        start = max(0, min(last_start, centre - radius))
+        stop = max(start, min(last_start, centre + radius))
+        window = samples[start:stop + len(template)]
+        correlation = signal.correlate(window, template, mode="valid", method="fft")
+        best = int(np.argmax(correlation))
+        position = start + best
+        # Broad peaks (e.g. one bell matched against the other) can crest outside
+        # the first window; follow the slope until the maximum is interior.
+        at_edge = (best == 0 and start > 0) or (best == len(correlation) - 1 and stop < last_start)
+        if not at_edge or abs(position - origin) >= max_shift:
+            return position, float(correlation[best])
+        centre = position
+
+
+def _similarity(
+    correlation: np.ndarray,
+    energy_cumsum: np.ndarray,
+    template: BellTemplate,
+    start: int = 0,
+) -> np.ndarray:
+    """Cosine similarity between the template and the coarse audio under each correlation output."""
+    length = len(template.coarse)
+    count = len(correlation)
+    template_energy = float(np.dot(template.coarse, template.coarse))
+    # Floor the window energy (-30 dB of the template) so near-silence cannot score high.
+    window_energy = np.maximum(
+        energy_cumsum[start + length:start + length + count] - energy_cumsum[start:start + count],
+        max(template_energy * 1e-3, 1e-12),
+    )
+    return correlation / np.sqrt(template_energy * window_energy)
+
+
+def _energy_cumsum(samples: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(np.square(samples, dtype=np.float64))])
+
+
+class BellTemplateMatcher:
+    """Two-stage multi-template matcher: coarse FFT correlation at a low rate, exact refinement at full rate.
+
+    The spectrum of the main signal is computed once and multiplied with the
+    cached spectrum of every template, so extra templates cost one inverse FFT
+    each. Per template, `match` returns the same peaks as a full-rate
+    `scipy.signal.correlate` + `find_peaks(height=max * threshold_percent)` pass,
+    to within a sample or two.
+    """
+
+    def __init__(
+        self,
+        threshold_percent: float = 0.85,
+        min_distance_sec: float = 10,
+        coarse_rate: int = COARSE_SAMPLE_RATE,
+        fine_search_ms: int = FINE_SEARCH_MS,
+    ):
+        self.threshold_percent = threshold_percent
+        self.min_distance_sec = min_distance_sec
+        self.coarse_rate = coarse_rate
+        self.fine_search_ms = fine_search_ms
+
+    def downsample(self, audio: PCMBuffer) -> np.ndarray:
+        return _resample(audio.samples, audio.sample_rate, self.coarse_rate)
+
+    def _coarse_candidates(self, correlation: np.ndarray) -> np.ndarray:
+        from scipy import signal
+
+        threshold = float(np.max(correlation)) * self.threshold_percent * COARSE_THRESHOLD_RATIO
+        peaks, _ = signal.find_peaks(
+            correlation,
+            height=threshold,
+            distance=max(1, int(self.coarse_rate * self.min_distance_sec * COARSE_THRESHOLD_RATIO)),
+        )
+        return peaks
+
+    def _refine(self, audio: PCMBuffer, template: BellTemplate, coarse_peak: int) -> tuple[int, float]:
+        ratio = audio.sample_rate / self.coarse_rate
+        return refine_match(
+            audio.samples,
+            template.samples,
+            centre=int(round(coarse_peak * ratio)),
+            radius=int(audio.sample_rate * self.fine_search_ms / 1000) + int(np.ceil(ratio)),
+            max_shift=int(audio.sample_rate * self.min_distance_sec / 2),
+        )
+
+    def match(
+        self,
+        audio: PCMBuffer,
+        templates: Sequence[BellTemplate],
+        coarse_audio: Optional[np.ndarray] = None,
+    ) -> dict[str, list[BellPeak]]:
+        """Return time-ordered peaks for every template, keyed by template label."""
+        from scipy import fft as sp_fft
+
+        if coarse_audio is None:
+            coarse_audio = self.downsample(audio)
+        results: dict[str, list[BellPeak]] = {template.label: [] for template in templates}
+        usable = [
+            template for template in templates
+            if len(audio.samples) >= len(template.samples) and len(coarse_audio) >= len(template.coarse)
+        ]
+        if not usable:
+            return results
+
+        longest = max(len(template.coarse) for template in usable)
+        n_fft = sp_fft.next_fast_len(len(coarse_audio) + longest - 1, real=True)
+        spectrum = np.fft.rfft(coarse_audio, n_fft)
+        energy = _energy_cumsum(coarse_audio)
+        for template in usable:
+            valid = len(coarse_audio) - len(template.coarse) + 1
+            correlation = np.fft.irfft(spectrum * template.coarse_spectrum(n_fft), n_fft)[:valid]
+            results[template.label] = self._pick(audio, template, correlation, energy)
+        return results
+
+    def _pick(
+        self,
+        audio: PCMBuffer,
+        template: BellTemplate,
+        correlation: np.ndarray,
+        energy: np.ndarray,
+    ) -> list[BellPeak]:
+        candidates = self._coarse_candidates(correlation)
+        if not len(candidates):
+            return []
+        refined = [(self._refine(audio, template, peak), peak) for peak in candidates]
+
+        threshold = max(score for (_, score), _ in refined) * self.threshold_percent
+        min_distance = int(audio.sample_rate * self.min_distance_sec)
+        kept: list[tuple[int, int]] = []
+        for (position, score), coarse_peak in sorted(refined, key=lambda item: item[0][1], reverse=True):
+            if score < threshold:
+                break
+            if any(abs(position - other) < min_distance for other, _ in kept):
+                continue
+            kept.append((position, coarse_peak))
+        return [
+            BellPeak(template.label, position, audio.sample_rate, self._peak_similarity(correlation, energy, template, peak))
+            for position, peak in sorted(kept)
+        ]
+
+    @staticmethod
+    def _peak_similarity(correlation: np.ndarray, energy: np.ndarray, template: BellTemplate, peak: int) -> float:
+        return float(_similarity(correlation[peak:peak + 1], energy, template, start=peak)[0])
+
+
+class _PeakTracker:
+    """Streaming local-maximum picker for one template with the `find_peaks` distance rule."""
+
+    def __init__(self, template: BellTemplate, min_score: float, distance: int):
+        self.template = template
+        self.min_score = min_score
+        self.distance = distance
+        self._history = np.zeros(0, dtype=np.float64)
+        self.pending: Optional[tuple[int, float]] = None
+
+    def feed(self, scores: np.ndarray, start: int) -> list[tuple[int, float]]:
+        extended = np.concatenate([self._history, scores])
+        extended_start = start - len(self._history)
+        self._history = extended[-2:]
+        found: list[tuple[int, float]] = []
+        if len(extended) >= 3:
+            centre = extended[1:-1]
+            is_peak = (centre > extended[:-2]) & (centre >= extended[2:]) & (centre >= self.min_score)
+            for offset in np.flatnonzero(is_peak):
+                index, score = extended_start + 1 + int(offset), float(centre[offset])
+                if self.pending is not None and index - self.pending[0] < self.distance:
+                    if score > self.pending[1]:
+                        self.pending = (index, score)
+                    continue
+                if self.pending is not None:
+                    found.append(self.pending)
+                self.pending = (index, score)
+        last_output = start + len(scores) - 1
+        if self.pending is not None and last_output - self.pending[0] >= self.distance:
+            found.append(self.pending)
+            self.pending = None
+        return found
+
+    def flush(self) -> list[tuple[int, float]]:
+        found = [self.pending] if self.pending is not None else []
+        self.pending = None
+        return found
+
+
+class StreamingTemplateMatcher:
+    """Overlap-save correlation of any number of templates against a coarse-rate stream.
+
+    Each block window is transformed once and shared by every template. Blocks
+    of any size can be pushed; a peak is returned once no later output can
+    replace it under the `min_distance_sec` rule.
+    """
+
+    def __init__(self, templates: Sequence[BellTemplate], min_score: float, min_distance_sec: float):
+        from scipy import fft as sp_fft
+
+        self.templates = list(templates)
+        longest = max(len(template.coarse) for template in self.templates)
+        self.n_fft = sp_fft.next_fast_len(4 * longest, real=True)
+        self._step = self.n_fft - longest + 1
+        self._trackers = [
+            _PeakTracker(template, min_score, max(1, int(template.coarse_rate * min_distance_sec)))
+            for template in self.templates
+        ]
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._next_output = 0
+
+    @property
+    def horizon(self) -> int:
+        """Coarse index before which every peak has already been returned."""
+        pending = [tracker.pending[0] for tracker in self._trackers if tracker.pending is not None]
+        return min(pending + [max(0, self._next_output - 1)])
+
+    def push(self, block: np.ndarray) -> list[tuple[BellTemplate, int, float]]:
+        self._buffer = np.concatenate([self._buffer, block])
+        found: list[tuple[BellTemplate, int, float]] = []
+        while len(self._buffer) >= self.n_fft:
+            found.extend(self._correlate(self._buffer[:self.n_fft], self._step))
+            self._buffer = self._buffer[self._step:]
+        return found
+
+    def flush(self) -> list[tuple[BellTemplate, int, float]]:
+        found = self._correlate(self._buffer, None) if len(self._buffer) else []
+        self._buffer = np.zeros(0, dtype=np.float32)
+        for tracker in self._trackers:
+            found.extend((tracker.template, index, score) for index, score in tracker.flush())
+        return found
+
+    def _correlate(self, window: np.ndarray, count: Optional[int]) -> list[tuple[BellTemplate, int, float]]:
+        spectrum = np.fft.rfft(window, self.n_fft)
+        energy = _energy_cumsum(window)
+        found: list[tuple[BellTemplate, int, float]] = []
+        for tracker in self._trackers:
+            template = tracker.template
+            outputs = count if count is not None else len(window) - len(template.coarse) + 1
+            if outputs <= 0:
+                continue
+            correlation = np.fft.irfft(spectrum * template.coarse_spectrum(self.n_fft), self.n_fft)[:outputs]
+            scores = _similarity(correlation, energy, template)
+            found.extend((template, index, score) for index, score in tracker.feed(scores, self._next_output))
+        if count is not None:
+            self._next_output += count
+        return found
+
+
+class _SampleQueue:
+    """Full-rate samples kept as a list of blocks, addressed by absolute sample index."""
+
+    def __init__(self):
+        self._blocks: deque = deque()
+        self.start = 0
+        self.end = 0
+
+    def append(self, block: np.ndarray) -> None:
+        if len(block):
+            self._blocks.append(block)
+            self.end += len(block)
+
+    def get(self, start: int, end: int) -> np.ndarray:
+        start, end = max(start, self.start), min(end, self.end)
+        parts = []
+        block_start = self.start
+        for block in self._blocks:
+            block_end = block_start + len(block)
+            if block_end > start and block_start < end:
+                parts.append(block[max(0, start - block_start):min(len(block), end - block_start)])
+            if block_end >= end:
+                break
+            block_start = block_end
+        if not parts:
+            return np.zeros(0, dtype=np.float32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def discard_before(self, index: int) -> None:
+        while self._blocks and self.start + len(self._blocks[0]) <= index:
+            self.start += len(self._blocks.popleft())
+
+
+class StreamingBellScanner:
+    """Bounded-memory bell detection over a stream of full-rate PCM blocks.
+
+    Every block is downsampled incrementally and fed to one streaming matcher
+    per template; reported peaks are refined at full rate from a queue that only
+    keeps samples still needed for refinement or for cutting the current segment
+    (see `keep_from`). Until `keep_from` is first called, all samples are kept.
+    """
+
+    def __init__(
+        self,
+        templates: Sequence[BellTemplate],
+        sample_rate: int,
+        min_score: float = MIN_SIMILARITY,
+        min_distance_sec: float = 10,
+        coarse_rate: int = COARSE_SAMPLE_RATE,
+        fine_search_ms: int = FINE_SEARCH_MS,
+    ):
+        self.sample_rate = sample_rate
+        self.coarse_rate = coarse_rate
+        self._ratio = sample_rate / coarse_rate
+        self._matcher = StreamingTemplateMatcher(templates, min_score, min_distance_sec)
+        self._radius = int(sample_rate * fine_search_ms / 1000) + int(np.ceil(self._ratio))
+        self._max_shift = int(sample_rate * min_distance_sec / 2)
+        self._resampler = None
+        if sample_rate != coarse_rate:
+            import soxr
+
+            self._resampler = soxr.ResampleStream(sample_rate, coarse_rate, 1, dtype="float32")
+        self._queue = _SampleQueue()
+        self._keep_from: Optional[int] = None
+
+    @property
+    def total_samples(self) -> int:
+        return self._queue.end
+
+    @property
+    def horizon(self) -> int:
+        """Full-rate index before which no further peak will be reported."""
+        return max(0, int(self._matcher.horizon * self._ratio) - self._radius - self._max_shift)
+
+    def push(self, block: np.ndarray) -> list[BellPeak]:
+        self._queue.append(block)
+        coarse = block if self._resampler is None else self._resampler.resample_chunk(block)
+        peaks = self._refine(self._matcher.push(coarse))
+        self._trim()
+        return peaks
+
+    def finish(self) -> list[BellPeak]:
+        tail = np.zeros(0, dtype=np.float32)
+        if self._resampler is not None:
+            tail = self._resampler.resample_chunk(tail, last=True)
+        return self._refine(self._matcher.push(tail) + self._matcher.flush())
+
+    def samples(self, start: int, end: int) -> np.ndarray:
+        return self._queue.get(start, end)
+
+    def keep_from(self, position: int) -> None:
+        self._keep_from = position
+        self._trim()
+
+    def _trim(self) -> None:
+        if self._keep_from is not None:
+            self._queue.discard_before(min(self._keep_from, self.horizon))
+
+    def _refine(self, found: Sequence[tuple[BellTemplate, int, float]]) -> list[BellPeak]:
+        peaks: list[BellPeak] = []
+        reach = self._radius + self._max_shift
+        for template, coarse_index, score in found:
+            centre = int(round(coarse_index * self._ratio))
+            start = max(self._queue.start, centre - reach)
+            window = self._queue.get(start, centre + reach + len(template.samples))
+            position, _ = refine_match(window, template.samples, centre - start, self._radius, self._max_shift)
+            peaks.append(BellPeak(template.label, start + position, self.sample_rate, score))
+        return sorted(peaks, key=lambda peak: peak.position)
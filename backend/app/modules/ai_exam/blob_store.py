@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, so only one process may use a store.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class AudioBlobStore:
+    """Uploaded audio on a volume shared by the API and the Celery workers, keyed by its sha256.
+
+    Every queued job holds a lease on its blob; the blob is deleted when the
+    last lease is released. Blobs whose producer died before enqueueing (no
+    lease, or leases older than any job can run) are removed by
+    `collect_garbage`.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _blob_path(self, content_hash: str) -> Path:
+        return self.root / "blobs" / content_hash[:2] / content_hash
+
+    def _lease_dir(self, content_hash: str) -> Path:
+        return self.root / "leases" / content_hash
+
+    @contextmanager
+    def _locked(self, content_hash: str) -> Iterator[None]:
+        # Serialises lease changes with the delete of the last lease holder, across processes.
+        # One lock per hash prefix keeps the number of lock files bounded.
+        lock_path = self.root / "locks" / f"{content_hash[:2]}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with lock_path.open("a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    def put(self, content_hash: str, data: bytes, job_id: str) -> None:
+        """Store `data` (if not already stored) and lease it to `job_id`."""
+        if hashlib.sha256(data).hexdigest() != content_hash:
+            raise ValueError("Audio bytes do not match their content hash.")
+        path = self._blob_path(content_hash)
+        with self._locked(content_hash):
+            lease_dir = self._lease_dir(content_hash)
+            lease_dir.mkdir(parents=True, exist_ok=True)
+            (lease_dir / job_id).touch()
+            if path.exists():
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so workers never read a partial blob.
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_name, path)
+
+    def put_file(self, content_hash: str, source: Path, job_id: str) -> None:
+        """Move an already hashed spool file into the store and lease it to `job_id`.
+
+        The caller vouches for `content_hash`; the file is renamed when it is
+        on the same filesystem and copied otherwise, never read into memory.
+        """
+        path = self._blob_path(content_hash)
+        with self._locked(content_hash):
+            lease_dir = self._lease_dir(content_hash)
+            lease_dir.mkdir(parents=True, exist_ok=True)
+            (lease_dir / job_id).touch()
+            if path.exists():
+                Path(source).unlink(missing_ok=True)
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            os.close(fd)
+            shutil.move(str(source), tmp_name)
+            os.replace(tmp_name, path)
+
+    def get(self, content_hash: str) -> bytes:
+        try:
+            return self._blob_path(content_hash).read_bytes()
+        except FileNotFoundError:
+            raise RuntimeError(f"Audio blob {content_hash} is missing from {self.root}.") from None
+
+    def release(self, content_hash: str, job_id: str) -> None:
+        """Drop `job_id`'s lease and delete the blob if no other job still needs it."""
+        with self._locked(content_hash):
+            lease_dir = self._lease_dir(content_hash)
+            (lease_dir / job_id).unlink(missing_ok=True)
+            if lease_dir.exists() and any(lease_dir.iterdir()):
+                return
+            self._blob_path(content_hash).unlink(missing_ok=True)
+            try:
+                lease_dir.rmdir()
+            except OSError:
+                pass
+
+    def collect_garbage(self, max_age_sec: float) -> dict:
+        """Expire leases older than `max_age_sec`, then delete unleased blobs older than that."""
+        cutoff = time.time() - max_age_sec
+        removed = {"leases": 0, "blobs": 0, "bytes": 0}
+        for lease_dir in list((self.root / "leases").glob("*")):
+            with self._locked(lease_dir.name):
+                for lease in list(lease_dir.glob("*")):
+                    if lease.stat().st_mtime < cutoff:
+                        lease.unlink(missing_ok=True)
+                        removed["leases"] += 1
+                if not any(lease_dir.iterdir()):
+                    lease_dir.rmdir()
+        for path in list((self.root / "blobs").glob("*/*")):
+            if path.stat().st_mtime >= cutoff:
+                continue
+            content_hash = path.name.removesuffix(".tmp")
+            with self._locked(content_hash):
+                lease_dir = self._lease_dir(content_hash)
+                # Temp files left by a crashed `put` never have a reader.
+                if path.suffix != ".tmp" and lease_dir.exists() and any(lease_dir.iterdir()):
+                    continue
+                size = path.stat().st_size if path.exists() else 0
+                path.unlink(missing_ok=True)
+                removed["blobs"] += 1
+                removed["bytes"] += size
+        logger.info("Collected %s audio blob(s) and %s expired lease(s).", removed["blobs"], removed["leases"])
+        return removed
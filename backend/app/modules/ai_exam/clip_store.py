@@ -0,0 +1,123 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from app.modules.ai_exam.pcm import PCMBuffer
+
+logger = logging.getLogger(__name__)
+
+CLIP_SUFFIX = ".mp3"
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]+(/[A-Za-z0-9_.-]+)*$")
+
+
+class ClipStorage(ABC):
+    """Where rendered question clips are kept; `url(key)` goes into `AIQuestion.audio_url`."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_file(self, key: str, source: Path) -> None:
+        """Take ownership of the rendered file at `source`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+
+class LocalClipStorage(ClipStorage):
+    """Clips on the local filesystem, served by the API (`GET /ai/clips/{key}`) with Range support."""
+
+    def __init__(self, root: Path, url_prefix: str):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def path(self, key: str) -> Path:
+        if not _KEY_PATTERN.match(key) or ".." in key.split("/"):
+            raise ValueError(f"Invalid clip key {key!r}.")
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def put_file(self, key: str, source: Path) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Move next to the target first so readers never see a partial clip.
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        shutil.move(str(source), tmp_name)
+        os.replace(tmp_name, path)
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+
+def create_clip_storage(backend: str, root: Path, url_prefix: str) -> Optional[ClipStorage]:
+    """None means clips stay Cloudinary on-the-fly transformations of the full upload."""
+    if backend == "cloudinary":
+        return None
+    if backend == "local":
+        return LocalClipStorage(root, url_prefix)
+    raise ValueError(f"Unknown AI clip storage {backend!r}; expected 'cloudinary' or 'local'.")
+
+
+def render_clips(
+    source: Union[bytes, Path, PCMBuffer],
+    clips: Sequence[tuple[float, float]],
+    directory: Path,
+    source_suffix: str = ".mp3",
+    bitrate: str = "64k",
+) -> list[Path]:
+    """Cut every `(start_sec, end_sec)` clip out of `source` in one ffmpeg run.
+
+    `source` is the upload (bytes or a file path, its format given by
+    `source_suffix`) or decoded PCM. MP3 uploads are stream-copied (no
+    re-encode, cut on MP3 frame bounds); other uploads and decoded PCM are
+    encoded once, all clips in the same pass over the input.
+    """
+    if not clips:
+        return []
+    directory = Path(directory)
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-y"]
+    stdin_data: Optional[Union[bytes, memoryview]] = None
+    input_file = None
+    if isinstance(source, PCMBuffer):
+        command += ["-f", "f32le", "-ar", str(source.sample_rate), "-ac", "1", "-i", "pipe:0"]
+        stdin_data = memoryview(np.ascontiguousarray(source.samples, dtype=np.float32)).cast("B")
+        codec = ["-c:a", "libmp3lame", "-b:a", bitrate]
+    else:
+        if isinstance(source, Path):
+            command += ["-i", str(source)]
+        else:
+            # A file, not a pipe: ffmpeg needs to seek to read the input's duration and headers reliably.
+            input_file = tempfile.NamedTemporaryFile(dir=directory, suffix=source_suffix or ".mp3", delete=False)
+            with input_file:
+                input_file.write(source)
+            command += ["-i", input_file.name]
+        stream_copy = (source_suffix or "").lower() == CLIP_SUFFIX
+        codec = ["-c", "copy"] if stream_copy else ["-c:a", "libmp3lame", "-b:a", bitrate]
+
+    outputs = [directory / f"clip_{index:03d}{CLIP_SUFFIX}" for index in range(len(clips))]
+    for (start_sec, end_sec), output in zip(clips, outputs):
+        command += ["-ss", f"{start_sec:.3f}", "-t", f"{max(0.0, end_sec - start_sec):.3f}", "-vn", *codec, str(output)]
+    try:
+        process = subprocess.run(command, input=stdin_data, capture_output=True, check=False)
+    except FileNotFoundError as exc:
+        raise RuntimeError("ffmpeg is required to render question clips.") from exc
+    finally:
+        if input_file is not None:
+            Path(input_file.name).unlink(missing_ok=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to render clips: {process.stderr.decode(errors='ignore').strip()}")
+    return outputs
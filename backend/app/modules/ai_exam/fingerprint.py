@@ -0,0 +1,300 @@
+import logging
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from scipy.ndimage import maximum_filter
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.ai_exam.metrics import PipelineMetrics
+from app.modules.ai_exam.models import AIExamCache
+from app.modules.ai_exam.pcm import ASR_SAMPLE_RATE, AudioSource, PCMBuffer
+from app.modules.ai_exam.result_codec import load_result, store_result
+from app.modules.ai_exam.schemas import AIExamResult, AIFingerprintMatch
+from app.modules.audio.models import Audio, AudioFingerprintHash
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_VERSION = "landmark-v1"
+
+FRAME_SIZE = 1024
+HOP_SIZE = 512
+# Peaks are only taken between ~250 Hz and ~4 kHz, where MP3 encoders keep the most detail.
+MIN_BIN = 16
+MAX_BIN = 256
+PEAK_NEIGHBORHOOD = (9, 15)  # frames x bins
+PEAKS_PER_SECOND = 8
+FAN_OUT = 4
+MAX_PAIR_FRAMES = 63
+# Frames of the spectrogram computed per block, so long recordings stay in bounded memory.
+BLOCK_FRAMES = 4096
+QUERY_SAMPLE_SIZE = 1024
+MIN_ALIGNED_HITS = 12
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """Landmark hashes of one recording and the frame of each hash's anchor peak."""
+
+    hashes: np.ndarray
+    frames: np.ndarray
+    sample_rate: int = ASR_SAMPLE_RATE
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @property
+    def frame_ms(self) -> float:
+        return HOP_SIZE * 1000.0 / self.sample_rate
+
+    def sample(self, limit: int = QUERY_SAMPLE_SIZE) -> "Fingerprint":
+        """At most `limit` hashes spread evenly over the recording, for index lookups."""
+        if len(self) <= limit:
+            return self
+        picked = np.linspace(0, len(self) - 1, limit).astype(np.int64)
+        return Fingerprint(self.hashes[picked], self.frames[picked], self.sample_rate)
+
+
+@dataclass(frozen=True)
+class FingerprintMatch:
+    audio_id: uuid.UUID
+    confidence: float
+    aligned_hits: int
+    # Where the query starts inside the matched recording (negative when the query has extra lead-in).
+    offset_ms: int
+
+
+def _log_spectrogram(samples: np.ndarray) -> np.ndarray:
+    frame_count = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    if frame_count <= 0:
+        return np.zeros((0, MAX_BIN - MIN_BIN), dtype=np.float32)
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE][:frame_count]
+    spectrum = np.abs(np.fft.rfft(frames * window, axis=1))[:, MIN_BIN:MAX_BIN]
+    return np.log1p(spectrum * 1000.0).astype(np.float32)
+
+
+def _find_peaks(samples: np.ndarray, sample_rate: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (frame, bin) of the strongest local spectral maxima, about PEAKS_PER_SECOND of them."""
+    margin = PEAK_NEIGHBORHOOD[0] // 2
+    total_frames = max(0, 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE)
+    peak_frames: list[np.ndarray] = []
+    peak_bins: list[np.ndarray] = []
+    peak_values: list[np.ndarray] = []
+    for block_start in range(0, total_frames, BLOCK_FRAMES):
+        first = max(0, block_start - margin)
+        last = min(total_frames, block_start + BLOCK_FRAMES + margin)
+        spectrogram = _log_spectrogram(samples[first * HOP_SIZE:(last - 1) * HOP_SIZE + FRAME_SIZE])
+        is_peak = (spectrogram == maximum_filter(spectrogram, size=PEAK_NEIGHBORHOOD, mode="constant"))
+        is_peak &= spectrogram > np.median(spectrogram)
+        frames, bins = np.nonzero(is_peak)
+        frames += first
+        # The margins only give the filter context; their peaks belong to the neighbouring blocks.
+        own = (frames >= block_start) & (frames < block_start + BLOCK_FRAMES)
+        peak_frames.append(frames[own])
+        peak_bins.append(bins[own])
+        peak_values.append(spectrogram[frames[own] - first, bins[own]])
+    if not peak_frames:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    frames = np.concatenate(peak_frames)
+    bins = np.concatenate(peak_bins)
+    values = np.concatenate(peak_values)
+
+    # Keep the strongest peaks of every second so quiet passages and dense music weigh the same.
+    frames_per_second = max(1, round(sample_rate / HOP_SIZE))
+    second = frames // frames_per_second
+    order = np.lexsort((-values, second))
+    rank = np.arange(len(order)) - np.searchsorted(second[order], second[order], side="left")
+    keep = order[rank < PEAKS_PER_SECOND]
+    keep = keep[np.lexsort((bins[keep], frames[keep]))]
+    return frames[keep], bins[keep]
+
+
+def compute_fingerprint(audio: PCMBuffer) -> Fingerprint:
+    """Pair every spectral peak with the next FAN_OUT peaks and hash (bin, bin, frame gap).
+
+    The hashes survive re-encoding, bitrate changes and gain changes; the
+    anchor frames let a lookup check that matching hashes line up in time,
+    which also makes trimmed copies match at their offset.
+    """
+    frames, bins = _find_peaks(np.asarray(audio.samples, dtype=np.float32), audio.sample_rate)
+    hashes: list[np.ndarray] = []
+    anchors: list[np.ndarray] = []
+    paired = np.zeros(len(frames), dtype=np.int64)
+    for step in range(1, 4 * FAN_OUT + 1):
+        if step >= len(frames):
+            break
+        anchor, target = np.arange(len(frames) - step), np.arange(step, len(frames))
+        gap = frames[target] - frames[anchor]
+        usable = (gap >= 1) & (gap <= MAX_PAIR_FRAMES) & (paired[anchor] < FAN_OUT)
+        anchor, target, gap = anchor[usable], target[usable], gap[usable]
+        paired[anchor] += 1
+        hashes.append((bins[anchor] << 14) | (bins[target] << 6) | gap)
+        anchors.append(frames[anchor])
+    if not hashes:
+        return Fingerprint(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), audio.sample_rate)
+    hashes_array = np.concatenate(hashes).astype(np.int32)
+    frames_array = np.concatenate(anchors).astype(np.int32)
+    order = np.lexsort((hashes_array, frames_array))
+    return Fingerprint(hashes_array[order], frames_array[order], audio.sample_rate)
+
+
+def best_match(
+    query: Fingerprint,
+    postings: Iterable[tuple[uuid.UUID, int, int]],
+    indexed_counts: dict[uuid.UUID, int],
+    query_total: int,
+) -> Optional[FingerprintMatch]:
+    """Score `(audio_id, hash, frame)` postings of the query's hashes by time-consistent hits.
+
+    A candidate's hits are the postings whose frame offset to the query agrees
+    (within one frame, for re-encode jitter). Confidence is the share of
+    sampled query hashes that hit, scaled by how much of the query the shorter
+    of the two recordings can cover.
+    """
+    if not len(query):
+        return None
+    query_frames: dict[int, list[int]] = defaultdict(list)
+    for hash_value, frame in zip(query.hashes.tolist(), query.frames.tolist()):
+        query_frames[hash_value].append(frame)
+
+    offsets: dict[uuid.UUID, Counter] = defaultdict(Counter)
+    for audio_id, hash_value, frame in postings:
+        for query_frame in query_frames.get(hash_value, ()):
+            offsets[audio_id][frame - query_frame] += 1
+
+    best: Optional[FingerprintMatch] = None
+    for audio_id, histogram in offsets.items():
+        offset, hits = max(
+            ((offset, histogram[offset - 1] + count + histogram[offset + 1]) for offset, count in histogram.items()),
+            key=lambda item: item[1],
+        )
+        coverage = min(1.0, indexed_counts.get(audio_id, query_total) / max(1, query_total))
+        confidence = min(1.0, hits / (len(query) * coverage))
+        if best is None or confidence > best.confidence:
+            best = FingerprintMatch(audio_id, round(confidence, 4), hits, int(round(offset * query.frame_ms)))
+    if best is None or best.aligned_hits < MIN_ALIGNED_HITS:
+        return None
+    return best
+
+
+def decode_and_fingerprint(audio_bytes: AudioSource, pipeline_metrics: PipelineMetrics) -> tuple[PCMBuffer, Fingerprint]:
+    """Decode the upload once; the PCM is handed on to the pipeline so it is not decoded again."""
+    with pipeline_metrics.stage("decode"):
+        audio = PCMBuffer.from_bytes(audio_bytes)
+    with pipeline_metrics.stage("fingerprint"):
+        fingerprint = compute_fingerprint(audio)
+    pipeline_metrics.count("fingerprint_hashes", len(fingerprint))
+    return audio, fingerprint
+
+
+async def find_near_duplicate(
+    db: AsyncSession,
+    fingerprint: Fingerprint,
+    min_confidence: float,
+) -> Optional[FingerprintMatch]:
+    """Look the fingerprint up in the inverted index; return the best match above `min_confidence`."""
+    query = fingerprint.sample()
+    if not len(query):
+        return None
+    postings = (
+        await db.execute(
+            select(AudioFingerprintHash.audio_id, AudioFingerprintHash.hash, AudioFingerprintHash.frame)
+            .join(Audio, Audio.audio_id == AudioFingerprintHash.audio_id)
+            .where(
+                AudioFingerprintHash.hash.in_(sorted(set(query.hashes.tolist()))),
+                Audio.fingerprint_version == FINGERPRINT_VERSION,
+            )
+        )
+    ).all()
+    if not postings:
+        return None
+    candidate_ids = {audio_id for audio_id, _, _ in postings}
+    counts = dict(
+        (
+            await db.execute(
+                select(Audio.audio_id, Audio.fingerprint_hash_count).where(Audio.audio_id.in_(candidate_ids))
+            )
+        ).all()
+    )
+    match = best_match(query, postings, counts, len(fingerprint))
+    if match is None or match.confidence < min_confidence:
+        return None
+    logger.info(
+        "Audio matches %s with confidence %.2f (%s aligned hashes, offset %sms).",
+        match.audio_id,
+        match.confidence,
+        match.aligned_hits,
+        match.offset_ms,
+    )
+    return match
+
+
+async def index_fingerprint(db: AsyncSession, audio: Audio, fingerprint: Fingerprint) -> None:
+    """Replace the audio's postings in the inverted index; the caller commits."""
+    await db.execute(delete(AudioFingerprintHash).where(AudioFingerprintHash.audio_id == audio.audio_id))
+    pairs = np.unique(np.stack([fingerprint.hashes, fingerprint.frames], axis=1), axis=0)
+    if len(pairs):
+        await db.execute(
+            insert(AudioFingerprintHash),
+            [
+                {"audio_id": audio.audio_id, "hash": hash_value, "frame": frame}
+                for hash_value, frame in pairs.tolist()
+            ],
+        )
+    audio.fingerprint_version = FINGERPRINT_VERSION
+    audio.fingerprint_hash_count = len(fingerprint)
+
+
+async def reuse_near_duplicate(
+    db: AsyncSession,
+    cache: AIExamCache,
+    fingerprint: Fingerprint,
+    min_confidence: float,
+) -> Optional[AIExamResult]:
+    """Complete `cache` from a finished job on a near-duplicate recording with the same settings.
+
+    The reused result keeps the matched recording's audio and clip URLs and
+    reports the match in `fingerprint_match`. Returns None, leaving `cache`
+    untouched, when nothing reusable matches; the caller commits.
+    """
+    match = await find_near_duplicate(db, fingerprint, min_confidence)
+    if match is None:
+        return None
+    source = (
+        await db.execute(
+            select(AIExamCache)
+            .where(
+                AIExamCache.audio_id == match.audio_id,
+                AIExamCache.status == "completed",
+                or_(AIExamCache.result_blob.is_not(None), AIExamCache.result_json.is_not(None)),
+                AIExamCache.jlpt_level == cache.jlpt_level,
+                AIExamCache.mondai_config_json == cache.mondai_config_json,
+                AIExamCache.ai_model == cache.ai_model,
+                AIExamCache.pipeline_version == cache.pipeline_version,
+            )
+            .order_by(AIExamCache.updated_at.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+    if source is None:
+        logger.info("Near-duplicate %s has no completed result for these settings; running the pipeline.", match.audio_id)
+        return None
+
+    result = load_result(source)
+    result.fingerprint_match = AIFingerprintMatch(
+        audio_id=str(match.audio_id),
+        confidence=match.confidence,
+        offset_seconds=match.offset_ms / 1000.0,
+    )
+    cache.audio_id = source.audio_id
+    cache.cloudinary_public_id = source.cloudinary_public_id
+    cache.cloudinary_format = source.cloudinary_format
+    store_result(cache, result)
+    cache.status = "completed"
+    cache.progress_message = f"Near-duplicate audio detected (confidence {match.confidence:.2f}). Reused cached AI result."
+    cache.error_message = None
+    return result
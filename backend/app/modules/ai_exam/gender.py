@@ -0,0 +1,141 @@
+import logging
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.modules.ai_exam.pcm import PCMBuffer
+
+logger = logging.getLogger(__name__)
+
+MALE = "男"
+FEMALE = "女"
+UNKNOWN = "Unknown"
+
+F0_MIN_HZ = 70.0
+F0_MAX_HZ = 400.0
+# Median F0 below this is treated as a male voice (typical adult ranges: ~85-155 Hz vs ~165-255 Hz).
+F0_GENDER_THRESHOLD_HZ = 165.0
+MIN_VOICED_FRAMES = 5
+# Two chunk clusters whose F0 centres are closer than this ratio are treated as one speaker.
+MIN_CLUSTER_SEPARATION = 1.2
+
+
+def estimate_f0(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 40,
+    hop_ms: int = 10,
+    voicing_threshold: float = 0.45,
+) -> np.ndarray:
+    """Return F0 (Hz) of every voiced frame using a vectorised normalised autocorrelation."""
+    frame_len = int(sample_rate * frame_ms / 1000)
+    hop = max(1, int(sample_rate * hop_ms / 1000))
+    if len(samples) < frame_len:
+        return np.empty(0, dtype=np.float32)
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_len)[::hop]
+    energy = np.einsum("ij,ij->i", frames, frames) / frame_len
+    loud = energy > max(1e-7, float(energy.max()) * 1e-3)
+    if not np.any(loud):
+        return np.empty(0, dtype=np.float32)
+
+    window = np.hanning(frame_len).astype(np.float32)
+    windowed = (frames[loud] - frames[loud].mean(axis=1, keepdims=True)) * window
+    n_fft = 1 << (2 * frame_len - 1).bit_length()
+    autocorr = np.fft.irfft(np.abs(np.fft.rfft(windowed, n_fft, axis=1)) ** 2, n_fft, axis=1)[:, :frame_len]
+    window_autocorr = np.fft.irfft(np.abs(np.fft.rfft(window, n_fft)) ** 2, n_fft)[:frame_len]
+    autocorr = autocorr / (autocorr[:, :1] + 1e-12) / (window_autocorr / window_autocorr[0] + 1e-12)
+
+    min_lag = int(sample_rate / F0_MAX_HZ)
+    max_lag = min(frame_len - 1, int(sample_rate / F0_MIN_HZ))
+    search = autocorr[:, min_lag:max_lag]
+    strength = search.max(axis=1)
+    # Take the shortest lag close to the maximum to avoid sub-harmonic (octave-down) picks.
+    first = np.argmax(search >= strength[:, None] * 0.9, axis=1)
+    positions = np.arange(search.shape[1])[None, :]
+    near_first = (positions >= first[:, None]) & (positions <= first[:, None] * 5 // 4 + 1)
+    peak = np.argmax(np.where(near_first, search, -np.inf), axis=1)
+
+    # Parabolic interpolation around the integer peak for sub-sample lag precision.
+    rows = np.arange(len(peak))
+    left = search[rows, np.clip(peak - 1, 0, search.shape[1] - 1)]
+    centre = search[rows, peak]
+    right = search[rows, np.clip(peak + 1, 0, search.shape[1] - 1)]
+    denominator = left - 2 * centre + right
+    shift = np.where(np.abs(denominator) > 1e-9, 0.5 * (left - right) / denominator, 0.0)
+    lags = peak + min_lag + np.clip(shift, -0.5, 0.5)
+
+    voiced = strength >= voicing_threshold
+    return (sample_rate / lags[voiced]).astype(np.float32)
+
+
+def median_f0(audio: PCMBuffer) -> Optional[float]:
+    f0 = estimate_f0(audio.samples, audio.sample_rate)
+    if len(f0) < MIN_VOICED_FRAMES:
+        return None
+    return float(np.median(f0))
+
+
+def gender_from_f0(f0_hz: Optional[float]) -> str:
+    if f0_hz is None:
+        return UNKNOWN
+    return MALE if f0_hz < F0_GENDER_THRESHOLD_HZ else FEMALE
+
+
+def cluster_speakers(pitches: Sequence[Optional[float]]) -> list[Optional[int]]:
+    """Split chunks into at most two speaker clusters by log-F0 (exact 1-D 2-means).
+
+    Returns a cluster id per chunk (0 = lower voice, 1 = higher voice), or None
+    for chunks without a pitch estimate.
+    """
+    known = [(index, float(np.log(value))) for index, value in enumerate(pitches) if value]
+    labels: list[Optional[int]] = [None] * len(pitches)
+    if not known:
+        return labels
+    if len(known) == 1:
+        labels[known[0][0]] = 0
+        return labels
+
+    ordered = sorted(known, key=lambda item: item[1])
+    values = np.array([value for _, value in ordered])
+    prefix = np.cumsum(values)
+    prefix_sq = np.cumsum(values ** 2)
+    total, total_sq, count = prefix[-1], prefix_sq[-1], len(values)
+    splits = np.arange(1, count)
+    left_sse = prefix_sq[:-1] - prefix[:-1] ** 2 / splits
+    right_sse = (total_sq - prefix_sq[:-1]) - (total - prefix[:-1]) ** 2 / (count - splits)
+    split = int(np.argmin(left_sse + right_sse)) + 1
+    low_centre = values[:split].mean()
+    high_centre = values[split:].mean()
+
+    single_speaker = np.exp(high_centre - low_centre) < MIN_CLUSTER_SEPARATION
+    for position, (index, _) in enumerate(ordered):
+        labels[index] = 0 if single_speaker or position < split else 1
+    return labels
+
+
+class PitchGenderClassifier:
+    """Cheap F0-statistics speaker gender classifier.
+
+    With `cluster_speakers` enabled, chunks of one segment are grouped into at
+    most two voices and each group is labelled from its pooled pitch, so an
+    isolated octave error cannot flip a single line to the other speaker.
+    """
+
+    def __init__(self, cluster_speakers: bool = True):
+        self.cluster_speakers = cluster_speakers
+
+    def predict(self, audio: PCMBuffer) -> str:
+        return gender_from_f0(median_f0(audio))
+
+    def predict_many(self, chunks: Sequence[PCMBuffer]) -> list[str]:
+        pitches = [median_f0(chunk) for chunk in chunks]
+        if not self.cluster_speakers:
+            return [gender_from_f0(pitch) for pitch in pitches]
+
+        clusters = cluster_speakers(pitches)
+        cluster_labels: dict[int, str] = {}
+        for cluster in set(label for label in clusters if label is not None):
+            members = [pitch for pitch, label in zip(pitches, clusters) if label == cluster]
+            cluster_labels[cluster] = gender_from_f0(float(np.median(members)))
+        return [UNKNOWN if label is None else cluster_labels[label] for label in clusters]
@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SpooledUpload:
+    """An upload written to disk, with the sha256 and size computed while it was read."""
+
+    path: Path
+    content_hash: str
+    size: int
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+    def unlink(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+async def spool_upload(
+    file: UploadFile,
+    directory: Path,
+    max_bytes: int,
+    block_size: int = UPLOAD_BLOCK_SIZE,
+) -> SpooledUpload:
+    """Copy `file` to a temp file in `directory` block by block, hashing as it goes.
+
+    At most one block is held in memory. Uploads larger than `max_bytes` are
+    rejected with 413 as soon as the limit is crossed, and the partial file
+    is removed.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    suffix = Path(file.filename or "").suffix or ".mp3"
+    fd, name = tempfile.mkstemp(dir=directory, suffix=suffix)
+    path = Path(name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            while block := await file.read(block_size):
+                size += len(block)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Audio file is larger than {max_bytes // (1024 * 1024)} MB.",
+                    )
+                digest.update(block)
+                await asyncio.to_thread(handle.write, block)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return SpooledUpload(path=path, content_hash=digest.hexdigest(), size=size)
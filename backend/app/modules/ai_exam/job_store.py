@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Optional
+
+from app.modules.ai_exam.result_codec import encode_job_status
+from app.modules.ai_exam.schemas import AIExamResult, AIJobStatusResponse, AISplitSegment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_TTL_SEC = 24 * 60 * 60
+
+# KEYS: job hash, segments list. ARGV: mode, ttl, field count, field/value pairs..., segments...
+# "update" leaves an expired or deleted job gone; "replace" starts the job afresh. Running the
+# existence check and the writes in one script means an expiry in between cannot leave a
+# partial hash behind.
+_REDIS_WRITE_SCRIPT = """
+if ARGV[1] == "replace" then
+    redis.call("DEL", KEYS[1], KEYS[2])
+elseif redis.call("EXISTS", KEYS[1]) == 0 then
+    return 0
+end
+local field_args = 2 * tonumber(ARGV[3])
+if field_args > 0 then
+    redis.call("HSET", KEYS[1], unpack(ARGV, 4, 3 + field_args))
+end
+if #ARGV > 3 + field_args then
+    redis.call("RPUSH", KEYS[2], unpack(ARGV, 4 + field_args, #ARGV))
+end
+redis.call("HINCRBY", KEYS[1], "version", 1)
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+redis.call("EXPIRE", KEYS[2], ARGV[2])
+return 1
+"""
+
+
+class JobStore(ABC):
+    """State of AI exam jobs, keyed by job id; every write refreshes the job's TTL.
+
+    Every write also bumps the job's version, which pollers use as an ETag.
+    """
+
+    @abstractmethod
+    async def put(self, job: AIJobStatusResponse) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[AIJobStatusResponse]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_version(self, job_id: str) -> Optional[int]:
+        """The job's version without loading the job; None once it has expired."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_json(self, job_id: str) -> Optional[tuple[int, bytes]]:
+        """The job's version and its `AIJobStatusResponse` JSON."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update(
+        self,
+        job_id: str,
+        *,
+        status: Optional[str] = None,
+        progress_message: Optional[str] = None,
+        result: Optional[AIExamResult] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Set the given fields; a job that has expired or was deleted stays gone."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def append_segment(self, job_id: str, segment: AISplitSegment) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, job_id: str) -> None:
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local store for tests and single-worker setups; expired jobs are evicted on access."""
+
+    def __init__(self, ttl_sec: int = DEFAULT_JOB_TTL_SEC, clock: Callable[[], float] = time.monotonic):
+        self.ttl_sec = ttl_sec
+        self._clock = clock
+        self._jobs: dict[str, tuple[float, int, AIJobStatusResponse]] = {}
+        # JSON of each job at the version it was last encoded, so repeated polls are not re-serialised.
+        self._encoded: dict[str, tuple[int, bytes]] = {}
+
+    def _evict(self) -> None:
+        now = self._clock()
+        for job_id in [job_id for job_id, (expires, _, _) in self._jobs.items() if expires <= now]:
+            del self._jobs[job_id]
+            self._encoded.pop(job_id, None)
+
+    def _live(self, job_id: str) -> Optional[AIJobStatusResponse]:
+        self._evict()
+        entry = self._jobs.get(job_id)
+        return None if entry is None else entry[2]
+
+    def _touch(self, job: AIJobStatusResponse) -> None:
+        entry = self._jobs.get(job.job_id)
+        version = 1 if entry is None else entry[1] + 1
+        self._jobs[job.job_id] = (self._clock() + self.ttl_sec, version, job)
+
+    async def put(self, job: AIJobStatusResponse) -> None:
+        self._evict()
+        self._touch(job.model_copy(deep=True))
+
+    async def get(self, job_id: str) -> Optional[AIJobStatusResponse]:
+        job = self._live(job_id)
+        # A copy, so callers cannot change the stored state without a write.
+        return None if job is None else job.model_copy(deep=True)
+
+    async def get_version(self, job_id: str) -> Optional[int]:
+        self._evict()
+        entry = self._jobs.get(job_id)
+        return None if entry is None else entry[1]
+
+    async def get_json(self, job_id: str) -> Optional[tuple[int, bytes]]:
+        self._evict()
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return None
+        encoded = self._encoded.get(job_id)
+        if encoded is None or encoded[0] != entry[1]:
+            encoded = self._encoded[job_id] = (entry[1], entry[2].model_dump_json().encode("utf-8"))
+        return encoded
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        job = self._live(job_id)
+        if job is None:
+            return
+        for name, value in fields.items():
+            if value is not None:
+                setattr(job, name, value)
+        self._touch(job)
+
+    async def append_segment(self, job_id: str, segment: AISplitSegment) -> None:
+        job = self._live(job_id)
+        if job is None:
+            return
+        job.partial_segments.append(segment)
+        self._touch(job)
+
+    async def delete(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        self._encoded.pop(job_id, None)
+
+
+class RedisJobStore(JobStore):
+    """Job state shared by every API worker, kept in Redis and expired by Redis.
+
+    A job is a hash of its scalar fields (the result as JSON) plus a list of
+    partial segments, so progress writes and segment appends never rewrite
+    the whole job.
+    """
+
+    def __init__(self, url: str, ttl_sec: int = DEFAULT_JOB_TTL_SEC, prefix: str = "ai_exam:job:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError("redis is not installed. Run: pip install redis") from exc
+        self.ttl_sec = ttl_sec
+        self.prefix = prefix
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self._write_script = self._redis.register_script(_REDIS_WRITE_SCRIPT)
+
+    def _keys(self, job_id: str) -> tuple[str, str]:
+        key = f"{self.prefix}{job_id}"
+        return key, f"{key}:segments"
+
+    async def _write(
+        self,
+        job_id: str,
+        fields: dict[str, str],
+        segments: tuple[str, ...] = (),
+        replace: bool = False,
+    ) -> None:
+        field_args = [item for pair in fields.items() for item in pair]
+        await self._write_script(
+            keys=list(self._keys(job_id)),
+            args=["replace" if replace else "update", self.ttl_sec, len(fields), *field_args, *segments],
+        )
+
+    async def put(self, job: AIJobStatusResponse) -> None:
+        fields = {"status": job.status, "progress_message": job.progress_message}
+        if job.result is not None:
+            fields["result"] = job.result.model_dump_json()
+        if job.error is not None:
+            fields["error"] = job.error
+        await self._write(
+            job.job_id,
+            fields,
+            tuple(segment.model_dump_json() for segment in job.partial_segments),
+            replace=True,
+        )
+
+    async def _load(self, job_id: str) -> tuple[dict, list[str]]:
+        """The job's fields and segments; no fields when the job is gone or only a partial hash is left."""
+        key, segments_key = self._keys(job_id)
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.hgetall(key)
+        pipe.lrange(segments_key, 0, -1)
+        fields, segments = await pipe.execute()
+        if "status" not in fields:
+            return {}, []
+        return fields, segments
+
+    async def get(self, job_id: str) -> Optional[AIJobStatusResponse]:
+        fields, segments = await self._load(job_id)
+        if not fields:
+            return None
+        return AIJobStatusResponse(
+            job_id=job_id,
+            status=fields["status"],
+            progress_message=fields.get("progress_message", ""),
+            partial_segments=[AISplitSegment.model_validate_json(segment) for segment in segments],
+            result=AIExamResult.model_validate_json(fields["result"]) if fields.get("result") else None,
+            error=fields.get("error"),
+        )
+
+    async def get_version(self, job_id: str) -> Optional[int]:
+        status, version = await self._redis.hmget(self._keys(job_id)[0], "status", "version")
+        return None if status is None or version is None else int(version)
+
+    async def get_json(self, job_id: str) -> Optional[tuple[int, bytes]]:
+        fields, segments = await self._load(job_id)
+        if not fields:
+            return None
+        # The result and segments are stored as JSON and spliced in without being parsed.
+        result = fields.get("result")
+        body = encode_job_status(
+            job_id,
+            fields["status"],
+            fields.get("progress_message", ""),
+            result=result.encode("utf-8") if result else None,
+            partial_segments=[segment.encode("utf-8") for segment in segments],
+            error=fields.get("error"),
+        )
+        return int(fields.get("version", 0)), body
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        values = {
+            name: value.model_dump_json() if isinstance(value, AIExamResult) else value
+            for name, value in fields.items()
+            if value is not None
+        }
+        await self._write(job_id, values)
+
+    async def append_segment(self, job_id: str, segment: AISplitSegment) -> None:
+        await self._write(job_id, {}, (segment.model_dump_json(),))
+
+    async def delete(self, job_id: str) -> None:
+        await self._redis.delete(*self._keys(job_id))
+
+
+def create_job_store(backend: str, redis_url: Optional[str], ttl_sec: int) -> JobStore:
+    if backend == "redis":
+        if not redis_url:
+            raise RuntimeError("AI_EXAM_JOB_STORE=redis needs REDIS_URL.")
+        return RedisJobStore(redis_url, ttl_sec=ttl_sec)
+    if backend == "memory":
+        return InMemoryJobStore(ttl_sec=ttl_sec)
+    raise ValueError(f"Unknown AI job store {backend!r}; expected 'memory' or 'redis'.")
+
+
+class ProgressWriter:
+    """Forward progress from the pipeline thread to async writers without blocking it.
+
+    `progress()` and `segment()` only record the value and, if no flush is
+    pending, schedule one on the event loop. While a write is in flight, newer
+    progress messages replace older unwritten ones, so a slow store sees at
+    most one write per message burst; segments are all written, in order.
+    Write errors are logged and dropped: progress is advisory.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        write_progress: Callable[[str], Awaitable[None]],
+        write_segment: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ):
+        self._loop = loop
+        self._write_progress = write_progress
+        self._write_segment = write_segment
+        self._lock = threading.Lock()
+        self._latest: Optional[str] = None
+        self._segments: list[Any] = []
+        self._scheduled = False
+        self._task: Optional[asyncio.Task] = None
+
+    def progress(self, message: str) -> None:
+        with self._lock:
+            self._latest = message
+            self._schedule()
+
+    def segment(self, segment: Any) -> None:
+        with self._lock:
+            self._segments.append(segment)
+            self._schedule()
+
+    def _schedule(self) -> None:
+        if not self._scheduled:
+            self._scheduled = True
+            self._loop.call_soon_threadsafe(self._start)
+
+    def _start(self) -> None:
+        self._task = self._loop.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        while True:
+            with self._lock:
+                message, self._latest = self._latest, None
+                segments, self._segments = self._segments, []
+                if message is None and not segments:
+                    self._scheduled = False
+                    return
+            try:
+                if self._write_segment is not None:
+                    for segment in segments:
+                        await self._write_segment(segment)
+                if message is not None:
+                    await self._write_progress(message)
+            except Exception as exc:
+                logger.warning("Dropped an AI job progress update: %s", exc)
+
+    async def aclose(self) -> None:
+        """Wait until everything recorded so far has been written."""
+        while True:
+            # Let a flush scheduled from another thread create its task first.
+            await asyncio.sleep(0)
+            with self._lock:
+                if not self._scheduled:
+                    return
+            if self._task is not None:
+                await self._task
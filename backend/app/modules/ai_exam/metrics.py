@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _current_rss_mb() -> Optional[float]:
+    """Resident set size right now (Linux only); unlike ru_maxrss it can go down again."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class PipelineMetrics:
+    """Wall time, CPU time and RSS growth per pipeline stage, plus counters, for one AI job.
+
+    Stages may repeat (one ASR batch after another) and accumulate, and may
+    nest (gender inside ASR). `cpu_seconds` is process-wide, so it also
+    includes stages running concurrently on other threads; `thread_cpu_seconds`
+    covers only the measuring thread and misses native worker threads.
+    `rss_delta_mb` is the change in resident memory from start to end of the
+    stage, summed over its calls (None where current RSS cannot be read); the
+    process-wide high-water mark is reported once, as the top-level `peak_rss_mb`.
+    """
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+        self.counters: dict[str, int] = {}
+        self.events: dict[str, list[dict]] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        wall, cpu, thread_cpu = time.perf_counter(), time.process_time(), time.thread_time()
+        rss = _current_rss_mb()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            thread_cpu = time.thread_time() - thread_cpu
+            end_rss = _current_rss_mb()
+            rss_delta = None if rss is None or end_rss is None else end_rss - rss
+            with self._lock:
+                entry = self.stages.setdefault(
+                    name,
+                    {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "thread_cpu_seconds": 0.0, "rss_delta_mb": None},
+                )
+                entry["calls"] += 1
+                entry["wall_seconds"] += wall
+                entry["cpu_seconds"] += cpu
+                entry["thread_cpu_seconds"] += thread_cpu
+                if rss_delta is not None:
+                    entry["rss_delta_mb"] = (entry["rss_delta_mb"] or 0.0) + rss_delta
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name: str, event: dict) -> None:
+        with self._lock:
+            self.events.setdefault(name, []).append(event)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total_wall_seconds": round(time.perf_counter() - self._started, 3),
+                "peak_rss_mb": None if (peak := _peak_rss_mb()) is None else round(peak, 1),
+                "stages": {
+                    name: {
+                        key: round(value, 3) if isinstance(value, float) else value
+                        for key, value in entry.items()
+                    }
+                    for name, entry in self.stages.items()
+                },
+                "counters": dict(self.counters),
+                **{name: list(events) for name, events in self.events.items()},
+            }
+
+
+_current: ContextVar[Optional[PipelineMetrics]] = ContextVar("ai_exam_pipeline_metrics", default=None)
+
+
+@contextmanager
+def collecting(metrics: PipelineMetrics) -> Iterator[PipelineMetrics]:
+    """Make `metrics` the target of `stage`/`count`/`record` in this context."""
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def stage(name: str) -> ContextManager[None]:
+    metrics = _current.get()
+    return nullcontext() if metrics is None else metrics.stage(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def record(name: str, event: dict) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record(name, event)
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, LargeBinary, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -25,9 +25,11 @@ class AIExamCache(Base):
     pipeline_version = Column(String(100), nullable=False)
     cloudinary_public_id = Column(String(255), nullable=True)
     cloudinary_format = Column(String(20), nullable=True)
-    result_json = Column(Text, nullable=True)
+    result_json = Column(Text, nullable=True)  # legacy rows only; new results go to result_blob
+    result_blob = Column(LargeBinary, nullable=True)  # zlib-compressed AIExamResult JSON
     progress_message = Column(Text, nullable=True)
     error_message = Column(Text, nullable=True)
+    metrics_json = Column(Text, nullable=True)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -0,0 +1,204 @@
+import io
+import logging
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ASR_SAMPLE_RATE = 16000
+
+# An upload in memory, or a file on disk (e.g. the spooled upload) that is read by the decoder.
+AudioSource = Union[bytes, Path]
+
+
+def _soundfile_input(source: AudioSource):
+    return str(source) if isinstance(source, Path) else io.BytesIO(source)
+
+
+def _decode_with_soundfile(audio_bytes: AudioSource) -> tuple[np.ndarray, int]:
+    import soundfile as sf
+
+    samples, sample_rate = sf.read(_soundfile_input(audio_bytes), dtype="float32", always_2d=True)
+    return samples.mean(axis=1, dtype=np.float32), int(sample_rate)
+
+
+def _decode_with_ffmpeg(audio_bytes: AudioSource, sample_rate: int) -> np.ndarray:
+    from_file = isinstance(audio_bytes, Path)
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-i",
+        str(audio_bytes) if from_file else "pipe:0",
+        "-f",
+        "f32le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        "pipe:1",
+    ]
+    try:
+        process = subprocess.run(
+            command, input=None if from_file else audio_bytes, capture_output=True, check=False
+        )
+    except FileNotFoundError as exc:
+        raise RuntimeError("ffmpeg is required to decode this audio format.") from exc
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {process.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(process.stdout, dtype=np.float32)
+
+
+def decode_audio_bytes(audio_bytes: AudioSource, sample_rate: int = ASR_SAMPLE_RATE) -> np.ndarray:
+    """Decode an upload (bytes, or a file path read directly) to mono float32 PCM at `sample_rate`."""
+    try:
+        samples, source_rate = _decode_with_soundfile(audio_bytes)
+    except Exception as exc:
+        logger.debug("soundfile could not decode upload (%s); falling back to ffmpeg.", exc)
+        return _decode_with_ffmpeg(audio_bytes, sample_rate)
+
+    if source_rate != sample_rate:
+        import soxr
+
+        samples = soxr.resample(samples, source_rate, sample_rate)
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+def _iter_soundfile_blocks(audio_bytes: AudioSource, sample_rate: int, block_size: int) -> Iterator[np.ndarray]:
+    import soundfile as sf
+    import soxr
+
+    with sf.SoundFile(_soundfile_input(audio_bytes)) as source:
+        resampler = None
+        if source.samplerate != sample_rate:
+            resampler = soxr.ResampleStream(source.samplerate, sample_rate, 1, dtype="float32")
+        for block in source.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1, dtype=np.float32)
+            if resampler is not None:
+                mono = resampler.resample_chunk(mono)
+            if len(mono):
+                yield np.ascontiguousarray(mono, dtype=np.float32)
+        if resampler is not None:
+            tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            if len(tail):
+                yield np.ascontiguousarray(tail, dtype=np.float32)
+
+
+def _iter_ffmpeg_blocks(audio_bytes: AudioSource, sample_rate: int, block_size: int) -> Iterator[np.ndarray]:
+    import contextlib
+    import tempfile
+
+    # ffmpeg reads the upload from a file so stdout can be consumed block by block
+    # without a writer thread feeding stdin; bytes are written to a temp file first.
+    with contextlib.ExitStack() as stack:
+        if isinstance(audio_bytes, Path):
+            input_path = str(audio_bytes)
+        else:
+            tmp = stack.enter_context(tempfile.NamedTemporaryFile())
+            tmp.write(audio_bytes)
+            tmp.flush()
+            input_path = tmp.name
+        command = [
+            "ffmpeg",
+            "-nostdin",
+            "-loglevel",
+            "error",
+            "-i",
+            input_path,
+            "-f",
+            "f32le",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "pipe:1",
+        ]
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError as exc:
+            raise RuntimeError("ffmpeg is required to decode this audio format.") from exc
+        try:
+            while True:
+                data = process.stdout.read(block_size * 4)
+                if not data:
+                    break
+                yield np.frombuffer(data[: len(data) // 4 * 4], dtype=np.float32)
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError(f"Failed to decode audio: {stderr.decode(errors='ignore').strip()}")
+
+
+def iter_decoded_blocks(
+    audio_bytes: AudioSource,
+    sample_rate: int = ASR_SAMPLE_RATE,
+    block_size: int = ASR_SAMPLE_RATE * 30,
+) -> Iterator[np.ndarray]:
+    """Decode an upload incrementally, yielding mono float32 blocks at `sample_rate`."""
+    try:
+        import soundfile as sf
+
+        sf.info(_soundfile_input(audio_bytes))
+    except Exception as exc:
+        logger.debug("soundfile cannot stream upload (%s); falling back to ffmpeg.", exc)
+        yield from _iter_ffmpeg_blocks(audio_bytes, sample_rate, block_size)
+        return
+    yield from _iter_soundfile_blocks(audio_bytes, sample_rate, block_size)
+
+
+@dataclass(frozen=True)
+class PCMBuffer:
+    """Mono float32 PCM shared by the splitter, the VAD and the ASR.
+
+    Slicing returns NumPy views, so cutting a segment or a silence chunk never
+    copies or re-decodes the underlying audio.
+    """
+
+    samples: np.ndarray
+    sample_rate: int = ASR_SAMPLE_RATE
+    offset_ms: int = 0
+
+    @classmethod
+    def from_bytes(cls, audio_bytes: AudioSource, sample_rate: int = ASR_SAMPLE_RATE) -> "PCMBuffer":
+        return cls(samples=decode_audio_bytes(audio_bytes, sample_rate), sample_rate=sample_rate)
+
+    @property
+    def duration_ms(self) -> int:
+        return int(len(self.samples) * 1000 // self.sample_rate)
+
+    def __len__(self) -> int:
+        return self.duration_ms
+
+    def ms_to_samples(self, ms: int) -> int:
+        return int(round(ms * self.sample_rate / 1000))
+
+    def slice_ms(self, start_ms: int, end_ms: Optional[int] = None) -> "PCMBuffer":
+        start = max(0, self.ms_to_samples(start_ms))
+        end = len(self.samples) if end_ms is None else min(len(self.samples), self.ms_to_samples(end_ms))
+        return PCMBuffer(
+            samples=self.samples[start:max(start, end)],
+            sample_rate=self.sample_rate,
+            offset_ms=self.offset_ms + int(start_ms),
+        )
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        for start in range(0, len(self.samples), block_size):
+            yield self.samples[start:start + block_size]
+
+    def to_int16(self) -> np.ndarray:
+        return (np.clip(self.samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+    def to_wav_bytes(self) -> bytes:
+        import soundfile as sf
+
+        buffer = io.BytesIO()
+        sf.write(buffer, self.samples, self.sample_rate, format="WAV", subtype="PCM_16")
+        return buffer.getvalue()
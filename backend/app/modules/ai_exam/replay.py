@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Optional, Sequence, Union
+
+from app.modules.ai_exam.service import AIExamService, SplitAudioChunk, _parse_formatted_segment
+
+logger = logging.getLogger(__name__)
+
+# Question fields compared by the replay; audio URLs depend on Cloudinary, not on the text rules.
+COMPARED_FIELDS = ("mondai_group", "question_number", "introduction", "script_text", "question_text", "difficulty")
+
+CachedRow = tuple[str, Optional[str], str, Union[str, bytes]]
+
+
+def rebuild_split_segments(result: dict) -> list[SplitAudioChunk]:
+    """Split segments of a stored `AIExamResult`, re-parsed with the current text rules."""
+    timestamped = {
+        question.get("source_segment_index"): question.get("source_transcript") or ""
+        for question in result.get("questions", [])
+    }
+    segments: list[SplitAudioChunk] = []
+    for stored in result.get("split_segments", []):
+        raw_text = stored.get("transcript") or ""
+        formatted_text = stored.get("refined_transcript") or raw_text
+        introduction, script_text, question_texts, spoken_number, announced_mondai_number = _parse_formatted_segment(
+            formatted_text,
+            raw_text,
+        )
+        segments.append(
+            SplitAudioChunk(
+                segment_index=stored["segment_index"],
+                file_name=stored.get("file_name", ""),
+                start_ms=int(round(stored["start_time"] * 1000)),
+                end_ms=int(round(stored["end_time"] * 1000)),
+                transcript=raw_text,
+                timestamped_transcript=timestamped.get(stored["segment_index"], ""),
+                refined_transcript=formatted_text,
+                introduction=introduction,
+                script_text=script_text,
+                question_texts=question_texts,
+                spoken_question_number=spoken_number,
+                announced_mondai_number=announced_mondai_number,
+            )
+        )
+    return segments
+
+
+def _question_key(question: dict) -> tuple:
+    return question.get("source_segment_index"), question.get("source_question_index")
+
+
+def diff_questions(old_questions: Sequence[dict], new_questions: Sequence[dict]) -> list[dict]:
+    """Field-level changes between two question lists, matched by their source segment."""
+    old_by_key = {_question_key(question): question for question in old_questions}
+    new_by_key = {_question_key(question): question for question in new_questions}
+    changes: list[dict] = []
+    for key in [*old_by_key, *(key for key in new_by_key if key not in old_by_key)]:
+        old, new = old_by_key.get(key), new_by_key.get(key)
+        if old is None or new is None:
+            changes.append({"source_segment_index": key[0], "field": "question", "old": old, "new": new})
+            continue
+        for name in COMPARED_FIELDS:
+            if old.get(name) != new.get(name):
+                changes.append({"source_segment_index": key[0], "field": name, "old": old.get(name), "new": new.get(name)})
+        old_answers = [(answer.get("label"), answer.get("content")) for answer in old.get("answers", [])]
+        new_answers = [(answer.get("label"), answer.get("content")) for answer in new.get("answers", [])]
+        if old_answers != new_answers:
+            changes.append({"source_segment_index": key[0], "field": "answers", "old": old_answers, "new": new_answers})
+    return changes
+
+
+def replay_result(result: dict, jlpt_level: str) -> dict:
+    """Re-run the structuring, question and timestamp stages on a stored result."""
+    split_segments = rebuild_split_segments(result)
+    structured = AIExamService._build_structured_segments(split_segments, jlpt_level=jlpt_level)
+    questions = AIExamService._build_questions(structured, split_segments)
+    timestamps = AIExamService._build_timestamps(questions)
+    return {
+        "questions": [question.model_dump(mode="json") for question in questions],
+        "timestamps": [timestamp.model_dump(mode="json") for timestamp in timestamps],
+    }
+
+
+def _timestamp_outline(timestamps: Sequence[dict]) -> list[tuple[int, list[int]]]:
+    return [
+        (group.get("mondai_number"), [question.get("question_number") for question in group.get("questions", [])])
+        for group in timestamps or []
+    ]
+
+
+def replay_rows(rows: Sequence[CachedRow]) -> list[dict]:
+    """Replay a batch of `(cache_id, source_filename, jlpt_level, result_json)` rows in a worker."""
+    reports: list[dict] = []
+    for cache_id, source_filename, jlpt_level, result_json in rows:
+        report = {"cache_id": cache_id, "source_filename": source_filename, "jlpt_level": jlpt_level}
+        try:
+            stored = json.loads(result_json)
+            replayed = replay_result(stored, jlpt_level)
+        except Exception as exc:
+            report["error"] = f"{type(exc).__name__}: {exc}"
+            reports.append(report)
+            continue
+        report["questions"] = len(replayed["questions"])
+        report["changes"] = diff_questions(stored.get("questions", []), replayed["questions"])
+        old_outline = _timestamp_outline(stored.get("timestamps"))
+        new_outline = _timestamp_outline(replayed["timestamps"])
+        if old_outline != new_outline:
+            report["timestamps"] = {"old": old_outline, "new": new_outline}
+        reports.append(report)
+    return reports
+
+
+async def _iter_cached_rows(batch_size: int, limit: Optional[int]) -> AsyncIterator[list[CachedRow]]:
+    from sqlalchemy import or_, select
+
+    from app.db.session import AsyncSessionLocal
+    from app.modules.ai_exam.models import AIExamCache
+    from app.modules.ai_exam.result_codec import stored_result_bytes
+
+    # Core columns only, so the other ORM models never need to be imported.
+    table = AIExamCache.__table__
+    query = (
+        select(
+            table.c.cache_id, table.c.source_filename, table.c.jlpt_level, table.c.result_blob, table.c.result_json
+        )
+        .where(table.c.status == "completed", or_(table.c.result_blob.is_not(None), table.c.result_json.is_not(None)))
+        .order_by(table.c.created_at)
+        .execution_options(yield_per=batch_size)
+    )
+    if limit:
+        query = query.limit(limit)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions(batch_size):
+            yield [
+                (str(cache_id), filename, level, stored_result_bytes(result_blob, result_json))
+                for cache_id, filename, level, result_blob, result_json in partition
+            ]
+
+
+async def replay_cache(
+    report_path: Path,
+    workers: int = 0,
+    batch_size: int = 50,
+    limit: Optional[int] = None,
+    include_unchanged: bool = False,
+) -> dict:
+    """Stream completed cache rows through a process pool and write a JSON-lines diff report.
+
+    At most two batches per worker are in flight, so memory stays bounded no
+    matter how many cached jobs there are.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = {"jobs": 0, "changed": 0, "failed": 0, "changes": 0}
+    loop = asyncio.get_running_loop()
+    in_flight: list[asyncio.Future] = []
+
+    def write(reports: list[dict], handle) -> None:
+        for report in reports:
+            summary["jobs"] += 1
+            if "error" in report:
+                summary["failed"] += 1
+            elif report["changes"] or "timestamps" in report:
+                summary["changed"] += 1
+                summary["changes"] += len(report["changes"])
+            elif not include_unchanged:
+                continue
+            handle.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        with Path(report_path).open("w", encoding="utf-8") as handle:
+            async for rows in _iter_cached_rows(batch_size, limit):
+                in_flight.append(loop.run_in_executor(executor, replay_rows, rows))
+                if len(in_flight) >= workers * 2:
+                    write(await in_flight.pop(0), handle)
+            for future in in_flight:
+                write(await future, handle)
+    logger.info("Replayed %s cached AI exam job(s): %s changed.", summary["jobs"], summary["changed"])
+    return summary
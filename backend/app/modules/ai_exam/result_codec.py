@@ -0,0 +1,68 @@
+import json
+import zlib
+from typing import Optional, Sequence
+
+from app.modules.ai_exam.models import AIExamCache
+from app.modules.ai_exam.schemas import AIExamResult
+
+COMPRESSION_LEVEL = 6
+
+
+def compress_result(result: AIExamResult) -> bytes:
+    """The result's JSON, zlib-compressed for `AIExamCache.result_blob`."""
+    return zlib.compress(result.model_dump_json().encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def stored_result_bytes(result_blob: Optional[bytes], result_json: Optional[str]) -> Optional[bytes]:
+    """The stored result as JSON bytes, from the compressed column or a legacy text row."""
+    if result_blob:
+        return zlib.decompress(result_blob)
+    if result_json:
+        return result_json.encode("utf-8")
+    return None
+
+
+def store_result(cache: AIExamCache, result: AIExamResult) -> None:
+    cache.result_blob = compress_result(result)
+    cache.result_json = None
+
+
+def has_result(cache: AIExamCache) -> bool:
+    return bool(cache.result_blob or cache.result_json)
+
+
+def load_result(cache: AIExamCache) -> Optional[AIExamResult]:
+    encoded = stored_result_bytes(cache.result_blob, cache.result_json)
+    return None if encoded is None else AIExamResult.model_validate_json(encoded)
+
+
+def encode_job_status(
+    job_id: str,
+    status: str,
+    progress_message: str = "",
+    result: Optional[bytes] = None,
+    partial_segments: Sequence[bytes] = (),
+    error: Optional[str] = None,
+) -> bytes:
+    """`AIJobStatusResponse` JSON built around already encoded result and segment JSON.
+
+    The result is spliced in as is, so serving a stored result never parses
+    or re-serialises it.
+    """
+    return b"".join(
+        (
+            b'{"job_id":',
+            json.dumps(job_id).encode("utf-8"),
+            b',"status":',
+            json.dumps(status).encode("utf-8"),
+            b',"progress_message":',
+            json.dumps(progress_message, ensure_ascii=False).encode("utf-8"),
+            b',"partial_segments":[',
+            b",".join(partial_segments),
+            b'],"result":',
+            result if result is not None else b"null",
+            b',"error":',
+            json.dumps(error, ensure_ascii=False).encode("utf-8"),
+            b"}",
+        )
+    )
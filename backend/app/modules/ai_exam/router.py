@@ -2,19 +2,39 @@ import uuid
 import json
 import hashlib
 import logging
+import time
 from typing import Optional
 from pathlib import Path
 
-from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks, HTTPException, Depends, Header, Response
+from fastapi.responses import FileResponse
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import BASE_DIR, get_settings
 from app.db.session import AsyncSessionLocal, get_db
-from app.core.security import get_current_user
+from app.core.security import RoleChecker, get_current_user
 from app.modules.users.models import User
 from app.modules.audio.models import Audio
+from app.modules.ai_exam.clip_store import LocalClipStorage, create_clip_storage
+from app.modules.ai_exam.fingerprint import (
+    FINGERPRINT_VERSION,
+    decode_and_fingerprint,
+    index_fingerprint,
+    reuse_near_duplicate,
+)
+from app.modules.ai_exam.ingest import SpooledUpload, spool_upload
+from app.modules.ai_exam.job_store import ProgressWriter, create_job_store
+from app.modules.ai_exam.metrics import PipelineMetrics
 from app.modules.ai_exam.models import AIExamCache
+from app.modules.ai_exam.result_codec import (
+    encode_job_status,
+    has_result,
+    load_result,
+    store_result,
+    stored_result_bytes,
+)
 from app.modules.exam.models import Exam
 from app.modules.questions.models import Question, Answer
 from app.modules.ai_exam.schemas import (
@@ -26,9 +46,16 @@ from app.modules.ai_exam.service import AIExamService
 router = APIRouter(prefix="/ai", tags=["ai"])
 logger = logging.getLogger(__name__)
 
-_jobs: dict[str, AIJobStatusResponse] = {}
+settings = get_settings()
+_jobs = create_job_store(settings.AI_EXAM_JOB_STORE, settings.REDIS_URL, settings.AI_EXAM_JOB_TTL_SEC)
+_clips = create_clip_storage(
+    settings.AI_EXAM_CLIP_STORAGE,
+    BASE_DIR / settings.AI_EXAM_CLIP_DIR,
+    f"{settings.API_PREFIX}/ai/clips",
+)
 
 # Eagerly load the AI Service and its ASR model at server startup
+# (an AI_EXAM_ASR_WORKERS pool only starts its processes with the first job).
 try:
     _service: Optional[AIExamService] = AIExamService()
     logger.info("AIExamService eagerly initialized at startup.")
@@ -56,10 +83,6 @@ def _normalize_mondai_config(mondai_config: Optional[list]) -> str:
     return json.dumps(normalized, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
 
 
-def _compute_content_hash(audio_bytes: bytes) -> str:
-    return hashlib.sha256(audio_bytes).hexdigest()
-
-
 def _compute_cache_key(
     content_hash: str,
     jlpt_level: str,
@@ -87,6 +110,22 @@ def _job_from_result(job_id: str, result: AIExamResult, progress_message: str) -
     )
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _json_response(body: bytes, etag: str) -> Response:
+    # `no-cache` makes browsers revalidate every poll with If-None-Match instead of reusing a stale copy.
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
 def _build_draft_title(jlpt_level: str, exam_title: str, filename: str) -> str:
     base_title = (exam_title or "").strip()
     if not base_title:
@@ -152,51 +191,109 @@ async def _run_pipeline(
     job_id: str,
     cache_id: str,
     content_hash: str,
-    audio_bytes: bytes,
+    upload: SpooledUpload,
     filename: str,
     jlpt_level: str,
     mondai_config: Optional[list],
     user_id: Optional[int] = None,
     exam_title: str = "",
 ):
-    """Background task: run split-first AI pipeline and update job store."""
-    from app.shared.upload import upload_audio_bytes
+    """Background task: run split-first AI pipeline and update job store; removes the spooled upload."""
+    try:
+        await _run_spooled_pipeline(
+            job_id, cache_id, content_hash, upload, filename, jlpt_level, mondai_config, user_id, exam_title
+        )
+    finally:
+        upload.unlink()
+
+
+async def _run_spooled_pipeline(
+    job_id: str,
+    cache_id: str,
+    content_hash: str,
+    upload: SpooledUpload,
+    filename: str,
+    jlpt_level: str,
+    mondai_config: Optional[list],
+    user_id: Optional[int],
+    exam_title: str,
+):
+    from app.shared.upload import submit_audio_upload
     from app.modules.notifications.service import create_notification
 
-    job = _jobs.get(job_id)
-    if not job:
+    import asyncio
+
+    if await _jobs.get(job_id) is None:
         return
 
+    metrics = PipelineMetrics()
+    # The pipeline thread only hands messages over; the writer coalesces them into job store writes.
+    progress = ProgressWriter(
+        asyncio.get_running_loop(),
+        lambda message: _jobs.update(job_id, progress_message=message),
+        lambda segment: _jobs.append_segment(job_id, segment),
+    )
     try:
-        job.status = "processing"
-
-        def set_progress(message: str) -> None:
-            current = _jobs.get(job_id)
-            if current:
-                current.progress_message = message
-
-        set_progress("Step 1/7: Uploading raw audio to Cloudinary...")
-        cloudinary_res = await upload_audio_bytes(
-            audio_bytes,
-            filename,
-            public_id=content_hash,
+        audio_input = None
+        fingerprint = None
+        if settings.AI_EXAM_FINGERPRINT_DEDUP:
+            await _jobs.update(
+                job_id,
+                status="processing",
+                progress_message="Step 1/7: Fingerprinting audio to look for near-duplicate uploads...",
+            )
+            # Decoded straight from the spool file, never loaded into memory as bytes.
+            audio_input, fingerprint = await asyncio.to_thread(decode_and_fingerprint, upload.path, metrics)
+            async with AsyncSessionLocal() as db:
+                cache = await db.get(AIExamCache, uuid.UUID(cache_id))
+                reused = None
+                if cache is not None:
+                    reused = await reuse_near_duplicate(
+                        db, cache, fingerprint, settings.AI_EXAM_FINGERPRINT_MIN_CONFIDENCE
+                    )
+                if reused is not None:
+                    message = cache.progress_message
+                    cache.metrics_json = json.dumps(metrics.to_dict())
+                    await db.commit()
+                    await _jobs.update(job_id, status="done", progress_message=message, result=reused)
+                    return
+
+        await _jobs.update(
+            job_id,
+            status="processing",
+            progress_message="Step 1/7: Uploading raw audio to Cloudinary in the background...",
+        )
+        # Bell detection and ASR start right away; the pipeline joins the upload at Step 7.
+        upload_started = time.perf_counter()
+        cloudinary_upload = submit_audio_upload(str(upload.path), filename, public_id=content_hash)
+        cloudinary_upload.add_done_callback(
+            lambda _: metrics.record("upload", {"wall_seconds": round(time.perf_counter() - upload_started, 3)})
         )
-        public_id = cloudinary_res.get("public_id")
-        fmt = cloudinary_res.get("format", "mp3")
 
         svc = get_service()
 
-        import asyncio
-        result: AIExamResult = await asyncio.to_thread(
-            svc.generate,
-            audio_bytes,
-            filename,
-            jlpt_level,
-            mondai_config,
-            public_id,
-            fmt,
-            set_progress,
-        )
+        def generate() -> AIExamResult:
+            # Either the PCM decoded for fingerprinting or the spool file, which the decoder reads itself.
+            return svc.generate(
+                audio_input if audio_input is not None else upload.path,
+                filename,
+                jlpt_level,
+                mondai_config,
+                None,
+                "mp3",
+                progress.progress,
+                progress.segment,
+                content_hash=content_hash,
+                pipeline_metrics=metrics,
+                cloudinary_upload=cloudinary_upload,
+                clip_source=upload.path,
+            )
+
+        result: AIExamResult = await asyncio.to_thread(generate)
+        await progress.aclose()
+        cloudinary_res = await asyncio.wrap_future(cloudinary_upload)
+        public_id = cloudinary_res.get("public_id")
+        fmt = cloudinary_res.get("format", "mp3")
 
         async with AsyncSessionLocal() as db:
             cache = await db.get(AIExamCache, uuid.UUID(cache_id))
@@ -224,6 +321,8 @@ async def _run_pipeline(
                 audio.ai_status = "completed"
                 audio.ai_model = svc.model_name
                 audio.raw_transcript = result.raw_transcript
+            if fingerprint is not None and audio.fingerprint_version != FINGERPRINT_VERSION:
+                await index_fingerprint(db, audio, fingerprint)
 
             cache.audio_id = audio.audio_id
             result.audio_id = str(audio.audio_id)
@@ -247,13 +346,17 @@ async def _run_pipeline(
                     result=result,
                 )
                 result.draft_exam_id = str(draft_exam.exam_id)
-            cache.result_json = result.model_dump_json()
+            store_result(cache, result)
+            cache.metrics_json = json.dumps(metrics.to_dict())
             cache.error_message = None
             await db.commit()
 
-        job.status = "done"
-        job.progress_message = f"Done! Generated {len(result.questions)} questions and saved a draft exam."
-        job.result = result
+        await _jobs.update(
+            job_id,
+            status="done",
+            progress_message=f"Done! Generated {len(result.questions)} questions and saved a draft exam.",
+            result=result,
+        )
 
         if user_id:
             title_display = exam_title or filename
@@ -273,10 +376,10 @@ async def _run_pipeline(
                 cache.status = "failed"
                 cache.progress_message = "Pipeline failed."
                 cache.error_message = str(exc)
+                cache.metrics_json = json.dumps(metrics.to_dict())
                 await db.commit()
-        job.status = "failed"
-        job.error = str(exc)
-        job.progress_message = "Pipeline failed."
+        await progress.aclose()
+        await _jobs.update(job_id, status="failed", error=str(exc), progress_message="Pipeline failed.")
 
         if user_id:
             await create_notification(
@@ -315,107 +418,124 @@ async def generate_exam_from_audio(
             detail=f"File must be audio (mp3/wav/ogg). Got: {file.content_type}"
         )
 
-    audio_bytes = await file.read()
-    filename = file.filename or "audio.mp3"
-    svc = get_service()
-    content_hash = _compute_content_hash(audio_bytes)
-    mondai_config = None
-    cache_key = _compute_cache_key(
-        content_hash,
-        jlpt_level,
-        mondai_config,
-        svc.model_name,
-        svc.pipeline_version,
+    upload = await spool_upload(
+        file,
+        BASE_DIR / settings.AI_EXAM_UPLOAD_SPOOL_DIR,
+        max_bytes=settings.AI_EXAM_UPLOAD_MAX_MB * 1024 * 1024,
     )
+    # The spooled file belongs to the background task once it is scheduled; otherwise drop it here.
+    scheduled = False
+    try:
+        filename = file.filename or "audio.mp3"
+        svc = get_service()
+        content_hash = upload.content_hash
+        mondai_config = None
+        cache_key = _compute_cache_key(
+            content_hash,
+            jlpt_level,
+            mondai_config,
+            svc.model_name,
+            svc.pipeline_version,
+        )
 
-    cache_result = await db.execute(select(AIExamCache).where(AIExamCache.cache_key == cache_key))
-    cache = cache_result.scalar_one_or_none()
+        cache_result = await db.execute(select(AIExamCache).where(AIExamCache.cache_key == cache_key))
+        cache = cache_result.scalar_one_or_none()
+
+        if cache and cache.status == "completed" and has_result(cache):
+            job_id = str(uuid.uuid4())
+            result = load_result(cache)
+            if result.audio_id:
+                existing_audio = await db.get(Audio, uuid.UUID(result.audio_id))
+                if existing_audio is None:
+                    result.audio_id = None
+                    result.audio_file_url = None
+            await _jobs.put(
+                _job_from_result(
+                    job_id,
+                    result,
+                    "Duplicate audio detected. Reused cached AI result.",
+                )
+            )
+            return AIGenerateResponse(
+                job_id=job_id,
+                status="done",
+                progress_message="Duplicate audio detected. Reused cached AI result.",
+            )
 
-    if cache and cache.status == "completed" and cache.result_json:
-        job_id = str(uuid.uuid4())
-        result = AIExamResult.model_validate_json(cache.result_json)
-        if result.audio_id:
-            existing_audio = await db.get(Audio, uuid.UUID(result.audio_id))
-            if existing_audio is None:
-                result.audio_id = None
-                result.audio_file_url = None
-        _jobs[job_id] = _job_from_result(
-            job_id,
-            result,
-            "Duplicate audio detected. Reused cached AI result.",
-        )
-        return AIGenerateResponse(
-            job_id=job_id,
-            status="done",
-            progress_message="Duplicate audio detected. Reused cached AI result.",
-        )
+        active_job = None
+        if cache and cache.status == "processing" and cache.job_id:
+            active_job = await _jobs.get(cache.job_id)
+        if active_job is not None:
+            return AIGenerateResponse(
+                job_id=cache.job_id,
+                status=active_job.status,
+                progress_message="Duplicate audio is already being processed. Reusing active job.",
+            )
 
-    if cache and cache.status == "processing" and cache.job_id and cache.job_id in _jobs:
-        active_job = _jobs[cache.job_id]
-        return AIGenerateResponse(
-            job_id=cache.job_id,
-            status=active_job.status,
-            progress_message="Duplicate audio is already being processed. Reusing active job.",
+        if cache is None:
+            cache = AIExamCache(
+                cache_key=cache_key,
+                content_hash=content_hash,
+                source_filename=filename,
+                jlpt_level=jlpt_level,
+                mondai_config_json=_normalize_mondai_config(mondai_config),
+                status="pending",
+                ai_model=svc.model_name,
+                pipeline_version=svc.pipeline_version,
+                user_id=current_user.id,
+            )
+            db.add(cache)
+            try:
+                await db.flush()
+            except IntegrityError:
+                await db.rollback()
+                cache_result = await db.execute(select(AIExamCache).where(AIExamCache.cache_key == cache_key))
+                cache = cache_result.scalar_one()
+        else:
+            cache.source_filename = filename
+            cache.jlpt_level = jlpt_level
+            cache.mondai_config_json = _normalize_mondai_config(mondai_config)
+            cache.ai_model = svc.model_name
+            cache.pipeline_version = svc.pipeline_version
+            if cache.user_id is None:
+                cache.user_id = current_user.id
+
+        job_id = str(uuid.uuid4())
+        cache.status = "processing"
+        cache.job_id = job_id
+        cache.error_message = None
+        await db.commit()
+
+        await _jobs.put(
+            AIJobStatusResponse(
+                job_id=job_id,
+                status="pending",
+                progress_message="Job queued. Starting pipeline...",
+            )
         )
 
-    if cache is None:
-        cache = AIExamCache(
-            cache_key=cache_key,
+        background_tasks.add_task(
+            _run_pipeline,
+            job_id=job_id,
+            cache_id=str(cache.cache_id),
             content_hash=content_hash,
-            source_filename=filename,
+            upload=upload,
+            filename=filename,
             jlpt_level=jlpt_level,
-            mondai_config_json=_normalize_mondai_config(mondai_config),
-            status="pending",
-            ai_model=svc.model_name,
-            pipeline_version=svc.pipeline_version,
+            mondai_config=mondai_config,
             user_id=current_user.id,
+            exam_title=title,
         )
-        db.add(cache)
-        try:
-            await db.flush()
-        except IntegrityError:
-            await db.rollback()
-            cache_result = await db.execute(select(AIExamCache).where(AIExamCache.cache_key == cache_key))
-            cache = cache_result.scalar_one()
-    else:
-        cache.source_filename = filename
-        cache.jlpt_level = jlpt_level
-        cache.mondai_config_json = _normalize_mondai_config(mondai_config)
-        cache.ai_model = svc.model_name
-        cache.pipeline_version = svc.pipeline_version
-        if cache.user_id is None:
-            cache.user_id = current_user.id
-
-    job_id = str(uuid.uuid4())
-    cache.status = "processing"
-    cache.job_id = job_id
-    cache.error_message = None
-    await db.commit()
-
-    _jobs[job_id] = AIJobStatusResponse(
-        job_id=job_id,
-        status="pending",
-        progress_message="Job queued. Starting pipeline...",
-    )
+        scheduled = True
 
-    background_tasks.add_task(
-        _run_pipeline,
-        job_id=job_id,
-        cache_id=str(cache.cache_id),
-        content_hash=content_hash,
-        audio_bytes=audio_bytes,
-        filename=filename,
-        jlpt_level=jlpt_level,
-        mondai_config=mondai_config,
-        user_id=current_user.id,
-        exam_title=title,
-    )
-
-    return AIGenerateResponse(
-        job_id=job_id,
-        status="pending",
-        progress_message="Job queued. Starting pipeline...",
-    )
+        return AIGenerateResponse(
+            job_id=job_id,
+            status="pending",
+            progress_message="Job queued. Starting pipeline...",
+        )
+    finally:
+        if not scheduled:
+            upload.unlink()
 
 
 @router.get(
@@ -425,44 +545,73 @@ async def generate_exam_from_audio(
 )
 async def get_job_status(
     job_id: str,
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Poll the status of an AI exam generation job."""
-    job = _jobs.get(job_id)
-    if job:
-        return job
-
-    cache_result = await db.execute(select(AIExamCache).where(AIExamCache.job_id == job_id))
-    cache = cache_result.scalar_one_or_none()
-    if cache is None:
-        raise HTTPException(status_code=404, detail="Job not found")
+    """Poll the status of an AI exam generation job.
 
-    if cache.status == "completed" and cache.result_json:
-        result = AIExamResult.model_validate_json(cache.result_json)
-        if result.audio_id:
-            existing_audio = await db.get(Audio, uuid.UUID(result.audio_id))
-            if existing_audio is None:
-                result.audio_id = None
-                result.audio_file_url = None
-        return AIJobStatusResponse(
-            job_id=job_id,
-            status="done",
-            progress_message="Loaded completed AI result from persistent cache.",
-            result=result,
+    Responses carry an ETag; a poll whose `If-None-Match` still matches gets
+    a 304 without the job or its result being loaded.
+    """
+    version = await _jobs.get_version(job_id)
+    if version is not None:
+        etag = f'"{job_id}-{version}"'
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        encoded = await _jobs.get_json(job_id)
+        if encoded is not None:
+            version, body = encoded
+            return _json_response(body, f'"{job_id}-{version}"')
+
+    # Only the small columns first: a matching ETag needs nothing else.
+    table = AIExamCache.__table__
+    row = (
+        await db.execute(
+            select(table.c.cache_id, table.c.status, table.c.updated_at, table.c.audio_id, table.c.error_message)
+            .where(table.c.job_id == job_id)
         )
-    if cache.status == "failed":
-        return AIJobStatusResponse(
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    updated = row.updated_at.timestamp() if row.updated_at else 0
+    etag = f'"{row.cache_id.hex}-{row.status}-{updated}"'
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    if row.status == "completed":
+        stored = (
+            await db.execute(
+                select(table.c.result_blob, table.c.result_json).where(table.c.cache_id == row.cache_id)
+            )
+        ).one()
+        result = stored_result_bytes(stored.result_blob, stored.result_json)
+        if result is not None:
+            if row.audio_id is None:
+                # The audio row was deleted (the FK is SET NULL); drop its stale links from the result.
+                parsed = AIExamResult.model_validate_json(result)
+                parsed.audio_id = None
+                parsed.audio_file_url = None
+                result = parsed.model_dump_json().encode("utf-8")
+            body = encode_job_status(
+                job_id, "done", "Loaded completed AI result from persistent cache.", result=result
+            )
+            return _json_response(body, etag)
+    if row.status == "failed":
+        job = AIJobStatusResponse(
             job_id=job_id,
             status="failed",
             progress_message="Pipeline failed.",
-            error=cache.error_message,
+            error=row.error_message,
         )
-    return AIJobStatusResponse(
-        job_id=job_id,
-        status="processing",
-        progress_message="Job is still processing.",
-    )
+    else:
+        job = AIJobStatusResponse(
+            job_id=job_id,
+            status="processing",
+            progress_message="Job is still processing.",
+        )
+    return _json_response(job.model_dump_json().encode("utf-8"), etag)
 
 
 @router.delete(
@@ -474,8 +623,87 @@ async def delete_job(
     job_id: str,
     current_user: User = Depends(get_current_user),
 ):
-    if job_id in _jobs:
-        del _jobs[job_id]
+    await _jobs.delete(job_id)
+
+
+@router.get(
+    "/clips/{key:path}",
+    summary="Serve a rendered question clip",
+)
+async def get_clip(key: str):
+    """Serve a clip from local clip storage; Range requests get 206 partial content, so players can seek.
+
+    Public like the Cloudinary URLs it replaces: `<audio>` elements cannot send the auth header.
+    """
+    if not isinstance(_clips, LocalClipStorage):
+        raise HTTPException(status_code=404, detail="Clip not found")
+    try:
+        path = _clips.path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Clip not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Clip not found")
+    # Keys encode the upload hash and clip bounds, so a key's content never changes.
+    return FileResponse(
+        path,
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+@router.get(
+    "/asr-cache/stats",
+    summary="Hit rate of the segment-level ASR cache",
+)
+async def get_asr_cache_stats(
+    admin: User = Depends(RoleChecker(["admin"])),
+):
+    """Return segment ASR cache hits and misses since the service started."""
+    return get_service().segment_cache_stats()
+
+
+@router.get(
+    "/metrics",
+    summary="Per-stage timings of recent AI exam jobs",
+)
+async def get_pipeline_metrics(
+    pipeline_version: Optional[str] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(RoleChecker(["admin"])),
+):
+    """Return the stored metrics of recent jobs and the mean/max stage wall time per pipeline version."""
+    query = select(AIExamCache).where(AIExamCache.metrics_json.is_not(None))
+    if pipeline_version:
+        query = query.where(AIExamCache.pipeline_version == pipeline_version)
+    result = await db.execute(query.order_by(AIExamCache.updated_at.desc()).limit(limit))
+    caches = result.scalars().all()
+
+    jobs = []
+    wall_by_version: dict[str, dict[str, list[float]]] = {}
+    for cache in caches:
+        metrics = json.loads(cache.metrics_json)
+        jobs.append({
+            "job_id": cache.job_id,
+            "cache_id": str(cache.cache_id),
+            "status": cache.status,
+            "pipeline_version": cache.pipeline_version,
+            "updated_at": cache.updated_at.isoformat() if cache.updated_at else None,
+            "metrics": metrics,
+        })
+        walls = wall_by_version.setdefault(cache.pipeline_version, {})
+        walls.setdefault("total", []).append(metrics.get("total_wall_seconds", 0.0))
+        for name, stage in metrics.get("stages", {}).items():
+            walls.setdefault(name, []).append(stage["wall_seconds"])
+
+    versions = {
+        version: {
+            name: {"jobs": len(values), "mean_wall_seconds": round(sum(values) / len(values), 3), "max_wall_seconds": max(values)}
+            for name, values in walls.items()
+        }
+        for version, walls in wall_by_version.items()
+    }
+    return {"versions": versions, "jobs": jobs}
 
 
 @router.get(
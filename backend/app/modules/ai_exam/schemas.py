@@ -28,6 +28,7 @@ class AIQuestion(BaseModel):
     difficulty: Optional[int] = None
     image_url: Optional[str] = None
     audio_url: Optional[str] = None
+    audio_warm_queued: Optional[bool] = None  # set when the clip's Cloudinary transformation was pre-warmed
     source_segment_index: Optional[int] = None
     source_question_index: Optional[int] = None
     source_start_time: Optional[float] = None
@@ -60,6 +61,12 @@ class AISplitSegment(BaseModel):
     refined_transcript: Optional[str] = None
 
 
+class AIFingerprintMatch(BaseModel):
+    audio_id: str
+    confidence: float
+    offset_seconds: float
+
+
 class AIExamResult(BaseModel):
     draft_exam_id: Optional[str] = None
     audio_id: Optional[str] = None
@@ -70,12 +77,15 @@ class AIExamResult(BaseModel):
     timestamps: Optional[List[AITimestampMondai]] = None
     questions: List[AIQuestion]
     confidence_error_score: Optional[float] = 0.10
+    fingerprint_match: Optional[AIFingerprintMatch] = None  # set when reused from a near-duplicate upload
+    clip_warm_ms: Optional[int] = None  # time spent queueing Cloudinary clip transformations
 
 
 class AIJobStatusResponse(BaseModel):
     job_id: str
     status: Literal["pending", "processing", "done", "failed"]
     progress_message: str = ""
+    partial_segments: List[AISplitSegment] = []
     result: Optional[AIExamResult] = None
     error: Optional[str] = None
 
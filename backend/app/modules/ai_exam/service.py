@@ -1,14 +1,32 @@
-import io
+import contextvars
+import hashlib
 import logging
-import os
+import queue
 import re
-import shutil
-import tempfile
+import threading
+import time
 from collections import OrderedDict
+from concurrent.futures import Future
 from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Callable, Optional, Sequence
-
+from typing import Callable, Iterator, Optional, Sequence, Union
+
+from app.core.config import BASE_DIR, get_settings
+from app.modules.ai_exam import metrics
+from app.modules.ai_exam.artifacts import StageArtifactStore, make_artifact_key
+from app.modules.ai_exam.asr_cache import SegmentASRCache
+from app.modules.ai_exam.bell_matcher import (
+    MIN_SIMILARITY,
+    BellPeak,
+    BellTemplate,
+    BellTemplateMatcher,
+    StreamingBellScanner,
+    load_bell_template,
+)
+from app.modules.ai_exam.clip_store import ClipStorage, create_clip_storage, render_clips
+from app.modules.ai_exam.gender import PitchGenderClassifier, cluster_speakers, median_f0
+from app.modules.ai_exam.metrics import PipelineMetrics
+from app.modules.ai_exam.pcm import ASR_SAMPLE_RATE, AudioSource, PCMBuffer, iter_decoded_blocks
 from app.modules.ai_exam.schemas import (
     AIExamResult,
     AIQuestion,
@@ -17,41 +35,48 @@ from app.modules.ai_exam.schemas import (
     AITimestampMondai,
     AITimestampQuestion,
 )
+from app.modules.ai_exam.text_rules import (
+    BAN_MARKER_PATTERN,
+    BLANK_LINE_PATTERN,
+    LEADING_PUNCTUATION_PATTERN,
+    MONDAI_NUMBER_PATTERN,
+    NEXT_MARKER_PATTERN,
+    NOISE_PATTERN,
+    OUTRO_SUBJECTS,
+    PERSON_CANDIDATE_PATTERN,
+    PLACE_CANDIDATE_PATTERN,
+    QUANTITY_CANDIDATE_PATTERN,
+    QUESTION_ENDINGS,
+    QUESTION_KEYWORDS,
+    QUESTION_NUMBER_RULES,
+    QUESTION_TYPES,
+    SENTENCE_PATTERN,
+    SPEAKER_PREFIX_PATTERN,
+    TIME_CANDIDATE_PATTERN,
+    TIMESTAMP_PREFIX_PATTERN,
+    WHITESPACE_PATTERN,
+)
+from app.modules.ai_exam.vad import ChunkPack, pack_chunks, split_on_silence
 
 logger = logging.getLogger(__name__)
-PIPELINE_VERSION = "ai-exam-cache-v7-reazon-local-mondai-timeline-aware"
+PIPELINE_VERSION = "ai-exam-cache-v10-bell-matcher"
+# Versions of the stored stage artifacts; bump when a stage's output changes for the same input.
+SPLITTER_VERSION = "bell-split-v1"
+ASR_ARTIFACT_VERSION = "reazon-chunks-v1"
 REPO_ROOT = Path(__file__).resolve().parents[4]
 REAZON_SPLIT_DIR = REPO_ROOT / "R&D" / "Reazon" / "Spilit"
 BELL_SOUND_PATH = REAZON_SPLIT_DIR / "Bell_sound.mp3"
 BELL_2BAKU_PATH = REAZON_SPLIT_DIR / "Bell_2baku.mp3"
+# Bells inserted by the TTS module; detected only when the files are present.
+TTS_GENERATED_DIR = Path(__file__).resolve().parents[2] / "generated"
+TTS_BELL_START_PATH = TTS_GENERATED_DIR / "Bell_dau.wav"
+TTS_BELL_END_PATH = TTS_GENERATED_DIR / "Bell_cuoi.wav"
 MAX_MONDAI = 5
 MAX_QUESTIONS_PER_SEGMENT = 1
 SHORT_OPTION_SEGMENT_MIN_SECONDS = 25.0
 SHORT_OPTION_SEGMENT_MAX_SECONDS = 35.0
-
-QUESTION_NUMBER_PATTERNS = [
-    (re.compile(r"^(?:れい|レイ|例)(?:$|[。、「」『』\s]|を|で|は|の|だ|です)"), 0),
-    (re.compile(r"^(?:第)?(?:十二|じゅうに|ジュウニ|12)\s*番"), 12),
-    (re.compile(r"^(?:第)?(?:十一|じゅういち|ジュウイチ|11)\s*番"), 11),
-    (re.compile(r"^(?:第)?(?:十|じゅう|ジュウ|10)\s*番"), 10),
-    (re.compile(r"^(?:第)?(?:九|きゅう|く|キュウ|ク|9)\s*番"), 9),
-    (re.compile(r"^(?:第)?(?:八|はち|ハチ|8)\s*番"), 8),
-    (re.compile(r"^(?:第)?(?:七|なな|しち|ナナ|シチ|7)\s*番"), 7),
-    (re.compile(r"^(?:第)?(?:六|ろく|ロク|6)\s*番"), 6),
-    (re.compile(r"^(?:第)?(?:五|ご|ゴ|5)\s*番"), 5),
-    (re.compile(r"^(?:第)?(?:四|よん|ヨン|4)\s*番"), 4),
-    (re.compile(r"^(?:第)?(?:三|さん|サン|3)\s*番"), 3),
-    (re.compile(r"^(?:第)?(?:二|に|ニ|2)\s*番"), 2),
-    (re.compile(r"^(?:第)?(?:一|いち|イチ|1)\s*番"), 1),
-]
-
-MONDAI_NUMBER_PATTERNS = [
-    (re.compile(r"(?:問題|もんだい|モンダイ)\s*(?:五|ご|ゴ|5)"), 5),
-    (re.compile(r"(?:問題|もんだい|モンダイ)\s*(?:四|よん|ヨン|4)"), 4),
-    (re.compile(r"(?:問題|もんだい|モンダイ)\s*(?:三|さん|サン|3)"), 3),
-    (re.compile(r"(?:問題|もんだい|モンダイ)\s*(?:二|に|ニ|2)"), 2),
-    (re.compile(r"(?:問題|もんだい|モンダイ)\s*(?:一|いち|イチ|1)"), 1),
-]
+# Silence added around each chunk before decoding, mirroring reazonspeech.k2.asr.transcribe.
+ASR_PAD_SECONDS = 0.9
 
 
 def _format_seconds(seconds: float) -> str:
@@ -77,7 +102,7 @@ def _strip_reazon_frame(text: str) -> str:
 
 
 def _split_sentences(text: str) -> list[str]:
-    return [item.strip() for item in re.findall(r"[^。！？\n]+[。！？]?", text or "") if item.strip()]
+    return [item.strip() for item in SENTENCE_PATTERN.findall(text or "") if item.strip()]
 
 
 def _normalize_sentence(sentence: str) -> str:
@@ -93,11 +118,9 @@ def _is_question_sentence(sentence: str) -> bool:
         return False
     if "：" in normalized:
         return False
-    if normalized.endswith(("か。", "か？", "ですか。", "でしょうか。", "ますか。")):
-        return True
-    if any(keyword in normalized for keyword in ["何", "どれ", "どこ", "誰", "いつ", "どう", "どの", "どちら", "いくつ", "なぜ", "どうして"]):
+    if normalized.endswith(QUESTION_ENDINGS):
         return True
-    return False
+    return QUESTION_KEYWORDS.search(normalized)
 
 
 def _extract_question_texts(text: str) -> list[str]:
@@ -115,29 +138,19 @@ def _extract_question_texts(text: str) -> list[str]:
 
 def _extract_spoken_question_number(text: str) -> Optional[int]:
     normalized_text = text or ""
-    candidate_lines = [
-        re.sub(r"^[\s。、「」『』\-]+", "", line.strip())
-        for line in normalized_text.splitlines()
-        if line.strip()
-    ]
+    candidate_lines = [line.strip() for line in normalized_text.splitlines() if line.strip()]
     for candidate in candidate_lines[:4]:
-        for pattern, number in QUESTION_NUMBER_PATTERNS:
-            if pattern.search(candidate):
-                return number
-
-    compact_text = re.sub(r"^[\s。、「」『』\-\n]+", "", normalized_text)
-    for pattern, number in QUESTION_NUMBER_PATTERNS:
-        if pattern.search(compact_text):
+        number = QUESTION_NUMBER_RULES.match(LEADING_PUNCTUATION_PATTERN.sub("", candidate))
+        if number is not None:
             return number
-    return None
+    return QUESTION_NUMBER_RULES.match(LEADING_PUNCTUATION_PATTERN.sub("", normalized_text))
 
 
 def _extract_announced_mondai_number(text: str) -> Optional[int]:
-    normalized_text = re.sub(r"\s+", "", text or "")
-    for pattern, number in MONDAI_NUMBER_PATTERNS:
-        if pattern.search(normalized_text):
-            return number
-    return None
+    normalized_text = WHITESPACE_PATTERN.sub("", text or "")
+    # Higher mondai numbers win, as when the patterns were tried from 5 down to 1.
+    numbers = [int(match.lastgroup[1:]) for match in MONDAI_NUMBER_PATTERN.finditer(normalized_text)]
+    return max(numbers) if numbers else None
 
 
 def _extract_mondai_number(label: str | None) -> int:
@@ -186,7 +199,7 @@ def _build_contextual_question_text(cleaned_text: str, current_question_text: st
     lines = [line.strip() for line in body.splitlines() if line.strip()]
     intro_lines: list[str] = []
     for line in lines:
-        if re.match(r"^[^：\n]{1,12}：", line):
+        if SPEAKER_PREFIX_PATTERN.match(line):
             break
         intro_lines.append(line)
 
@@ -195,11 +208,11 @@ def _build_contextual_question_text(cleaned_text: str, current_question_text: st
 
 
 def _strip_speaker_prefix(text: str) -> str:
-    return re.sub(r"^[^：\n]{1,12}：", "", (text or "").strip()).strip()
+    return SPEAKER_PREFIX_PATTERN.sub("", (text or "").strip()).strip()
 
 
 def _clean_option_text(text: str) -> str:
-    cleaned = re.sub(r"\s+", "", (text or "").strip())
+    cleaned = WHITESPACE_PATTERN.sub("", (text or "").strip())
     cleaned = cleaned.strip("。！？、")
     return cleaned
 
@@ -216,9 +229,9 @@ def _extract_dialogue_sentences(script_text: str) -> list[str]:
     return sentences
 
 
-def _extract_regex_candidates(pattern: str, text: str) -> list[str]:
+def _extract_regex_candidates(pattern: re.Pattern, text: str) -> list[str]:
     seen: list[str] = []
-    for match in re.findall(pattern, text or ""):
+    for match in pattern.findall(text or ""):
         value = _clean_option_text(match)
         if value and value not in seen:
             seen.append(value)
@@ -226,48 +239,23 @@ def _extract_regex_candidates(pattern: str, text: str) -> list[str]:
 
 
 def _question_type(question_text: str) -> str:
-    text = question_text or ""
-    if any(keyword in text for keyword in ["何時", "いつ", "何曜日", "何日"]):
-        return "time"
-    if any(keyword in text for keyword in ["いくつ", "何個", "何本", "何枚", "何人", "いくら", "何階", "何冊"]):
-        return "quantity"
-    if any(keyword in text for keyword in ["どこ", "どちら", "どの場所"]):
-        return "place"
-    if any(keyword in text for keyword in ["誰", "どの人"]):
-        return "person"
-    if any(keyword in text for keyword in ["どうして", "なぜ"]):
-        return "reason"
-    if "どう" in text:
-        return "method"
-    return "generic"
+    return QUESTION_TYPES.classify(question_text or "") or "generic"
 
 
 def _extract_time_candidates(text: str) -> list[str]:
-    return _extract_regex_candidates(
-        r"(?:午前|午後)?\d{1,2}時(?:半|\d{1,2}分)?|(?:午前|午後)?[一二三四五六七八九十]+時(?:半|[一二三四五六七八九十]+分)?",
-        text,
-    )
+    return _extract_regex_candidates(TIME_CANDIDATE_PATTERN, text)
 
 
 def _extract_quantity_candidates(text: str) -> list[str]:
-    return _extract_regex_candidates(
-        r"\d+(?:人|個|本|枚|つ|円|階|冊|回|日)|[一二三四五六七八九十百]+(?:人|個|本|枚|つ|円|階|冊|回|日)",
-        text,
-    )
+    return _extract_regex_candidates(QUANTITY_CANDIDATE_PATTERN, text)
 
 
 def _extract_place_candidates(text: str) -> list[str]:
-    return _extract_regex_candidates(
-        r"(?:学校|会社|駅|会議室|教室|図書館|食堂|店|スーパー|病院|郵便局|銀行|公園|家|うち|受付|空港|ホテル|レストラン|喫茶店|部屋|教務課|事務所|売り場)",
-        text,
-    )
+    return _extract_regex_candidates(PLACE_CANDIDATE_PATTERN, text)
 
 
 def _extract_person_candidates(text: str) -> list[str]:
-    return _extract_regex_candidates(
-        r"(?:男の人|女の人|学生|先生|店員|社員|部長|課長|受付の人|田中さん|山田さん|佐藤さん)",
-        text,
-    )
+    return _extract_regex_candidates(PERSON_CANDIDATE_PATTERN, text)
 
 
 def _fallback_candidates(script_text: str) -> list[str]:
@@ -283,7 +271,7 @@ def _fallback_candidates(script_text: str) -> list[str]:
 
 
 def _strip_timestamp_prefix(line: str) -> str:
-    match = re.match(r"^\d{2}:\d{2}(?::\d{2})?:\s*(.+)$", (line or "").strip())
+    match = TIMESTAMP_PREFIX_PATTERN.match((line or "").strip())
     return (match.group(1) if match else line).strip()
 
 
@@ -396,7 +384,7 @@ def _build_answer_options(
 
 def _estimate_question_difficulty(script_text: str, question_text: str, answers: Sequence[AIQuestionOption]) -> int:
     question_type = _question_type(question_text)
-    script_len = len(re.sub(r"\s+", "", script_text or ""))
+    script_len = len(WHITESPACE_PATTERN.sub("", script_text or ""))
     answer_count = len([answer for answer in answers if answer.content.strip()])
 
     difficulty = 3
@@ -413,7 +401,7 @@ def _estimate_question_difficulty(script_text: str, question_text: str, answers:
 
 def _parse_formatted_segment(formatted_text: str, raw_text: str) -> tuple[Optional[str], str, list[str], Optional[int], Optional[int]]:
     cleaned = _strip_reazon_frame(formatted_text)
-    blocks = [block.strip() for block in re.split(r"\n\s*\n", cleaned) if block.strip()]
+    blocks = [block.strip() for block in BLANK_LINE_PATTERN.split(cleaned) if block.strip()]
 
     introduction = blocks[0] if blocks else ""
     outro = blocks[-1] if len(blocks) >= 2 else ""
@@ -453,7 +441,7 @@ def _format_jlpt_master(chunks_data: Sequence[dict]) -> str:
 
     texts: list[str] = []
     for chunk in chunks_data:
-        text = re.sub(r"(ピン|パン|プッ|ピッ|プ|ピ)", "", chunk.get("text", ""))
+        text = NOISE_PATTERN.sub("", chunk.get("text", ""))
         text = text.replace("。", "").strip()
         texts.append(text)
 
@@ -471,15 +459,15 @@ def _format_jlpt_master(chunks_data: Sequence[dict]) -> str:
     intro_str = "。".join(intro_texts)
     if intro_str:
         intro_str += "。"
-    intro_str = re.sub(r"(次。?)", "", intro_str).strip()
-    intro_str = re.sub(r"((?:一|二|三|四|五|六|七|八|九|十|1|2|3|4|5|6|7|8|9|10)番)？?。?", r"\1\n", intro_str)
+    intro_str = NEXT_MARKER_PATTERN.sub("", intro_str).strip()
+    intro_str = BAN_MARKER_PATTERN.sub(r"\1\n", intro_str)
 
     dialogue_end = len(texts)
     for index in range(len(texts) - 1, dialogue_start - 1, -1):
         if texts[index].endswith("か") or texts[index].endswith("か？"):
             out_start = index
             for inner in range(index, max(dialogue_start - 1, index - 5), -1):
-                if any(subject in texts[inner] for subject in ["男の人", "女の人", "学生", "男の子", "女の子", "人", "何"]):
+                if OUTRO_SUBJECTS.search(texts[inner]):
                     out_start = inner
             dialogue_end = out_start
             break
@@ -531,7 +519,7 @@ class SplitAudioChunk:
     file_name: str
     start_ms: int
     end_ms: int
-    audio_bytes: bytes
+    audio_bytes: bytes = b""
     transcript: str = ""
     timestamped_transcript: str = ""
     refined_transcript: str = ""
@@ -540,6 +528,19 @@ class SplitAudioChunk:
     question_texts: list[str] = field(default_factory=list)
     spoken_question_number: Optional[int] = None
     announced_mondai_number: Optional[int] = None
+    pcm: Optional[PCMBuffer] = None
+
+    @property
+    def audio(self) -> Union[PCMBuffer, bytes]:
+        return self.pcm if self.pcm is not None else self.audio_bytes
+
+
+@dataclass(frozen=True)
+class RecognizedText:
+    """Decoder output for one ASR input; `tokens` are `(seconds, token)` pairs when the model reports them."""
+
+    text: str
+    tokens: tuple[tuple[float, str], ...] = ()
 
 
 @dataclass
@@ -566,6 +567,11 @@ class BellAudioSplitter:
         trap_window_sec: float = 4.0,
         trim_before_next_bell_ms: int = 100,
         min_segment_length_ms: int = 1500,
+        extra_bell_paths: Sequence[Path] = (),
+        extra_trap_paths: Sequence[Path] = (),
+        min_score: float = MIN_SIMILARITY,
+        streaming: bool = False,
+        stream_block_sec: float = 30.0,
     ):
         self.bell1_path = bell1_path
         self.bell2_path = bell2_path
@@ -574,32 +580,67 @@ class BellAudioSplitter:
         self.trap_window_sec = trap_window_sec
         self.trim_before_next_bell_ms = trim_before_next_bell_ms
         self.min_segment_length_ms = min_segment_length_ms
+        self.extra_bell_paths = tuple(extra_bell_paths)
+        self.extra_trap_paths = tuple(extra_trap_paths)
+        self.min_score = min_score
+        self.streaming = streaming
+        self.stream_block_sec = stream_block_sec
+        self._matcher = BellTemplateMatcher(threshold_percent=threshold_percent, min_distance_sec=min_distance_sec)
 
     def _ensure_assets(self) -> None:
         missing = [str(path) for path in (self.bell1_path, self.bell2_path) if not path.exists()]
         if missing:
             raise RuntimeError(f"Bell sample file not found: {', '.join(missing)}")
 
-    def find_question_starts(self, audio_path: str) -> list[int]:
-        import librosa
-        import numpy as np
-        from scipy import signal
+    def cache_params(self) -> dict:
+        """Everything that can change the split boundaries for the same audio."""
+        optional = [path for path in (*self.extra_bell_paths, *self.extra_trap_paths) if path.exists()]
+        return {
+            "version": SPLITTER_VERSION,
+            "threshold_percent": self.threshold_percent,
+            "min_distance_sec": self.min_distance_sec,
+            "trap_window_sec": self.trap_window_sec,
+            "trim_before_next_bell_ms": self.trim_before_next_bell_ms,
+            "min_segment_length_ms": self.min_segment_length_ms,
+            "min_score": self.min_score,
+            "streaming": self.streaming,
+            "templates": [path.name for path in (self.bell1_path, self.bell2_path, *optional)],
+        }
+
+    def _load_templates(self, sample_rate: int) -> tuple[list[BellTemplate], list[BellTemplate]]:
+        """Return (question bells, traps); optional templates are used only if their file exists."""
+        bells = [self.bell1_path] + [path for path in self.extra_bell_paths if path.exists()]
+        traps = [self.bell2_path] + [path for path in self.extra_trap_paths if path.exists()]
+        return (
+            [load_bell_template(path, sample_rate) for path in bells],
+            [load_bell_template(path, sample_rate) for path in traps],
+        )
 
+    def detect_bells(self, audio: PCMBuffer) -> dict[str, list[BellPeak]]:
+        """Match every registered template in one pass and return peaks keyed by label."""
+        self._ensure_assets()
+        bells, traps = self._load_templates(audio.sample_rate)
+        peaks = self._matcher.match(audio, bells + traps)
+        # The relative threshold always reports the best match, and optional templates
+        # are usually absent, so they must also look like the sample itself.
+        optional = {template.label for template in bells[1:] + traps[1:]}
+        return {
+            label: [peak for peak in found if label not in optional or peak.score >= self.min_score]
+            for label, found in peaks.items()
+        }
+
+    def find_question_starts(self, audio: Union[str, PCMBuffer]) -> list[int]:
         self._ensure_assets()
 
-        main_audio, sr = librosa.load(audio_path, sr=None, mono=True)
-        bell1_audio, _ = librosa.load(str(self.bell1_path), sr=sr, mono=True)
-        bell2_audio, _ = librosa.load(str(self.bell2_path), sr=sr, mono=True)
-
-        corr2 = signal.correlate(main_audio, bell2_audio, mode="valid", method="fft")
-        thresh2 = float(np.max(corr2)) * self.threshold_percent
-        peaks2, _ = signal.find_peaks(corr2, height=thresh2, distance=sr * self.min_distance_sec)
-        bell2_times_sec = [peak / sr for peak in peaks2]
+        if not isinstance(audio, PCMBuffer):
+            audio = PCMBuffer.from_bytes(Path(audio).read_bytes())
+        bells, traps = self._load_templates(audio.sample_rate)
+        if len(audio.samples) < max(len(bells[0].samples), len(traps[0].samples)):
+            return []
 
-        corr1 = signal.correlate(main_audio, bell1_audio, mode="valid", method="fft")
-        thresh1 = float(np.max(corr1)) * self.threshold_percent
-        peaks1, _ = signal.find_peaks(corr1, height=thresh1, distance=sr * self.min_distance_sec)
-        bell1_times_sec = [peak / sr for peak in peaks1]
+        peaks = self.detect_bells(audio)
+        bell2_times_sec = sorted(peak.time_sec for template in traps for peak in peaks[template.label])
+        bell1_times_sec = sorted(peak.time_sec for template in bells for peak in peaks[template.label])
 
         valid_bell_times_ms: list[int] = []
         for bell_time in bell1_times_sec:
@@ -612,90 +653,236 @@ class BellAudioSplitter:
 
         return valid_bell_times_ms
 
-    def _build_full_audio_segment(self, audio_path: str) -> SplitAudioChunk:
-        from pydub import AudioSegment
-
-        audio = AudioSegment.from_file(audio_path)
+    def _build_full_audio_segment(self, audio: PCMBuffer) -> SplitAudioChunk:
         if len(audio) < self.min_segment_length_ms:
             raise RuntimeError("Audio is too short to process.")
 
-        buffer = io.BytesIO()
-        audio.export(buffer, format="wav")
         return SplitAudioChunk(
             segment_index=1,
             file_name="segment_01.wav",
             start_ms=0,
             end_ms=len(audio),
-            audio_bytes=buffer.getvalue(),
+            pcm=audio,
         )
 
-    def split_audio(self, audio_bytes: bytes, suffix: str = ".mp3") -> list[SplitAudioChunk]:
-        from pydub import AudioSegment
+    def split_audio(self, audio_bytes: Union[AudioSource, PCMBuffer], suffix: str = ".mp3") -> list[SplitAudioChunk]:
+        if self.streaming:
+            return list(self._iter_streamed_segments(audio_bytes))
 
-        with tempfile.NamedTemporaryFile(suffix=suffix or ".mp3", delete=False) as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
+        with metrics.stage("decode"):
+            audio = audio_bytes if isinstance(audio_bytes, PCMBuffer) else PCMBuffer.from_bytes(audio_bytes)
 
-        try:
-            bell_times_ms = self.find_question_starts(tmp_path)
-            if not bell_times_ms:
+        with metrics.stage("bell_detection"):
+            bell_times_ms = self.find_question_starts(audio)
+        if not bell_times_ms:
+            logger.warning(
+                "No valid bell timestamps found in audio. Falling back to a single full-length segment."
+            )
+            return [self._build_full_audio_segment(audio)]
+
+        with metrics.stage("cutting"):
+            segments = self._cut_segments(audio, bell_times_ms)
+        if not segments:
+            raise RuntimeError("Bell timestamps were detected, but no usable audio segments were produced.")
+
+        return segments
+
+    def _cut_segments(self, audio: PCMBuffer, bell_times_ms: Sequence[int]) -> list[SplitAudioChunk]:
+        segments: list[SplitAudioChunk] = []
+        for index, start_ms in enumerate(bell_times_ms):
+            next_start_ms = bell_times_ms[index + 1] if index + 1 < len(bell_times_ms) else len(audio)
+            end_ms = next_start_ms - self.trim_before_next_bell_ms if index + 1 < len(bell_times_ms) else next_start_ms
+            end_ms = max(end_ms, start_ms)
+            if end_ms - start_ms < self.min_segment_length_ms:
                 logger.warning(
-                    "No valid bell timestamps found in audio. Falling back to a single full-length segment."
+                    "Skipping split segment %s because it is too short: %.2fs",
+                    index + 1,
+                    (end_ms - start_ms) / 1000.0,
                 )
-                return [self._build_full_audio_segment(tmp_path)]
-
-            audio = AudioSegment.from_file(tmp_path)
-            segments: list[SplitAudioChunk] = []
-            for index, start_ms in enumerate(bell_times_ms):
-                next_start_ms = bell_times_ms[index + 1] if index + 1 < len(bell_times_ms) else len(audio)
-                end_ms = next_start_ms - self.trim_before_next_bell_ms if index + 1 < len(bell_times_ms) else next_start_ms
-                end_ms = max(end_ms, start_ms)
-                if end_ms - start_ms < self.min_segment_length_ms:
-                    logger.warning(
-                        "Skipping split segment %s because it is too short: %.2fs",
-                        index + 1,
-                        (end_ms - start_ms) / 1000.0,
-                    )
-                    continue
+                continue
 
-                chunk = audio[start_ms:end_ms]
-                buffer = io.BytesIO()
-                chunk.export(buffer, format="wav")
-                segments.append(
-                    SplitAudioChunk(
-                        segment_index=len(segments) + 1,
-                        file_name=f"segment_{len(segments) + 1:02d}.wav",
-                        start_ms=start_ms,
-                        end_ms=end_ms,
-                        audio_bytes=buffer.getvalue(),
-                    )
+            segments.append(
+                SplitAudioChunk(
+                    segment_index=len(segments) + 1,
+                    file_name=f"segment_{len(segments) + 1:02d}.wav",
+                    start_ms=start_ms,
+                    end_ms=end_ms,
+                    pcm=audio.slice_ms(start_ms, end_ms),
                 )
+            )
+        return segments
 
-            if not segments:
-                raise RuntimeError("Bell timestamps were detected, but no usable audio segments were produced.")
+    def iter_split_audio(self, audio_bytes: Union[AudioSource, PCMBuffer], suffix: str = ".mp3") -> Iterator[SplitAudioChunk]:
+        """Yield segments as soon as their bounds are known.
 
-            return segments
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+        In streaming mode that is while the file is still being scanned; otherwise
+        all segments become available once bell detection has finished.
+        """
+        if self.streaming:
+            yield from self._iter_streamed_segments(audio_bytes)
+        else:
+            yield from self.split_audio(audio_bytes, suffix=suffix)
+
+    def _iter_streamed_segments(self, audio_bytes: Union[AudioSource, PCMBuffer]) -> Iterator[SplitAudioChunk]:
+        """Yield segments while the audio is still being decoded and scanned.
+
+        Memory is bounded by the current segment plus a few template lengths;
+        audio before the first bell is kept only for the full-length fallback.
+        Bells are accepted by `min_score` (cosine similarity) instead of a
+        fraction of the loudest match.
+        """
+        self._ensure_assets()
+
+        if isinstance(audio_bytes, PCMBuffer):
+            sample_rate = audio_bytes.sample_rate
+            blocks = iter(audio_bytes.iter_blocks(int(sample_rate * self.stream_block_sec)))
+        else:
+            sample_rate = ASR_SAMPLE_RATE
+            blocks = iter_decoded_blocks(audio_bytes, sample_rate, int(sample_rate * self.stream_block_sec))
+        bells, traps = self._load_templates(sample_rate)
+        trap_labels = {template.label for template in traps}
+        scanner = StreamingBellScanner(
+            bells + traps,
+            sample_rate,
+            min_score=self.min_score,
+            min_distance_sec=self.min_distance_sec,
+        )
+        trap_samples = int(self.trap_window_sec * sample_rate)
+
+        def scanned():
+            while True:
+                with metrics.stage("decode"):
+                    block = next(blocks, None)
+                if block is None:
+                    break
+                with metrics.stage("bell_detection"):
+                    peaks = scanner.push(block)
+                yield peaks, False
+            with metrics.stage("bell_detection"):
+                peaks = scanner.finish()
+            yield peaks, True
+
+        candidates: list[int] = []
+        trap_positions: list[int] = []
+        last_bell_ms: Optional[int] = None
+        bell_count = 0
+        emitted = 0
+        for peaks, final in scanned():
+            for peak in peaks:
+                (trap_positions if peak.label in trap_labels else candidates).append(peak.position)
+
+            # A bell can only be accepted once every trap that could still land within
+            # `trap_window_sec` of it has been reported.
+            while candidates and (final or candidates[0] + trap_samples < scanner.horizon):
+                position = candidates.pop(0)
+                if any(abs(position - trap) < trap_samples for trap in trap_positions):
+                    continue
+                bell_ms = int(position * 1000 / sample_rate)
+                if last_bell_ms is not None and bell_ms - last_bell_ms < self.min_segment_length_ms:
+                    continue
+                if last_bell_ms is not None:
+                    segment = self._cut_streamed_segment(
+                        scanner, bell_count, emitted, last_bell_ms, bell_ms - self.trim_before_next_bell_ms
+                    )
+                    if segment is not None:
+                        emitted += 1
+                        yield segment
+                last_bell_ms = bell_ms
+                bell_count += 1
+                scanner.keep_from(int(last_bell_ms * sample_rate / 1000))
+
+            oldest = candidates[0] if candidates else scanner.horizon
+            trap_positions = [trap for trap in trap_positions if trap + trap_samples >= oldest]
+
+        total_ms = scanner.total_samples * 1000 // sample_rate
+        if last_bell_ms is None:
+            logger.warning(
+                "No valid bell timestamps found in audio. Falling back to a single full-length segment."
+            )
+            yield self._build_full_audio_segment(
+                PCMBuffer(samples=scanner.samples(0, scanner.total_samples), sample_rate=sample_rate)
+            )
+            return
+
+        segment = self._cut_streamed_segment(scanner, bell_count, emitted, last_bell_ms, total_ms)
+        if segment is not None:
+            emitted += 1
+            yield segment
+        if not emitted:
+            raise RuntimeError("Bell timestamps were detected, but no usable audio segments were produced.")
+
+    def _cut_streamed_segment(
+        self,
+        scanner: StreamingBellScanner,
+        bell_number: int,
+        emitted: int,
+        start_ms: int,
+        end_ms: int,
+    ) -> Optional[SplitAudioChunk]:
+        end_ms = max(end_ms, start_ms)
+        if end_ms - start_ms < self.min_segment_length_ms:
+            logger.warning(
+                "Skipping split segment %s because it is too short: %.2fs",
+                bell_number,
+                (end_ms - start_ms) / 1000.0,
+            )
+            return None
+
+        sample_rate = scanner.sample_rate
+        with metrics.stage("cutting"):
+            samples = scanner.samples(int(round(start_ms * sample_rate / 1000)), int(round(end_ms * sample_rate / 1000)))
+        return SplitAudioChunk(
+            segment_index=emitted + 1,
+            file_name=f"segment_{emitted + 1:02d}.wav",
+            start_ms=start_ms,
+            end_ms=end_ms,
+            pcm=PCMBuffer(samples=samples, sample_rate=sample_rate, offset_ms=start_ms),
+        )
 
 
 class ReazonTranscriber:
     """Local Japanese ASR using ReazonSpeech-k2 + local speaker formatting."""
 
-    NOISE_PATTERN = re.compile(r"(ピン|パン|プッ|ピッ|プ|ピ)")
+    NOISE_PATTERN = NOISE_PATTERN
 
-    def __init__(self, model_version: str = "reazonspeech-k2-v2"):
+    GENDER_MODES = ("pitch", "accurate", "off")
+
+    def __init__(
+        self,
+        model_version: str = "reazonspeech-k2-v2",
+        batch_size: int = 1,
+        gender_mode: str = "pitch",
+        speaker_clustering: bool = True,
+        segment_cache: Optional[SegmentASRCache] = None,
+        pack_target_ms: int = 0,
+        num_threads: Optional[int] = None,
+    ):
+        if gender_mode not in self.GENDER_MODES:
+            raise ValueError(f"Unknown gender mode {gender_mode!r}; expected one of {self.GENDER_MODES}.")
         self.model_version = model_version
+        self.batch_size = max(1, batch_size)
+        self.gender_mode = gender_mode
+        self._pitch_classifier = PitchGenderClassifier(cluster_speakers=speaker_clustering)
+        self._segment_cache = segment_cache
+        self.pack_target_ms = max(0, pack_target_ms)
+        self.num_threads = num_threads
         self._model = None
         self._gender_classifier = None
         self._gender_classifier_attempted = False
 
     def _load_model(self) -> None:
         try:
+            import inspect
+
             from reazonspeech.k2.asr import load_model
 
-            self._model = load_model(self.model_version)
+            options = {}
+            if self.num_threads is not None:
+                if "num_threads" in inspect.signature(load_model).parameters:
+                    options["num_threads"] = self.num_threads
+                else:
+                    logger.warning("This ReazonSpeech version ignores num_threads=%s.", self.num_threads)
+            self._model = load_model(self.model_version, **options)
             logger.info("ReazonSpeech model loaded.")
         except ImportError as exc:
             raise RuntimeError(
@@ -723,131 +910,306 @@ class ReazonTranscriber:
 
     def _clean_text(self, text: str) -> str:
         text = self.NOISE_PATTERN.sub("", text or "")
-        text = re.sub(r"\s+", "", text)
+        text = WHITESPACE_PATTERN.sub("", text)
         return text.strip()
 
-    def _predict_gender(self, audio_path: str) -> str:
+    def _predict_gender(self, audio: PCMBuffer) -> str:
         self._load_gender_classifier()
         if self._gender_classifier is None:
             return "Unknown"
         try:
-            prediction = self._gender_classifier(audio_path)
+            prediction = self._gender_classifier({"raw": audio.samples, "sampling_rate": audio.sample_rate})
             top_label = prediction[0]["label"].lower()
             return "男" if top_label == "male" else "女"
         except Exception as exc:
-            logger.warning("Gender classification failed for %s: %s", audio_path, exc)
+            logger.warning("Gender classification failed at %sms: %s", audio.offset_ms, exc)
             return "Unknown"
 
-    def transcribe(self, audio_bytes: bytes, suffix: str = ".wav", base_offset_ms: int = 0) -> dict:
-        try:
-            from pydub import AudioSegment
-            from pydub.silence import detect_nonsilent, split_on_silence
-            from reazonspeech.k2.asr import audio_from_path, transcribe
-        except ImportError as exc:
-            raise RuntimeError(f"Missing dependency: {exc}") from exc
+    def _predict_genders(self, chunks: Sequence[PCMBuffer]) -> list[str]:
+        if self.gender_mode == "off" or not chunks:
+            return ["Unknown"] * len(chunks)
+        if self.gender_mode == "pitch":
+            return self._pitch_classifier.predict_many(chunks)
+        if not self._pitch_classifier.cluster_speakers:
+            return [self._predict_gender(chunk) for chunk in chunks]
+
+        # Accurate mode: run wav2vec2 once on the longest chunk of each pitch cluster, and on
+        # every chunk without a pitch estimate, since those cannot be assigned a cluster.
+        clusters = cluster_speakers([median_f0(chunk) for chunk in chunks])
+        representatives: dict[int, PCMBuffer] = {}
+        for chunk, cluster in zip(chunks, clusters):
+            if cluster is None:
+                continue
+            current = representatives.get(cluster)
+            if current is None or len(chunk.samples) > len(current.samples):
+                representatives[cluster] = chunk
+        cluster_genders = {cluster: self._predict_gender(chunk) for cluster, chunk in representatives.items()}
+        return [
+            self._predict_gender(chunk) if cluster is None else cluster_genders[cluster]
+            for chunk, cluster in zip(chunks, clusters)
+        ]
 
-        if self._model is None:
-            self._load_model()
+    def _plan_chunks(self, audio: PCMBuffer) -> list[tuple[int, PCMBuffer]]:
+        # Packed chunks no longer cost a model call each, so short ones are kept instead of dropped.
+        min_chunk_ms = 0 if self.pack_target_ms else 300
+        return split_on_silence(audio, min_silence_len=400, keep_silence=150, min_chunk_ms=min_chunk_ms)
 
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
+    def _recognize_one(self, chunk: PCMBuffer) -> RecognizedText:
+        from reazonspeech.k2.asr import audio_from_numpy, transcribe
 
-        try:
-            audio = AudioSegment.from_file(tmp_path)
-            silence_thresh = audio.dBFS - 14 if audio.dBFS != float("-inf") else -50
-            keep_silence = 150
-            chunks = split_on_silence(
-                audio,
-                min_silence_len=400,
-                silence_thresh=silence_thresh,
-                keep_silence=keep_silence,
-            )
-            raw_ranges = detect_nonsilent(
-                audio,
-                min_silence_len=400,
-                silence_thresh=silence_thresh,
+        metrics.count("asr_calls")
+        result = transcribe(self._model, audio_from_numpy(chunk.samples, chunk.sample_rate))
+        if not result:
+            return RecognizedText("")
+        subwords = getattr(result, "subwords", None) or ()
+        return RecognizedText(result.text, tuple((subword.seconds, subword.token) for subword in subwords))
+
+    def _recognize_batch(self, chunks: Sequence[PCMBuffer]) -> list[RecognizedText]:
+        import numpy as np
+
+        metrics.count("asr_calls")
+        streams = []
+        for chunk in chunks:
+            pad = np.zeros(int(ASR_PAD_SECONDS * chunk.sample_rate), dtype=np.float32)
+            stream = self._model.create_stream()
+            stream.accept_waveform(chunk.sample_rate, np.concatenate([pad, chunk.samples, pad]))
+            streams.append(stream)
+        self._model.decode_streams(streams)
+        return [
+            RecognizedText(
+                stream.result.text,
+                tuple(
+                    (max(0.0, seconds - ASR_PAD_SECONDS), token)
+                    for seconds, token in zip(
+                        getattr(stream.result, "timestamps", None) or (),
+                        getattr(stream.result, "tokens", None) or (),
+                    )
+                ),
             )
-            chunk_ranges: list[tuple[int, int]] = []
-            for index, (start_ms, end_ms) in enumerate(raw_ranges):
-                next_start_ms = raw_ranges[index + 1][0] if index + 1 < len(raw_ranges) else None
-                prev_end_ms = raw_ranges[index - 1][1] if index > 0 else None
-                adjusted_start_ms = max(0, start_ms - keep_silence)
-                adjusted_end_ms = min(len(audio), end_ms + keep_silence)
-                if prev_end_ms is not None:
-                    adjusted_start_ms = max(adjusted_start_ms, prev_end_ms)
-                if next_start_ms is not None:
-                    adjusted_end_ms = min(adjusted_end_ms, next_start_ms)
-                chunk_ranges.append((adjusted_start_ms, adjusted_end_ms))
-            if not chunks:
-                chunks = [audio]
-            if not chunk_ranges:
-                chunk_ranges = [(0, len(audio))]
-
-            chunk_dir = tempfile.mkdtemp(prefix="reazon_chunks_")
-            chunks_data: list[dict] = []
-            raw_parts: list[str] = []
-            timeline_parts: list[str] = []
-            fallback_cursor_ms = 0
+            for stream in streams
+        ]
+
+    def _recognize(self, chunks: Sequence[PCMBuffer]) -> list[Optional[RecognizedText]]:
+        texts: list[Optional[RecognizedText]] = [None] * len(chunks)
+        if self.batch_size <= 1:
+            for index, chunk in enumerate(chunks):
+                try:
+                    texts[index] = self._recognize_one(chunk)
+                except Exception as exc:
+                    logger.warning("Chunk %s transcription error: %s", index, exc)
+            return texts
+
+        # Sorting by length keeps similarly sized chunks together so each batch wastes little padding.
+        order = sorted(range(len(chunks)), key=lambda index: len(chunks[index].samples))
+        for batch_start in range(0, len(order), self.batch_size):
+            batch = order[batch_start:batch_start + self.batch_size]
             try:
-                for index, chunk in enumerate(chunks):
-                    if len(chunk) < 300:
-                        fallback_cursor_ms += len(chunk)
-                        continue
-                    chunk_path = os.path.join(chunk_dir, f"chunk_{index}.wav")
-                    chunk.export(chunk_path, format="wav")
+                batch_texts = self._recognize_batch([chunks[index] for index in batch])
+            except Exception as exc:
+                logger.warning("Batched transcription failed (%s); retrying chunk by chunk.", exc)
+                batch_texts = []
+                for index in batch:
                     try:
-                        audio_content = audio_from_path(chunk_path)
-                        result = transcribe(self._model, audio_content)
-                        text = self._clean_text(result.text if result else "")
-                        if not text:
-                            fallback_cursor_ms += len(chunk)
-                            continue
-                        gender = self._predict_gender(chunk_path)
-                        raw_parts.append(text)
-                        chunks_data.append({"text": text, "gender": gender})
-                        if index < len(chunk_ranges):
-                            chunk_start_ms = chunk_ranges[index][0]
-                        else:
-                            chunk_start_ms = fallback_cursor_ms
-                        timestamp = _format_transcript_timestamp((base_offset_ms + chunk_start_ms) / 1000.0)
-                        timeline_parts.append(f"{timestamp}: {text}")
-                    except Exception as exc:
-                        logger.warning("Chunk %s transcription error: %s", index, exc)
-                    finally:
-                        fallback_cursor_ms += len(chunk)
-                        if os.path.exists(chunk_path):
-                            os.remove(chunk_path)
-            finally:
-                shutil.rmtree(chunk_dir, ignore_errors=True)
+                        batch_texts.append(self._recognize_one(chunks[index]))
+                    except Exception as chunk_exc:
+                        logger.warning("Chunk %s transcription error: %s", index, chunk_exc)
+                        batch_texts.append(None)
+            for index, text in zip(batch, batch_texts):
+                texts[index] = text
+        return texts
 
-            raw_text = "".join(raw_parts)
-            formatted_text = _format_jlpt_master(chunks_data) or raw_text
-            introduction, script_text, question_texts, spoken_number, announced_mondai_number = _parse_formatted_segment(
-                formatted_text,
-                raw_text,
-            )
-            return {
-                "raw_text": raw_text,
-                "timestamped_raw_text": "\n".join(timeline_parts).strip(),
-                "formatted_text": formatted_text,
-                "introduction": introduction,
-                "script_text": script_text,
-                "question_texts": question_texts,
-                "spoken_question_number": spoken_number,
-                "announced_mondai_number": announced_mondai_number,
+    @staticmethod
+    def _unpack_texts(pack: ChunkPack, recognized: Optional[RecognizedText]) -> list[Optional[str]]:
+        """Split the text of a packed input back onto its chunks by token time."""
+        if recognized is None:
+            return [None] * len(pack.chunks)
+        if len(pack.chunks) == 1:
+            return [recognized.text]
+        if not recognized.tokens:
+            # Without token timings the text cannot be placed; keep it on the first chunk rather than lose it.
+            return [recognized.text] + [""] * (len(pack.chunks) - 1)
+        parts = [""] * len(pack.chunks)
+        for seconds, token in recognized.tokens:
+            parts[pack.chunk_index_at(seconds)] += token.replace("\u2581", " ")
+        return parts
+
+    def _collect(
+        self,
+        chunks: Sequence[tuple[int, PCMBuffer]],
+        texts: Sequence[Optional[str]],
+    ) -> list[dict]:
+        recognized = [
+            (chunk_start_ms, chunk, cleaned)
+            for (chunk_start_ms, chunk), cleaned in zip(chunks, (self._clean_text(text or "") for text in texts))
+            if cleaned
+        ]
+        with metrics.stage("gender"):
+            genders = self._predict_genders([chunk for _, chunk, _ in recognized])
+        return [
+            {
+                "start_ms": chunk_start_ms,
+                "end_ms": chunk_start_ms + chunk.duration_ms,
+                "text": text,
+                "gender": gender,
             }
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            for (chunk_start_ms, chunk, text), gender in zip(recognized, genders)
+        ]
+
+    @staticmethod
+    def format_transcript(records: Sequence[dict], base_offset_ms: int) -> dict:
+        """Apply the local text rules to recognized chunk records of one segment."""
+        chunks_data: list[dict] = []
+        raw_parts: list[str] = []
+        timeline_parts: list[str] = []
+        for record in records:
+            raw_parts.append(record["text"])
+            chunks_data.append({"text": record["text"], "gender": record["gender"]})
+            timestamp = _format_transcript_timestamp((base_offset_ms + record["start_ms"]) / 1000.0)
+            timeline_parts.append(f"{timestamp}: {record['text']}")
+
+        raw_text = "".join(raw_parts)
+        formatted_text = _format_jlpt_master(chunks_data) or raw_text
+        introduction, script_text, question_texts, spoken_number, announced_mondai_number = _parse_formatted_segment(
+            formatted_text,
+            raw_text,
+        )
+        return {
+            "raw_text": raw_text,
+            "timestamped_raw_text": "\n".join(timeline_parts).strip(),
+            "formatted_text": formatted_text,
+            "introduction": introduction,
+            "script_text": script_text,
+            "question_texts": question_texts,
+            "spoken_question_number": spoken_number,
+            "announced_mondai_number": announced_mondai_number,
+        }
+
+    def cache_params(self) -> dict:
+        return {
+            "version": ASR_ARTIFACT_VERSION,
+            "model_version": self.model_version,
+            "gender_mode": self.gender_mode,
+            "speaker_clustering": self._pitch_classifier.cluster_speakers,
+            "pack_target_ms": self.pack_target_ms,
+        }
+
+    def recognize_many(self, segments: Sequence[Union[bytes, PCMBuffer]]) -> list[list[dict]]:
+        """Return recognized chunk records per segment, batching silence chunks across all of them.
+
+        Each record holds the cleaned `text`, the speaker `gender` and the chunk
+        bounds in ms relative to the start of its segment.
+        """
+        decoded = [audio if isinstance(audio, PCMBuffer) else PCMBuffer.from_bytes(audio) for audio in segments]
+        if self._segment_cache is not None:
+            return self._segment_cache.recognize(decoded, self.cache_params(), self._recognize_segments)
+        return self._recognize_segments(decoded)
+
+    def _recognize_segments(self, segments: Sequence[PCMBuffer]) -> list[list[dict]]:
+        if self._model is None:
+            self._load_model()
+
+        with metrics.stage("vad"):
+            planned = [self._plan_chunks(audio) for audio in segments]
+            packed = [pack_chunks(chunks, self.pack_target_ms) for chunks in planned]
+        flat_packs = [pack for packs in packed for pack in packs]
+        with metrics.stage("asr_model"):
+            flat_texts = self._recognize([pack.audio for pack in flat_packs])
+        chunk_count = sum(len(chunks) for chunks in planned)
+        metrics.count("chunks", chunk_count)
+        metrics.count("asr_inputs", len(flat_packs))
+        logger.debug("Recognized %s chunk(s) in %s ASR input(s).", chunk_count, len(flat_packs))
+
+        results: list[list[dict]] = []
+        cursor = 0
+        for chunks, packs in zip(planned, packed):
+            texts = [
+                text
+                for pack, recognized in zip(packs, flat_texts[cursor:cursor + len(packs)])
+                for text in self._unpack_texts(pack, recognized)
+            ]
+            cursor += len(packs)
+            results.append(self._collect(chunks, texts))
+        return results
+
+    def transcribe_many(self, segments: Sequence[tuple[Union[bytes, PCMBuffer], int]]) -> list[dict]:
+        """Transcribe `(audio, base_offset_ms)` pairs, batching silence chunks across all of them."""
+        records = self.recognize_many([audio for audio, _ in segments])
+        return [
+            self.format_transcript(segment_records, base_offset_ms)
+            for segment_records, (_, base_offset_ms) in zip(records, segments)
+        ]
+
+    def transcribe(self, audio_bytes: Union[bytes, PCMBuffer], suffix: str = ".wav", base_offset_ms: int = 0) -> dict:
+        return self.transcribe_many([(audio_bytes, base_offset_ms)])[0]
+
+
+def create_transcriber(settings, segment_cache: Optional[SegmentASRCache] = None, use_server: bool = True):
+    """The ASR backend chosen by the settings: the ASR server, a warm worker pool or an in-process model."""
+    if use_server and settings.AI_EXAM_ASR_SERVER_URL:
+        from app.modules.ai_exam.asr_client import RemoteTranscriber
+
+        return RemoteTranscriber(
+            settings.AI_EXAM_ASR_SERVER_URL,
+            timeout_sec=settings.AI_EXAM_ASR_SERVER_TIMEOUT_SEC,
+            segment_cache=segment_cache,
+            max_request_sec=settings.AI_EXAM_ASR_SERVER_REQUEST_SEC,
+        )
+    if settings.AI_EXAM_ASR_WORKERS > 0:
+        from app.modules.ai_exam.asr_pool import ASRWorkerPool, in_daemon_process
+
+        if not in_daemon_process():
+            return ASRWorkerPool(
+                workers=settings.AI_EXAM_ASR_WORKERS,
+                threads_per_worker=settings.AI_EXAM_ASR_THREADS_PER_WORKER,
+                batch_size=settings.AI_EXAM_ASR_BATCH_SIZE,
+                gender_mode=settings.AI_EXAM_GENDER_MODE,
+                speaker_clustering=settings.AI_EXAM_SPEAKER_CLUSTERING,
+                segment_cache=segment_cache,
+                pack_target_ms=int(settings.AI_EXAM_ASR_PACK_TARGET_SEC * 1000),
+            )
+        # Celery prefork children are daemonic and cannot have child processes.
+        logger.warning("AI_EXAM_ASR_WORKERS is ignored in a daemonic worker process; transcribing in-process.")
+    return ReazonTranscriber(
+        batch_size=settings.AI_EXAM_ASR_BATCH_SIZE,
+        gender_mode=settings.AI_EXAM_GENDER_MODE,
+        speaker_clustering=settings.AI_EXAM_SPEAKER_CLUSTERING,
+        segment_cache=segment_cache,
+        pack_target_ms=int(settings.AI_EXAM_ASR_PACK_TARGET_SEC * 1000),
+    )
 
 
 class AIExamService:
     """Split by bell first, then transcribe each cut with local ReazonSpeech formatting."""
 
+    _artifacts: Optional[StageArtifactStore] = None
+    _segment_cache: Optional[SegmentASRCache] = None
+    _clip_storage: Optional[ClipStorage] = None
+    _clip_bitrate = "64k"
+    _clip_warmer: Optional[Callable[[str, str, Sequence[tuple[float, float]]], list[bool]]] = None
+
     def __init__(self):
-        self._splitter = BellAudioSplitter()
-        self._reazon = ReazonTranscriber()
+        settings = get_settings()
+        if settings.AI_EXAM_ARTIFACT_DIR:
+            self._artifacts = StageArtifactStore(BASE_DIR / settings.AI_EXAM_ARTIFACT_DIR)
+            if settings.AI_EXAM_SEGMENT_ASR_CACHE:
+                self._segment_cache = SegmentASRCache(self._artifacts)
+        self._splitter = BellAudioSplitter(
+            extra_bell_paths=(TTS_BELL_START_PATH,),
+            extra_trap_paths=(TTS_BELL_END_PATH,),
+            min_score=settings.AI_EXAM_BELL_MIN_SCORE,
+            streaming=settings.AI_EXAM_BELL_STREAMING,
+        )
+        self._reazon = create_transcriber(settings, segment_cache=self._segment_cache)
+        self._clip_storage = create_clip_storage(
+            settings.AI_EXAM_CLIP_STORAGE,
+            BASE_DIR / settings.AI_EXAM_CLIP_DIR,
+            f"{settings.API_PREFIX}/ai/clips",
+        )
+        self._clip_bitrate = settings.AI_EXAM_CLIP_BITRATE
+        if settings.AI_EXAM_CLIP_PREWARM:
+            from app.shared.upload import warm_audio_clips
+
+            self._clip_warmer = warm_audio_clips
         try:
             self._reazon._load_model()
         except Exception as exc:
@@ -855,60 +1217,101 @@ class AIExamService:
 
     def generate(
         self,
-        audio_bytes: bytes,
+        audio_bytes: Union[AudioSource, PCMBuffer],
         filename: str,
         jlpt_level: str = "N2",
         mondai_config: Optional[list] = None,
         cloudinary_public_id: Optional[str] = None,
         cloudinary_format: Optional[str] = "mp3",
         progress_callback: Optional[Callable[[str], None]] = None,
+        segment_callback: Optional[Callable[[AISplitSegment], None]] = None,
+        content_hash: Optional[str] = None,
+        pipeline_metrics: Optional[PipelineMetrics] = None,
+        cloudinary_upload: Optional[Future] = None,
+        clip_source: Optional[AudioSource] = None,
     ) -> AIExamResult:
-        self._notify(progress_callback, "Step 2/7: Detecting bell timestamps...")
-        split_segments = self._splitter.split_audio(audio_bytes, suffix=Path(filename).suffix or ".mp3")
-        logger.info("Split audio into %s bell-based segments.", len(split_segments))
-
-        self._notify(progress_callback, "Step 3/7: Cutting question audio with PyDub...")
-        split_segments = list(split_segments)
-
-        self._notify(progress_callback, "Step 4/7: ReazonSpeech transcribing split audio...")
-        for segment in split_segments:
-            transcript_result = self._reazon.transcribe(
-                segment.audio_bytes,
-                suffix=".wav",
-                base_offset_ms=segment.start_ms,
+        """Run the full pipeline; stage timings and counters go to `pipeline_metrics` when given.
+
+        `cloudinary_upload` is an upload still in flight (see `submit_audio_upload`);
+        its `public_id`/`format` are only waited for when clip URLs are attached.
+        `clip_source` is the original upload (bytes or a file path) for local clips
+        when `audio_bytes` is already decoded PCM.
+        """
+        with metrics.collecting(pipeline_metrics or PipelineMetrics()):
+            return self._generate(
+                audio_bytes,
+                filename,
+                jlpt_level=jlpt_level,
+                cloudinary_public_id=cloudinary_public_id,
+                cloudinary_format=cloudinary_format,
+                progress_callback=progress_callback,
+                segment_callback=segment_callback,
+                content_hash=content_hash,
+                cloudinary_upload=cloudinary_upload,
+                clip_source=clip_source,
             )
-            segment.transcript = transcript_result["raw_text"]
-            segment.timestamped_transcript = transcript_result.get("timestamped_raw_text", "").strip()
-            segment.refined_transcript = transcript_result["formatted_text"]
-            segment.introduction = transcript_result["introduction"]
-            segment.script_text = transcript_result["script_text"]
-            segment.question_texts = transcript_result["question_texts"]
-            segment.spoken_question_number = transcript_result["spoken_question_number"]
-            segment.announced_mondai_number = transcript_result.get("announced_mondai_number")
+
+    def _generate(
+        self,
+        audio_bytes: Union[AudioSource, PCMBuffer],
+        filename: str,
+        jlpt_level: str,
+        cloudinary_public_id: Optional[str],
+        cloudinary_format: Optional[str],
+        progress_callback: Optional[Callable[[str], None]],
+        segment_callback: Optional[Callable[[AISplitSegment], None]],
+        content_hash: Optional[str],
+        cloudinary_upload: Optional[Future],
+        clip_source: Optional[AudioSource] = None,
+    ) -> AIExamResult:
+        self._notify(progress_callback, "Step 2/7: Detecting bell timestamps...")
+        split_segments = self._split_and_transcribe(
+            audio_bytes,
+            suffix=Path(filename).suffix or ".mp3",
+            content_hash=content_hash,
+            progress_callback=progress_callback,
+            segment_callback=segment_callback,
+        )
+        logger.info("Split and transcribed %s bell-based segments.", len(split_segments))
+        metrics.count("segments", len(split_segments))
 
         self._notify(progress_callback, "Step 5/7: Formatting scripts with local Reazon rules...")
-        structured_segments = self._build_structured_segments(split_segments, jlpt_level=jlpt_level)
+        with metrics.stage("structuring"):
+            structured_segments = self._build_structured_segments(split_segments, jlpt_level=jlpt_level)
 
         self._notify(progress_callback, "Step 6/7: Building local question drafts...")
-        questions = self._build_questions(structured_segments, split_segments)
-        timestamps = self._build_timestamps(questions)
-        refined_script = self._build_refined_script(structured_segments)
-        raw_transcript = self._build_raw_transcript(split_segments)
-        result_split_segments = [
-            AISplitSegment(
-                segment_index=segment.segment_index,
-                file_name=segment.file_name,
-                start_time=segment.start_ms / 1000.0,
-                end_time=segment.end_ms / 1000.0,
-                transcript=segment.transcript,
-                refined_transcript=segment.refined_transcript or None,
-            )
-            for segment in split_segments
-        ]
+        with metrics.stage("questions"):
+            questions = self._build_questions(structured_segments, split_segments)
+            timestamps = self._build_timestamps(questions)
+            refined_script = self._build_refined_script(structured_segments)
+            raw_transcript = self._build_raw_transcript(split_segments)
+            result_split_segments = [self._to_split_segment(segment) for segment in split_segments]
+        metrics.count("questions", len(questions))
 
         self._notify(progress_callback, "Step 7/7: Attaching clipped audio URLs...")
-        if cloudinary_public_id:
-            self._attach_audio_urls(questions, cloudinary_public_id, cloudinary_format or "mp3")
+        if self._clip_storage is not None:
+            # Clips are rendered here once, so the Cloudinary upload is not waited for.
+            with metrics.stage("clips"):
+                self._attach_local_clips(
+                    questions,
+                    clip_source if clip_source is not None else audio_bytes,
+                    Path(filename).suffix,
+                    content_hash,
+                )
+        elif cloudinary_upload is not None:
+            with metrics.stage("upload_wait"):
+                uploaded = cloudinary_upload.result()
+            cloudinary_public_id = uploaded.get("public_id")
+            cloudinary_format = uploaded.get("format") or cloudinary_format
+        clip_warm_ms = None
+        if self._clip_storage is None and cloudinary_public_id:
+            with metrics.stage("audio_urls"):
+                self._attach_audio_urls(questions, cloudinary_public_id, cloudinary_format or "mp3")
+            if self._clip_warmer is not None:
+                with metrics.stage("clip_warm"):
+                    clip_warm_ms = self._warm_audio_clips(
+                        questions, cloudinary_public_id, cloudinary_format or "mp3"
+                    )
 
         return AIExamResult(
             raw_transcript=raw_transcript,
@@ -916,8 +1319,190 @@ class AIExamService:
             split_segments=result_split_segments,
             timestamps=timestamps,
             questions=questions,
+            clip_warm_ms=clip_warm_ms,
+        )
+
+    def _split_and_transcribe(
+        self,
+        audio_bytes: Union[AudioSource, PCMBuffer],
+        suffix: str,
+        content_hash: Optional[str] = None,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        segment_callback: Optional[Callable[[AISplitSegment], None]] = None,
+    ) -> list[SplitAudioChunk]:
+        """Cut segments on a producer thread and transcribe them as they arrive.
+
+        Everything already queued when the ASR becomes free is transcribed as one
+        batch, so chunks are still batched across segments. With an artifact
+        store, stored split boundaries and ASR records are reused instead.
+        """
+        split_key = None
+        stored_bounds = None
+        if self._artifacts is not None:
+            if content_hash is None:
+                if isinstance(audio_bytes, Path):
+                    with audio_bytes.open("rb") as upload:
+                        content_hash = hashlib.file_digest(upload, "sha256").hexdigest()
+                else:
+                    digest_source = audio_bytes.samples if isinstance(audio_bytes, PCMBuffer) else audio_bytes
+                    content_hash = hashlib.sha256(digest_source).hexdigest()
+            split_key = make_artifact_key(content_hash, self._splitter.cache_params())
+            stored_bounds = self._artifacts.get("split", split_key)
+        if stored_bounds is not None:
+            logger.info("Reusing %s stored split boundaries.", len(stored_bounds))
+            source = iter([SplitAudioChunk(**bounds) for bounds in stored_bounds])
+        else:
+            source = self._splitter.iter_split_audio(audio_bytes, suffix=suffix)
+        full_audio: list[PCMBuffer] = []
+
+        def segment_audio(segment: SplitAudioChunk) -> Union[bytes, PCMBuffer]:
+            # Segments rebuilt from stored bounds carry no audio; decode the upload once on demand.
+            if segment.pcm is None and not segment.audio_bytes:
+                if not full_audio:
+                    full_audio.append(
+                        audio_bytes if isinstance(audio_bytes, PCMBuffer) else PCMBuffer.from_bytes(audio_bytes)
+                    )
+                segment.pcm = full_audio[0].slice_ms(segment.start_ms, segment.end_ms)
+            return segment.audio
+
+        ready: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        finished = object()
+
+        def produce() -> None:
+            try:
+                for segment in source:
+                    if stop.is_set():
+                        return
+                    ready.put(segment)
+            except BaseException as exc:
+                ready.put(exc)
+            finally:
+                ready.put(finished)
+
+        # Run in a copy of this context so the splitter's stages reach the same metrics.
+        producer = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(produce,),
+            name="ai-exam-splitter",
+            daemon=True,
+        )
+        producer.start()
+        self._notify(progress_callback, "Step 3/7: Cutting question audio...")
+
+        split_segments: list[SplitAudioChunk] = []
+        done = False
+        try:
+            while not done:
+                items = [ready.get()]
+                while True:
+                    try:
+                        items.append(ready.get_nowait())
+                    except queue.Empty:
+                        break
+                for item in items:
+                    if isinstance(item, BaseException):
+                        raise item
+                done = any(item is finished for item in items)
+                batch = [item for item in items if isinstance(item, SplitAudioChunk)]
+                if not batch:
+                    continue
+
+                if not split_segments:
+                    self._notify(progress_callback, "Step 4/7: ReazonSpeech transcribing split audio...")
+                started = time.perf_counter()
+                with metrics.stage("asr"):
+                    transcript_results = self._transcribe_batch(batch, content_hash, segment_audio)
+                metrics.record(
+                    "asr_batches",
+                    {
+                        "segments": len(batch),
+                        "audio_seconds": round(sum(segment.end_ms - segment.start_ms for segment in batch) / 1000.0, 3),
+                        "wall_seconds": round(time.perf_counter() - started, 3),
+                    },
+                )
+                for segment, transcript_result in zip(batch, transcript_results):
+                    self._apply_transcript(segment, transcript_result)
+                    split_segments.append(segment)
+                    if segment_callback:
+                        segment_callback(self._to_split_segment(segment))
+                if not done:
+                    self._notify(
+                        progress_callback,
+                        f"Step 4/7: Transcribed {len(split_segments)} segment(s), still cutting question audio...",
+                    )
+        finally:
+            stop.set()
+        producer.join()
+
+        if split_key is not None and stored_bounds is None:
+            self._artifacts.put(
+                "split",
+                split_key,
+                [
+                    {
+                        "segment_index": segment.segment_index,
+                        "file_name": segment.file_name,
+                        "start_ms": segment.start_ms,
+                        "end_ms": segment.end_ms,
+                    }
+                    for segment in split_segments
+                ],
+            )
+        return split_segments
+
+    def _transcribe_batch(
+        self,
+        batch: Sequence[SplitAudioChunk],
+        content_hash: Optional[str],
+        segment_audio: Callable[[SplitAudioChunk], Union[bytes, PCMBuffer]],
+    ) -> list[dict]:
+        if self._artifacts is None:
+            return self._reazon.transcribe_many([(segment_audio(segment), segment.start_ms) for segment in batch])
+
+        asr_params = self._reazon.cache_params()
+        keys = [make_artifact_key(content_hash, segment.start_ms, segment.end_ms, asr_params) for segment in batch]
+        records = [self._artifacts.get("asr", key) for key in keys]
+        missing = [index for index, stored in enumerate(records) if stored is None]
+        metrics.count("asr_artifact_hits", len(batch) - len(missing))
+        if missing:
+            recognized = self._reazon.recognize_many([segment_audio(batch[index]) for index in missing])
+            for index, segment_records in zip(missing, recognized):
+                records[index] = segment_records
+                self._artifacts.put("asr", keys[index], segment_records)
+        logger.info("Reused stored ASR records for %s/%s segments.", len(batch) - len(missing), len(batch))
+        return [
+            ReazonTranscriber.format_transcript(segment_records, segment.start_ms)
+            for segment_records, segment in zip(records, batch)
+        ]
+
+    @staticmethod
+    def _apply_transcript(segment: SplitAudioChunk, transcript_result: dict) -> None:
+        segment.transcript = transcript_result["raw_text"]
+        segment.timestamped_transcript = transcript_result.get("timestamped_raw_text", "").strip()
+        segment.refined_transcript = transcript_result["formatted_text"]
+        segment.introduction = transcript_result["introduction"]
+        segment.script_text = transcript_result["script_text"]
+        segment.question_texts = transcript_result["question_texts"]
+        segment.spoken_question_number = transcript_result["spoken_question_number"]
+        segment.announced_mondai_number = transcript_result.get("announced_mondai_number")
+
+    @staticmethod
+    def _to_split_segment(segment: SplitAudioChunk) -> AISplitSegment:
+        return AISplitSegment(
+            segment_index=segment.segment_index,
+            file_name=segment.file_name,
+            start_time=segment.start_ms / 1000.0,
+            end_time=segment.end_ms / 1000.0,
+            transcript=segment.transcript,
+            refined_transcript=segment.refined_transcript or None,
         )
 
+    def segment_cache_stats(self) -> dict:
+        if self._segment_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._segment_cache.stats()}
+
     @property
     def model_name(self) -> str:
         return "reazonspeech-local"
@@ -1174,30 +1759,103 @@ class AIExamService:
             )
         return timestamps
 
+    @staticmethod
+    def _clip_bounds(question: AIQuestion) -> Optional[tuple[float, float]]:
+        """The question's clip in seconds, widened to whole tenths; None without source timestamps."""
+        import math
+
+        if question.source_start_time is None or question.source_end_time is None:
+            logger.warning(
+                "Q(%s,%s): missing source timestamps, audio_url will be empty",
+                question.mondai_group,
+                question.question_number,
+            )
+            return None
+        return math.floor(question.source_start_time * 10) / 10.0, math.ceil(question.source_end_time * 10) / 10.0
+
+    def _attach_local_clips(
+        self,
+        questions: Sequence[AIQuestion],
+        source: Union[bytes, Path, PCMBuffer],
+        source_suffix: str,
+        content_hash: Optional[str],
+    ) -> None:
+        """Render each question's clip once into clip storage and point `audio_url` at it."""
+        import tempfile
+        import uuid
+
+        prefix = content_hash or uuid.uuid4().hex
+        pending: dict[str, tuple[float, float]] = {}
+        keys: list[tuple[AIQuestion, str]] = []
+        for question in questions:
+            bounds = self._clip_bounds(question)
+            if bounds is None:
+                continue
+            # Keyed by upload and bounds, so re-runs and other levels of the same audio share clips.
+            key = f"{prefix}/{round(bounds[0] * 10)}-{round(bounds[1] * 10)}.mp3"
+            keys.append((question, key))
+            if key not in pending and not self._clip_storage.exists(key):
+                pending[key] = bounds
+
+        if pending:
+            with tempfile.TemporaryDirectory() as directory:
+                rendered = render_clips(
+                    source,
+                    list(pending.values()),
+                    Path(directory),
+                    source_suffix=source_suffix,
+                    bitrate=self._clip_bitrate,
+                )
+                for key, path in zip(pending, rendered):
+                    self._clip_storage.put_file(key, path)
+        metrics.count("clips_rendered", len(pending))
+        stored = len({key for _, key in keys}) - len(pending)
+        logger.info("Rendered %s clip(s); %s already stored.", len(pending), stored)
+        for question, key in keys:
+            question.audio_url = self._clip_storage.url(key)
+
+    def _warm_audio_clips(
+        self,
+        questions: Sequence[AIQuestion],
+        cloudinary_public_id: str,
+        cloudinary_format: str,
+    ) -> int:
+        """Queue every clip transformation in one eager call and set `audio_warm_queued`; returns the time taken in ms."""
+        clipped = [question for question in questions if question.audio_url]
+        clips = list(dict.fromkeys(self._clip_bounds(question) for question in clipped))
+        started = time.perf_counter()
+        try:
+            ready = dict(zip(clips, self._clip_warmer(cloudinary_public_id, cloudinary_format, clips)))
+        except Exception as exc:
+            # Not fatal: the clip URLs still work, they are just transformed on first play.
+            logger.warning("Failed to pre-warm %s clip(s) for %s: %s", len(clips), cloudinary_public_id, exc)
+            ready = {}
+        elapsed_ms = round((time.perf_counter() - started) * 1000)
+        for question in clipped:
+            question.audio_warm_queued = ready.get(self._clip_bounds(question), False)
+        metrics.count("clips_warm_queued", sum(ready.values()))
+        logger.info("Queued %s/%s clip transformation(s) in %s ms.", sum(ready.values()), len(clips), elapsed_ms)
+        return elapsed_ms
+
     @staticmethod
     def _attach_audio_urls(
         questions: Sequence[AIQuestion],
         cloudinary_public_id: str,
         cloudinary_format: str,
     ) -> None:
-        import math
         import cloudinary.utils
 
         for question in questions:
-            if question.source_start_time is None or question.source_end_time is None:
-                logger.warning(
-                    "Q(%s,%s): missing source timestamps, audio_url will be empty",
-                    question.mondai_group,
-                    question.question_number,
-                )
+            bounds = AIExamService._clip_bounds(question)
+            if bounds is None:
                 continue
 
             audio_url, _ = cloudinary.utils.cloudinary_url(
                 cloudinary_public_id,
                 resource_type="video",
                 format=cloudinary_format,
-                start_offset=math.floor(question.source_start_time * 10) / 10.0,
-                end_offset=math.ceil(question.source_end_time * 10) / 10.0,
+                start_offset=bounds[0],
+                end_offset=bounds[1],
                 secure=True,
             )
             question.audio_url = audio_url
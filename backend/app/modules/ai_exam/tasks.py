@@ -1,27 +1,42 @@
 import asyncio
-import base64
+import json
 import logging
+import time
 import uuid
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from app.core.celery_app import celery_app
+from app.core.config import BASE_DIR, get_settings
 from app.db.session import AsyncSessionLocal
+from app.modules.ai_exam.blob_store import AudioBlobStore
+from app.modules.ai_exam.fingerprint import (
+    FINGERPRINT_VERSION,
+    Fingerprint,
+    decode_and_fingerprint,
+    index_fingerprint,
+    reuse_near_duplicate,
+)
+from app.modules.ai_exam.ingest import SpooledUpload
+from app.modules.ai_exam.job_store import ProgressWriter
+from app.modules.ai_exam.metrics import PipelineMetrics
 from app.modules.ai_exam.models import AIExamCache
+from app.modules.ai_exam.result_codec import store_result
 from app.modules.ai_exam.schemas import AIExamResult
-from app.modules.ai_exam.service import AIExamService, MODEL_NAME, PIPELINE_VERSION
+from app.modules.ai_exam.service import AIExamService
 from app.modules.audio.models import Audio
 from app.modules.exam.models import Exam  # noqa: F401
 from app.modules.questions.models import Question, Answer  # noqa: F401
 from app.modules.result.models import UserResult  # noqa: F401
 from app.modules.ai_feedback.models import AIFeedback  # noqa: F401
 from app.modules.users.models import User  # noqa: F401
-from app.shared.upload import upload_audio_bytes
+from app.shared.upload import submit_audio_upload
 
 logger = logging.getLogger(__name__)
 
 _service: Optional[AIExamService] = None
+_blob_store: Optional[AudioBlobStore] = None
 
 
 def get_service() -> AIExamService:
@@ -31,6 +46,13 @@ def get_service() -> AIExamService:
     return _service
 
 
+def get_blob_store() -> AudioBlobStore:
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = AudioBlobStore(BASE_DIR / get_settings().AI_EXAM_BLOB_DIR)
+    return _blob_store
+
+
 async def _update_cache_status(
     cache_id: str,
     *,
@@ -41,6 +63,8 @@ async def _update_cache_status(
     filename: Optional[str] = None,
     content_hash: Optional[str] = None,
     cloudinary_res: Optional[dict] = None,
+    metrics: Optional[PipelineMetrics] = None,
+    fingerprint: Optional[Fingerprint] = None,
 ) -> None:
     async with AsyncSessionLocal() as db:
         cache = await db.get(AIExamCache, uuid.UUID(cache_id))
@@ -53,8 +77,11 @@ async def _update_cache_status(
             cache.progress_message = progress_message
         if error_message is not None or status == "failed":
             cache.error_message = error_message
+        if metrics is not None:
+            cache.metrics_json = json.dumps(metrics.to_dict())
 
         if result is not None:
+            service = get_service()
             audio_result = await db.execute(select(Audio).where(Audio.content_hash == content_hash))
             audio = audio_result.scalar_one_or_none()
             if audio is None:
@@ -64,7 +91,7 @@ async def _update_cache_status(
                     file_url=cloudinary_res["secure_url"],
                     duration=int(cloudinary_res["duration"]) if cloudinary_res.get("duration") else None,
                     ai_status="completed",
-                    ai_model=MODEL_NAME,
+                    ai_model=service.model_name,
                     raw_transcript=result.raw_transcript,
                 )
                 db.add(audio)
@@ -74,29 +101,41 @@ async def _update_cache_status(
                 audio.file_url = cloudinary_res["secure_url"]
                 audio.duration = int(cloudinary_res["duration"]) if cloudinary_res.get("duration") else audio.duration
                 audio.ai_status = "completed"
-                audio.ai_model = MODEL_NAME
+                audio.ai_model = service.model_name
                 audio.raw_transcript = result.raw_transcript
+            if fingerprint is not None and audio.fingerprint_version != FINGERPRINT_VERSION:
+                await index_fingerprint(db, audio, fingerprint)
 
             cache.audio_id = audio.audio_id
             result.audio_id = str(audio.audio_id)
             result.audio_file_url = audio.file_url
             cache.source_filename = filename
-            cache.ai_model = MODEL_NAME
-            cache.pipeline_version = PIPELINE_VERSION
+            cache.ai_model = service.model_name
+            cache.pipeline_version = service.pipeline_version
             cache.cloudinary_public_id = cloudinary_res.get("public_id")
             cache.cloudinary_format = cloudinary_res.get("format", "mp3")
-            cache.result_json = result.model_dump_json()
+            store_result(cache, result)
             cache.error_message = None
 
         await db.commit()
 
 
+async def _write_progress(cache_id: str, message: str) -> None:
+    """Progress-only update: one UPDATE statement, no row load."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(AIExamCache)
+            .where(AIExamCache.cache_id == uuid.UUID(cache_id))
+            .values(status="processing", progress_message=message)
+        )
+        await db.commit()
+
+
 async def _run_generate_exam_task(
     *,
     job_id: str,
     cache_id: str,
     content_hash: str,
-    audio_base64: str,
     filename: str,
     jlpt_level: str,
     mondai_config: Optional[list] = None,
@@ -105,46 +144,63 @@ async def _run_generate_exam_task(
 ) -> None:
     from app.modules.notifications.service import create_notification
 
+    metrics = PipelineMetrics()
+    # Coalesced and written on the event loop, so the pipeline thread never waits on the database.
+    progress = ProgressWriter(asyncio.get_running_loop(), lambda message: _write_progress(cache_id, message))
     try:
-        cloudinary_res: Optional[dict] = None
-        audio_bytes = base64.b64decode(audio_base64.encode("ascii"))
-        loop = asyncio.get_running_loop()
+        audio_bytes = await asyncio.to_thread(get_blob_store().get, content_hash)
+        audio_input = audio_bytes
+        fingerprint = None
+        if get_settings().AI_EXAM_FINGERPRINT_DEDUP:
+            await _update_cache_status(
+                cache_id,
+                status="processing",
+                progress_message="Step 1/7: Fingerprinting audio to look for near-duplicate uploads...",
+                error_message=None,
+            )
+            audio_input, fingerprint = await asyncio.to_thread(decode_and_fingerprint, audio_bytes, metrics)
+            async with AsyncSessionLocal() as db:
+                cache = await db.get(AIExamCache, uuid.UUID(cache_id))
+                if cache is None:
+                    raise RuntimeError("AI cache record not found.")
+                reused = await reuse_near_duplicate(
+                    db, cache, fingerprint, get_settings().AI_EXAM_FINGERPRINT_MIN_CONFIDENCE
+                )
+                if reused is not None:
+                    cache.metrics_json = json.dumps(metrics.to_dict())
+                    await db.commit()
+                    return
 
         await _update_cache_status(
             cache_id,
             status="processing",
-            progress_message="Step 1/7: Uploading raw audio to Cloudinary...",
+            progress_message="Step 1/7: Uploading raw audio to Cloudinary in the background...",
             error_message=None,
         )
-        cloudinary_res = await upload_audio_bytes(
-            audio_bytes,
-            filename,
-            public_id=content_hash,
+        # Bell detection and ASR start right away; the pipeline joins the upload at Step 7.
+        upload_started = time.perf_counter()
+        cloudinary_upload = submit_audio_upload(audio_bytes, filename, public_id=content_hash)
+        cloudinary_upload.add_done_callback(
+            lambda _: metrics.record("upload", {"wall_seconds": round(time.perf_counter() - upload_started, 3)})
         )
 
         service = get_service()
-
-        def set_progress(message: str) -> None:
-            future = asyncio.run_coroutine_threadsafe(
-                _update_cache_status(
-                    cache_id,
-                    status="processing",
-                    progress_message=message,
-                ),
-                loop,
-            )
-            future.result()
-
         result = await asyncio.to_thread(
             service.generate,
-            audio_bytes,
+            audio_input,
             filename,
             jlpt_level,
             mondai_config,
-            cloudinary_res.get("public_id"),
-            cloudinary_res.get("format", "mp3"),
-            set_progress,
+            None,
+            "mp3",
+            progress.progress,
+            content_hash=content_hash,
+            pipeline_metrics=metrics,
+            cloudinary_upload=cloudinary_upload,
+            clip_source=audio_bytes,
         )
+        await progress.aclose()
+        cloudinary_res = await asyncio.wrap_future(cloudinary_upload)
 
         await _update_cache_status(
             cache_id,
@@ -154,6 +210,8 @@ async def _run_generate_exam_task(
             filename=filename,
             content_hash=content_hash,
             cloudinary_res=cloudinary_res,
+            metrics=metrics,
+            fingerprint=fingerprint,
         )
 
         if user_id:
@@ -168,11 +226,14 @@ async def _run_generate_exam_task(
 
     except Exception as exc:
         logger.error("AI pipeline failed for job %s: %s", job_id, exc, exc_info=True)
+        # A late progress write must not turn the row back to "processing".
+        await progress.aclose()
         await _update_cache_status(
             cache_id,
             status="failed",
             progress_message="Pipeline failed.",
             error_message=str(exc),
+            metrics=metrics,
         )
         if user_id:
             from app.modules.notifications.service import create_notification
@@ -192,24 +253,60 @@ def generate_exam_task(
     job_id: str,
     cache_id: str,
     content_hash: str,
-    audio_base64: str,
     filename: str,
     jlpt_level: str,
     mondai_config: Optional[list] = None,
     user_id: Optional[int] = None,
     exam_title: str = "",
 ) -> None:
-    """Run the AI exam generation pipeline in a Celery worker."""
-    asyncio.run(
-        _run_generate_exam_task(
+    """Run the AI exam generation pipeline in a Celery worker.
+
+    The audio is read from the shared blob store by `content_hash`; the job's
+    lease on it is released when the task ends, whatever the outcome.
+    """
+    try:
+        asyncio.run(
+            _run_generate_exam_task(
+                job_id=job_id,
+                cache_id=cache_id,
+                content_hash=content_hash,
+                filename=filename,
+                jlpt_level=jlpt_level,
+                mondai_config=mondai_config,
+                user_id=user_id,
+                exam_title=exam_title,
+            )
+        )
+    finally:
+        get_blob_store().release(content_hash, job_id)
+
+
+def enqueue_generate_exam(
+    *,
+    upload: SpooledUpload,
+    job_id: str,
+    cache_id: str,
+    filename: str,
+    jlpt_level: str,
+    mondai_config: Optional[list] = None,
+    user_id: Optional[int] = None,
+    exam_title: str = "",
+) -> None:
+    """Move the spooled upload into the blob store and queue `generate_exam_task` with only its hash."""
+    blob_store = get_blob_store()
+    content_hash = upload.content_hash
+    blob_store.put_file(content_hash, upload.path, job_id)
+    try:
+        generate_exam_task.delay(
             job_id=job_id,
             cache_id=cache_id,
             content_hash=content_hash,
-            audio_base64=audio_base64,
             filename=filename,
             jlpt_level=jlpt_level,
             mondai_config=mondai_config,
             user_id=user_id,
             exam_title=exam_title,
         )
-    )
+    except Exception:
+        blob_store.release(content_hash, job_id)
+        raise
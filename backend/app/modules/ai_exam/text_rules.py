@@ -0,0 +1,129 @@
+import re
+from typing import Generic, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class KeywordSet:
+    """Compiled `any(keyword in text for keyword in keywords)`."""
+
+    def __init__(self, keywords: Sequence[str]):
+        ordered = sorted(set(keywords), key=len, reverse=True)
+        self.pattern = re.compile("|".join(map(re.escape, ordered)))
+
+    def search(self, text: str) -> bool:
+        return self.pattern.search(text) is not None
+
+
+class KeywordClassifier(Generic[T]):
+    """First family (in priority order) with a keyword anywhere in the text.
+
+    All keywords share one longest-first alternation. Each search resumes one
+    character after the previous hit, so overlapping keywords are still seen;
+    a keyword also stands for the shorter keywords it starts with, which the
+    alternation hides at the same position.
+    """
+
+    def __init__(self, families: Sequence[tuple[T, Sequence[str]]]):
+        self.labels = [label for label, _ in families]
+        ranks: dict[str, int] = {}
+        for index, (_, keywords) in enumerate(families):
+            for keyword in keywords:
+                ranks.setdefault(keyword, index)
+        self._ranks = {
+            keyword: min(rank for other, rank in ranks.items() if keyword.startswith(other)) for keyword in ranks
+        }
+        self.pattern = re.compile("|".join(map(re.escape, sorted(ranks, key=len, reverse=True))))
+
+    def classify(self, text: str) -> Optional[T]:
+        best: Optional[int] = None
+        match = self.pattern.search(text)
+        while match is not None:
+            rank = self._ranks[match.group()]
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+            match = self.pattern.search(text, match.start() + 1)
+        return None if best is None else self.labels[best]
+
+
+class PrefixRules(Generic[T]):
+    """Ordered `^`-anchored patterns merged into one alternation; the first rule that matches wins.
+
+    Alternatives of an anchored alternation are tried in order at the start of
+    the text, so the result equals trying each pattern in turn.
+    """
+
+    def __init__(self, rules: Sequence[tuple[str, T]]):
+        self.values = [value for _, value in rules]
+        alternatives = [f"(?P<r{index}>{source.removeprefix('^')})" for index, (source, _) in enumerate(rules)]
+        self.pattern = re.compile(f"^(?:{'|'.join(alternatives)})")
+
+    def match(self, text: str) -> Optional[T]:
+        found = self.pattern.match(text)
+        return None if found is None else self.values[int(found.lastgroup[1:])]
+
+
+QUESTION_NUMBER_RULES = PrefixRules(
+    [
+        (r"^(?:れい|レイ|例)(?:$|[。、「」『』\s]|を|で|は|の|だ|です)", 0),
+        (r"^(?:第)?(?:十二|じゅうに|ジュウニ|12)\s*番", 12),
+        (r"^(?:第)?(?:十一|じゅういち|ジュウイチ|11)\s*番", 11),
+        (r"^(?:第)?(?:十|じゅう|ジュウ|10)\s*番", 10),
+        (r"^(?:第)?(?:九|きゅう|く|キュウ|ク|9)\s*番", 9),
+        (r"^(?:第)?(?:八|はち|ハチ|8)\s*番", 8),
+        (r"^(?:第)?(?:七|なな|しち|ナナ|シチ|7)\s*番", 7),
+        (r"^(?:第)?(?:六|ろく|ロク|6)\s*番", 6),
+        (r"^(?:第)?(?:五|ご|ゴ|5)\s*番", 5),
+        (r"^(?:第)?(?:四|よん|ヨン|4)\s*番", 4),
+        (r"^(?:第)?(?:三|さん|サン|3)\s*番", 3),
+        (r"^(?:第)?(?:二|に|ニ|2)\s*番", 2),
+        (r"^(?:第)?(?:一|いち|イチ|1)\s*番", 1),
+    ]
+)
+
+# The numerals start with distinct characters, so every announcement is found by one scan.
+MONDAI_NUMBER_PATTERN = re.compile(
+    r"(?:問題|もんだい|モンダイ)\s*"
+    r"(?:(?P<m5>五|ご|ゴ|5)|(?P<m4>四|よん|ヨン|4)|(?P<m3>三|さん|サン|3)|(?P<m2>二|に|ニ|2)|(?P<m1>一|いち|イチ|1))"
+)
+
+QUESTION_KEYWORDS = KeywordSet(["何", "どれ", "どこ", "誰", "いつ", "どう", "どの", "どちら", "いくつ", "なぜ", "どうして"])
+QUESTION_ENDINGS = ("か。", "か？", "ですか。", "でしょうか。", "ますか。")
+
+QUESTION_TYPES = KeywordClassifier(
+    [
+        ("time", ["何時", "いつ", "何曜日", "何日"]),
+        ("quantity", ["いくつ", "何個", "何本", "何枚", "何人", "いくら", "何階", "何冊"]),
+        ("place", ["どこ", "どちら", "どの場所"]),
+        ("person", ["誰", "どの人"]),
+        ("reason", ["どうして", "なぜ"]),
+        ("method", ["どう"]),
+    ]
+)
+
+OUTRO_SUBJECTS = KeywordSet(["男の人", "女の人", "学生", "男の子", "女の子", "人", "何"])
+
+SENTENCE_PATTERN = re.compile(r"[^。！？\n]+[。！？]?")
+LEADING_PUNCTUATION_PATTERN = re.compile(r"^[\s。、「」『』\-]+")
+SPEAKER_PREFIX_PATTERN = re.compile(r"^[^：\n]{1,12}：")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+BLANK_LINE_PATTERN = re.compile(r"\n\s*\n")
+TIMESTAMP_PREFIX_PATTERN = re.compile(r"^\d{2}:\d{2}(?::\d{2})?:\s*(.+)$")
+NOISE_PATTERN = re.compile(r"(ピン|パン|プッ|ピッ|プ|ピ)")
+NEXT_MARKER_PATTERN = re.compile(r"(次。?)")
+BAN_MARKER_PATTERN = re.compile(r"((?:一|二|三|四|五|六|七|八|九|十|1|2|3|4|5|6|7|8|9|10)番)？?。?")
+
+TIME_CANDIDATE_PATTERN = re.compile(
+    r"(?:午前|午後)?\d{1,2}時(?:半|\d{1,2}分)?|(?:午前|午後)?[一二三四五六七八九十]+時(?:半|[一二三四五六七八九十]+分)?"
+)
+QUANTITY_CANDIDATE_PATTERN = re.compile(
+    r"\d+(?:人|個|本|枚|つ|円|階|冊|回|日)|[一二三四五六七八九十百]+(?:人|個|本|枚|つ|円|階|冊|回|日)"
+)
+PLACE_CANDIDATE_PATTERN = re.compile(
+    r"(?:学校|会社|駅|会議室|教室|図書館|食堂|店|スーパー|病院|郵便局|銀行|公園|家|うち|受付|空港|ホテル|レストラン|喫茶店|部屋|教務課|事務所|売り場)"
+)
+PERSON_CANDIDATE_PATTERN = re.compile(
+    r"(?:男の人|女の人|学生|先生|店員|社員|部長|課長|受付の人|田中さん|山田さん|佐藤さん)"
+)
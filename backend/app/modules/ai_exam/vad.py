@@ -0,0 +1,193 @@
+import math
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from app.modules.ai_exam.pcm import PCMBuffer
+
+SILENCE_OFFSET_DB = -14
+FALLBACK_SILENCE_THRESH_DB = -50
+# Silence inserted between packed chunks so the recognizer sees a pause at each boundary.
+PACK_GAP_MS = 200
+
+
+def _length_ms(samples: np.ndarray, sample_rate: int) -> int:
+    # Same rounding as `len(AudioSegment)`.
+    return round(1000 * len(samples) / sample_rate)
+
+
+def _frame_index(ms: np.ndarray, sample_rate: int) -> np.ndarray:
+    # Same truncation as `AudioSegment._parse_position`.
+    return (ms * sample_rate / 1000.0).astype(np.int64)
+
+
+def _rms(squares_sum: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # audioop.rms truncates to an integer; empty windows count as zero.
+    safe_counts = np.maximum(counts, 1)
+    return np.where(counts > 0, np.floor(np.sqrt(squares_sum / safe_counts)), 0.0)
+
+
+def relative_silence_thresh(pcm: np.ndarray) -> float:
+    """Silence threshold `SILENCE_OFFSET_DB` below the segment loudness, in dBFS."""
+    if not len(pcm):
+        return FALLBACK_SILENCE_THRESH_DB
+    rms = int(math.sqrt(int(np.square(pcm, dtype=np.int32).sum(dtype=np.int64)) / len(pcm)))
+    if rms == 0:
+        return FALLBACK_SILENCE_THRESH_DB
+    return 20 * math.log10(rms / 32768) + SILENCE_OFFSET_DB
+
+
+def detect_silence(pcm: np.ndarray, sample_rate: int, min_silence_len: int, silence_thresh: float) -> np.ndarray:
+    """Vectorised `pydub.silence.detect_silence` on int16 PCM; returns `[start_ms, end_ms]` rows.
+
+    Every 1 ms step of the sliding window is evaluated from one cumulative sum
+    of squares instead of one audioop call per step.
+    """
+    seg_len = _length_ms(pcm, sample_rate)
+    if seg_len < min_silence_len:
+        return np.empty((0, 2), dtype=np.int64)
+
+    threshold = 10 ** (silence_thresh / 20) * 32768
+    cumulative = np.zeros(len(pcm) + 1, dtype=np.int64)
+    # int16 squares fit in int32; only the running sum needs 64 bits.
+    np.cumsum(np.square(pcm, dtype=np.int32), out=cumulative[1:])
+
+    starts_ms = np.arange(seg_len - min_silence_len + 1, dtype=np.int64)
+    window_start = _frame_index(starts_ms, sample_rate)
+    window_end = _frame_index(np.minimum(starts_ms + min_silence_len, seg_len), sample_rate)
+    # pydub pads windows that run past the data with silence, so the missing frames still count.
+    squares_sum = cumulative[np.minimum(window_end, len(pcm))] - cumulative[np.minimum(window_start, len(pcm))]
+    silent_starts = starts_ms[_rms(squares_sum, window_end - window_start) <= threshold]
+    if not len(silent_starts):
+        return np.empty((0, 2), dtype=np.int64)
+
+    breaks = np.flatnonzero(np.diff(silent_starts) > min_silence_len)
+    range_starts = silent_starts[np.concatenate(([0], breaks + 1))]
+    range_ends = silent_starts[np.concatenate((breaks, [len(silent_starts) - 1]))] + min_silence_len
+    return np.column_stack((range_starts, range_ends))
+
+
+def detect_nonsilent(pcm: np.ndarray, sample_rate: int, min_silence_len: int, silence_thresh: float) -> np.ndarray:
+    """Vectorised `pydub.silence.detect_nonsilent`; returns `[start_ms, end_ms]` rows."""
+    seg_len = _length_ms(pcm, sample_rate)
+    silent = detect_silence(pcm, sample_rate, min_silence_len, silence_thresh)
+    if not len(silent):
+        return np.array([[0, seg_len]], dtype=np.int64)
+    if len(silent) == 1 and silent[0, 0] == 0 and silent[0, 1] == seg_len:
+        return np.empty((0, 2), dtype=np.int64)
+
+    starts = np.concatenate(([0], silent[:, 1]))
+    ends = np.concatenate((silent[:, 0], [seg_len]))
+    keep = np.ones(len(starts), dtype=bool)
+    # Like pydub: no tail when the last silence reaches the end, no leading [0, 0].
+    keep[-1] = silent[-1, 1] != seg_len
+    keep[0] &= ends[0] != 0
+    return np.column_stack((starts[keep], ends[keep]))
+
+
+def speech_ranges(
+    audio: PCMBuffer,
+    min_silence_len: int,
+    keep_silence: int,
+    silence_thresh: float | None = None,
+) -> list[tuple[int, int]]:
+    """Non-silent ranges of `audio` in ms, padded by `keep_silence` without overlapping.
+
+    The threshold defaults to `SILENCE_OFFSET_DB` below the audio's own loudness.
+    """
+    pcm = audio.to_int16()
+    seg_len = _length_ms(pcm, audio.sample_rate)
+    if silence_thresh is None:
+        silence_thresh = relative_silence_thresh(pcm)
+    ranges = detect_nonsilent(pcm, audio.sample_rate, min_silence_len, silence_thresh)
+    if not len(ranges):
+        return [(0, seg_len)]
+
+    starts = np.maximum(0, ranges[:, 0] - keep_silence)
+    ends = np.minimum(seg_len, ranges[:, 1] + keep_silence)
+    starts[1:] = np.maximum(starts[1:], ranges[:-1, 1])
+    ends[:-1] = np.minimum(ends[:-1], ranges[1:, 0])
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def split_on_silence(
+    audio: PCMBuffer,
+    min_silence_len: int,
+    keep_silence: int,
+    min_chunk_ms: int = 0,
+) -> list[tuple[int, PCMBuffer]]:
+    """`(start_ms, view)` speech chunks of `audio`; each view shares the segment's samples."""
+    return [
+        (start_ms, audio.slice_ms(start_ms, end_ms))
+        for start_ms, end_ms in speech_ranges(audio, min_silence_len, keep_silence)
+        if end_ms - start_ms >= min_chunk_ms
+    ]
+
+
+@dataclass(frozen=True)
+class ChunkPack:
+    """Adjacent speech chunks joined into one ASR input.
+
+    `offsets_ms` holds where each chunk starts inside `audio`, so recognized
+    tokens can be attributed back to the chunk (and timestamp) they came from.
+    """
+
+    audio: PCMBuffer
+    chunks: tuple[tuple[int, PCMBuffer], ...]
+    offsets_ms: tuple[int, ...]
+    gap_ms: int = 0
+
+    def chunk_index_at(self, seconds: float) -> int:
+        # Tokens inside a gap go to the nearer chunk.
+        return max(0, bisect_right(self.offsets_ms, seconds * 1000 + self.gap_ms / 2) - 1)
+
+
+def pack_chunks(
+    chunks: Sequence[tuple[int, PCMBuffer]],
+    target_ms: int,
+    gap_ms: int = PACK_GAP_MS,
+) -> list[ChunkPack]:
+    """Greedily merge adjacent chunks into packs of at most `target_ms` of audio.
+
+    A chunk longer than the target forms its own pack; `target_ms <= 0`
+    disables packing. Single-chunk packs keep the zero-copy view.
+    """
+    groups: list[list[tuple[int, PCMBuffer]]] = []
+    current_ms = 0
+    for chunk in chunks:
+        duration_ms = chunk[1].duration_ms
+        if groups and target_ms > 0 and current_ms + gap_ms + duration_ms <= target_ms:
+            groups[-1].append(chunk)
+            current_ms += gap_ms + duration_ms
+        else:
+            groups.append([chunk])
+            current_ms = duration_ms
+
+    packs: list[ChunkPack] = []
+    for group in groups:
+        if len(group) == 1:
+            packs.append(ChunkPack(audio=group[0][1], chunks=(group[0],), offsets_ms=(0,)))
+            continue
+        sample_rate = group[0][1].sample_rate
+        gap = np.zeros(int(gap_ms * sample_rate / 1000), dtype=np.float32)
+        parts: list[np.ndarray] = []
+        offsets: list[int] = []
+        position = 0
+        for _, chunk in group:
+            if parts:
+                parts.append(gap)
+                position += len(gap)
+            offsets.append(int(position * 1000 // sample_rate))
+            parts.append(chunk.samples)
+            position += len(chunk.samples)
+        packs.append(
+            ChunkPack(
+                audio=PCMBuffer(samples=np.concatenate(parts), sample_rate=sample_rate),
+                chunks=tuple(group),
+                offsets_ms=tuple(offsets),
+                gap_ms=gap_ms,
+            )
+        )
+    return packs
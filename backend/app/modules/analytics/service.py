@@ -12,6 +12,7 @@ from app.modules.result.models import UserResult
 from app.modules.ai_feedback.models import AIFeedback
 from app.modules.system_feedback.models import SystemFeedback
 from app.modules.ai_exam.models import AIExamCache
+from app.modules.ai_exam.result_codec import stored_result_bytes
 from app.modules.users.models import User
 from app.modules.analytics.schemas import (
     ExamStats, 
@@ -140,9 +141,10 @@ class AnalyticsService:
         total_error_score = 0.0
         valid_error_count = 0
         for c in caches:
-            if c.result_json:
+            encoded = stored_result_bytes(c.result_blob, c.result_json)
+            if encoded:
                 try:
-                    data = json.loads(c.result_json)
+                    data = json.loads(encoded)
                     if "confidence_error_score" in data:
                         total_error_score += float(data["confidence_error_score"])
                         valid_error_count += 1
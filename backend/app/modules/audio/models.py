@@ -17,6 +17,8 @@ class Audio(Base):
     ai_status = Column(String(20), nullable=True, default="pending")  # pending | processing | completed | failed
     ai_model = Column(String(50), nullable=True)
     raw_transcript = Column(Text, nullable=True)
+    fingerprint_version = Column(String(32), nullable=True)  # set once the landmark hashes are indexed
+    fingerprint_hash_count = Column(Integer, nullable=True)
 
     # Relationships
     segments = relationship("TranscriptSegment", back_populates="audio", cascade="all, delete-orphan")
@@ -37,3 +39,13 @@ class TranscriptSegment(Base):
 
     # Relationships
     audio = relationship("Audio", back_populates="segments")
+
+
+class AudioFingerprintHash(Base):
+    """Inverted index of landmark hashes: one row per (audio, hash, anchor frame)."""
+
+    __tablename__ = "audio_fingerprint_hashes"
+
+    audio_id = Column(UUID(as_uuid=True), ForeignKey("audios.audio_id", ondelete="CASCADE"), primary_key=True)
+    hash = Column(Integer, primary_key=True, index=True)
+    frame = Column(Integer, primary_key=True)
@@ -1,3 +1,10 @@
+import asyncio
+import io
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Sequence
+
 import cloudinary
 import cloudinary.uploader
 from fastapi import UploadFile, HTTPException
@@ -13,12 +20,31 @@ cloudinary.config(
     secure=True
 )
 
+# The Cloudinary SDK is blocking; uploads run here so they never stall the event loop,
+# and at most CLOUDINARY_UPLOAD_WORKERS transfers run at once.
+_executor = ThreadPoolExecutor(max_workers=settings.CLOUDINARY_UPLOAD_WORKERS, thread_name_prefix="cloudinary")
+
+
+async def _run_upload(function, *args, **kwargs):
+    return await asyncio.wrap_future(_executor.submit(partial(function, *args, **kwargs)))
+
+
+def _upload_media(file, resource_type: str, size: int | None = None, **options) -> dict:
+    """Upload with the chunked API when the file is large, so one failed request does not restart the transfer."""
+    large_bytes = settings.CLOUDINARY_CHUNKED_UPLOAD_MB * 1024 * 1024
+    if size is not None and size > large_bytes:
+        if isinstance(file, bytes):
+            file = io.BytesIO(file)
+        return cloudinary.uploader.upload_large(file, resource_type=resource_type, chunk_size=large_bytes, **options)
+    return cloudinary.uploader.upload(file, resource_type=resource_type, **options)
+
 async def upload_image(file: UploadFile, folder: str = "avatars") -> str:
     """Upload an image to Cloudinary and return the secure URL."""
     try:
         if not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
-        result = cloudinary.uploader.upload(
+        result = await _run_upload(
+            cloudinary.uploader.upload,
             file.file,
             folder=f"{settings.APP_NAME}/{folder}",
             resource_type="image"
@@ -42,10 +68,12 @@ async def upload_audio(file: UploadFile, folder: str = "question-audio") -> dict
                 status_code=400,
                 detail=f"File must be an audio file (mp3, wav, ogg). Got: {content_type}"
             )
-        result = cloudinary.uploader.upload(
+        result = await _run_upload(
+            _upload_media,
             file.file,
-            folder=f"{settings.APP_NAME}/{folder}",
             resource_type="video",  # Cloudinary treats audio as "video" resource
+            size=file.size,
+            folder=f"{settings.APP_NAME}/{folder}",
         )
         return {
             "secure_url": result.get("secure_url"),
@@ -59,25 +87,78 @@ async def upload_audio(file: UploadFile, folder: str = "question-audio") -> dict
         raise HTTPException(status_code=500, detail=f"Failed to upload audio: {str(e)}")
 
 
+def _upload_audio_sync(
+    audio_bytes: bytes | str,
+    filename: str,
+    folder: str,
+    public_id: str | None,
+) -> dict:
+    size = os.path.getsize(audio_bytes) if isinstance(audio_bytes, str) else len(audio_bytes)
+    result = _upload_media(
+        audio_bytes,
+        resource_type="video",
+        size=size,
+        folder=f"{settings.APP_NAME}/{folder}",
+        public_id=public_id or (filename.split(".")[0] if "." in filename else filename),
+    )
+    return {
+        "secure_url": result.get("secure_url"),
+        "public_id": result.get("public_id"),
+        "duration": result.get("duration"),
+        "format": result.get("format"),
+    }
+
+
+def submit_audio_upload(
+    audio_bytes: bytes | str,
+    filename: str,
+    folder: str = "question-audio",
+    public_id: str | None = None,
+) -> Future:
+    """Start uploading raw audio bytes (or a local file path) in the background.
+
+    The returned future resolves to the same metadata as `upload_audio_bytes`;
+    callers can keep working and join on it only when they need the URL.
+    """
+    return _executor.submit(_upload_audio_sync, audio_bytes, filename, folder, public_id)
+
+
+def warm_audio_clips(
+    public_id: str,
+    audio_format: str,
+    clips: Sequence[tuple[float, float]],
+) -> list[bool]:
+    """Queue the trimmed derivatives for `clips` in one asynchronous eager `explicit` request.
+
+    The transformations match the `start_offset`/`end_offset` clip URLs, so a
+    play after Cloudinary has processed them is served from the CDN instead of
+    being transcoded on demand. The request returns without waiting for the
+    transcodes. Returns, per clip, whether Cloudinary accepted it.
+    """
+    if not clips:
+        return []
+    result = cloudinary.uploader.explicit(
+        public_id,
+        type="upload",
+        resource_type="video",
+        eager=[
+            {"start_offset": start_sec, "end_offset": end_sec, "format": audio_format}
+            for start_sec, end_sec in clips
+        ],
+        eager_async=True,
+    )
+    eager = result.get("eager") or []
+    return [index < len(eager) and eager[index].get("status") != "failed" for index in range(len(clips))]
+
+
 async def upload_audio_bytes(
-    audio_bytes: bytes,
+    audio_bytes: bytes | str,
     filename: str,
     folder: str = "question-audio",
     public_id: str | None = None,
 ) -> dict:
-    """Upload raw audio bytes to Cloudinary and return metadata."""
+    """Upload raw audio bytes (or a local file path) to Cloudinary and return metadata."""
     try:
-        result = cloudinary.uploader.upload(
-            audio_bytes,
-            folder=f"{settings.APP_NAME}/{folder}",
-            resource_type="video",
-            public_id=public_id or (filename.split(".")[0] if "." in filename else filename),
-        )
-        return {
-            "secure_url": result.get("secure_url"),
-            "public_id": result.get("public_id"),
-            "duration": result.get("duration"),
-            "format": result.get("format"),
-        }
+        return await asyncio.wrap_future(submit_audio_upload(audio_bytes, filename, folder, public_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload audio bytes: {str(e)}")
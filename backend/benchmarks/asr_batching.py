@@ -0,0 +1,70 @@
+"""Compare per-chunk, batched and packed ReazonSpeech decoding on a real recording.
+
+Usage (from backend/):
+    python -m benchmarks.asr_batching path/to/jlpt.mp3 --batch-size 16 --pack-target-sec 10
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app.modules.ai_exam.pcm import PCMBuffer
+from app.modules.ai_exam.service import BellAudioSplitter, ReazonTranscriber
+
+
+def _run(transcriber: ReazonTranscriber, segments) -> tuple[float, list[dict]]:
+    started = time.perf_counter()
+    results = transcriber.transcribe_many([(segment.pcm, segment.start_ms) for segment in segments])
+    return time.perf_counter() - started, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("audio", type=Path)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--pack-target-sec", type=float, default=10.0)
+    args = parser.parse_args()
+
+    audio = PCMBuffer.from_bytes(args.audio.read_bytes())
+    segments = BellAudioSplitter().split_audio(audio)
+
+    transcriber = ReazonTranscriber(batch_size=1)
+    transcriber._load_model()
+    transcriber._gender_classifier_attempted = True
+    sequential_seconds, sequential = _run(transcriber, segments)
+
+    transcriber.batch_size = max(1, args.batch_size)
+    batched_seconds, batched = _run(transcriber, segments)
+
+    transcriber.pack_target_ms = int(args.pack_target_sec * 1000)
+    packed_seconds, packed = _run(transcriber, segments)
+
+    matching = sum(
+        1 for left, right in zip(sequential, batched) if left["raw_text"] == right["raw_text"]
+    )
+    print(
+        json.dumps(
+            {
+                "audio": str(args.audio),
+                "duration_seconds": audio.duration_ms / 1000.0,
+                "segments": len(segments),
+                "batch_size": transcriber.batch_size,
+                "per_chunk_seconds": round(sequential_seconds, 3),
+                "batched_seconds": round(batched_seconds, 3),
+                "speedup": round(sequential_seconds / batched_seconds, 2) if batched_seconds else None,
+                "segments_with_identical_text": matching,
+                "pack_target_sec": args.pack_target_sec,
+                "packed_seconds": round(packed_seconds, 3),
+                "packed_speedup": round(sequential_seconds / packed_seconds, 2) if packed_seconds else None,
+                "packed_characters": sum(len(result["raw_text"]) for result in packed),
+                "batched_characters": sum(len(result["raw_text"]) for result in batched),
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
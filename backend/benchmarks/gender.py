@@ -0,0 +1,67 @@
+"""Compare the pitch gender classifier with the wav2vec2 ("accurate") mode.
+
+Runs both on the silence chunks of each bell segment and reports wall time
+and label agreement. Only the audio is needed; no ASR model is loaded.
+
+Usage (from backend/):
+    python -m benchmarks.gender path/to/jlpt.mp3 [more.mp3 ...]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app.modules.ai_exam.pcm import PCMBuffer
+from app.modules.ai_exam.service import BellAudioSplitter, ReazonTranscriber
+
+
+def _timed(transcriber: ReazonTranscriber, chunk_groups) -> tuple[float, list[str]]:
+    started = time.perf_counter()
+    labels: list[str] = []
+    for chunks in chunk_groups:
+        labels.extend(transcriber._predict_genders(chunks))
+    return time.perf_counter() - started, labels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("audio", type=Path, nargs="+")
+    args = parser.parse_args()
+
+    splitter = BellAudioSplitter()
+    planner = ReazonTranscriber(gender_mode="off")
+    chunk_groups = []
+    for path in args.audio:
+        for segment in splitter.split_audio(PCMBuffer.from_bytes(path.read_bytes())):
+            chunk_groups.append([chunk for _, chunk in planner._plan_chunks(segment.pcm)])
+
+    accurate = ReazonTranscriber(gender_mode="accurate", speaker_clustering=False)
+    accurate._load_gender_classifier()
+    report = {"files": [str(path) for path in args.audio], "chunks": sum(map(len, chunk_groups))}
+
+    reference_seconds, reference = _timed(accurate, chunk_groups)
+    report["accurate_seconds"] = round(reference_seconds, 3)
+    for name, transcriber in (
+        ("pitch", ReazonTranscriber(gender_mode="pitch", speaker_clustering=False)),
+        ("pitch_clustered", ReazonTranscriber(gender_mode="pitch", speaker_clustering=True)),
+        ("accurate_clustered", ReazonTranscriber(gender_mode="accurate", speaker_clustering=True)),
+    ):
+        transcriber._gender_classifier = accurate._gender_classifier
+        transcriber._gender_classifier_attempted = True
+        seconds, labels = _timed(transcriber, chunk_groups)
+        comparable = [(left, right) for left, right in zip(reference, labels) if "Unknown" not in (left, right)]
+        report[name] = {
+            "seconds": round(seconds, 3),
+            "speedup": round(reference_seconds / seconds, 1) if seconds else None,
+            "agreement": round(sum(left == right for left, right in comparable) / len(comparable), 3)
+            if comparable
+            else None,
+            "unknown": labels.count("Unknown"),
+        }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Offline benchmark of the AI exam pipeline on synthetic JLPT-like audio.
+
+Builds a speech-like bed of the requested length, drops the real
+`Bell_sound.mp3` before every question (and `Bell_2baku.mp3` traps in
+between), and times bell detection, splitting, VAD, a stub ASR with a fixed
+latency per model call, the text stages and a full `AIExamService.generate`.
+Needs no network and no ReazonSpeech model; output is JSON so runs can be
+diffed across commits.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline --minutes 5 30 60 > bench.json
+    python -m benchmarks.pipeline --minutes 5 --latency-ms 40 --batch-size 16 --repeat 3
+"""
+
+import argparse
+import json
+import subprocess
+import time
+from typing import Callable, Sequence, TypeVar
+
+import numpy as np
+
+from app.modules.ai_exam.metrics import PipelineMetrics
+from app.modules.ai_exam.pcm import ASR_SAMPLE_RATE, PCMBuffer
+from app.modules.ai_exam.service import (
+    BELL_2BAKU_PATH,
+    BELL_SOUND_PATH,
+    PIPELINE_VERSION,
+    AIExamService,
+    BellAudioSplitter,
+    ReazonTranscriber,
+    RecognizedText,
+)
+from benchmarks.vad import _synthetic_dialogue
+
+T = TypeVar("T")
+
+# Canned utterances cycled by the stub ASR, so the text stages see announcements, dialogue and questions.
+UTTERANCES = (
+    "一番",
+    "会社で男の人と女の人が話しています",
+    "男の人は何時に会議をしますか",
+    "会議は三時からです",
+    "すみませんりんごを二つください",
+    "はいわかりました",
+    "女の人はどこへ行きますか",
+    "図書館で本を三冊借ります",
+)
+
+
+class StubTranscriber(ReazonTranscriber):
+    """`ReazonTranscriber` whose model sleeps `latency_ms` per call and returns canned text.
+
+    Everything around the model (VAD, packing, unpacking, pitch gender, text
+    rules) is the real code. A batch costs one call, as on a GPU.
+    """
+
+    def __init__(self, latency_ms: float, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_ms = latency_ms
+        self._calls = 0
+
+    def _load_model(self) -> None:
+        self._model = object()
+
+    def _canned(self, chunk: PCMBuffer) -> RecognizedText:
+        text = UTTERANCES[len(chunk.samples) % len(UTTERANCES)]
+        # Spread the characters over the input so packed chunks can be split back by time.
+        step = chunk.duration_ms / 1000.0 / max(1, len(text))
+        return RecognizedText(text, tuple((index * step, char) for index, char in enumerate(text)))
+
+    def _sleep(self) -> None:
+        self._calls += 1
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def _recognize_one(self, chunk: PCMBuffer) -> RecognizedText:
+        self._sleep()
+        return self._canned(chunk)
+
+    def _recognize_batch(self, chunks: Sequence[PCMBuffer]) -> list[RecognizedText]:
+        self._sleep()
+        return [self._canned(chunk) for chunk in chunks]
+
+
+def _template(path) -> np.ndarray:
+    return PCMBuffer.from_bytes(path.read_bytes()).samples
+
+
+def synthetic_exam(
+    minutes: float,
+    question_sec: float = 40.0,
+    trap_every: int = 4,
+    seed: int = 0,
+) -> tuple[PCMBuffer, list[int]]:
+    """Return the audio and the ms offsets where a question bell was inserted.
+
+    The recording opens with a `Bell_2baku` trap, as the real ones do: bell
+    matching uses a threshold relative to the best match, so without any
+    trap the trap template's best matches land on the question bells.
+    """
+    audio = _synthetic_dialogue(minutes, seed=seed)
+    samples = audio.samples
+    bell, trap = _template(BELL_SOUND_PATH), _template(BELL_2BAKU_PATH)
+    question_samples = int(question_sec * ASR_SAMPLE_RATE)
+    # A short pause before each bell, like the recordings.
+    pause = int(0.5 * ASR_SAMPLE_RATE)
+
+    def insert(template: np.ndarray, start: int) -> bool:
+        if start + len(template) >= len(samples):
+            return False
+        samples[max(0, start - pause):start + len(template)] = 0.0
+        samples[start:start + len(template)] = template
+        return True
+
+    insert(trap, pause)
+    bell_ms: list[int] = []
+    first_bell = pause + len(trap) + 8 * ASR_SAMPLE_RATE
+    for index, start in enumerate(range(first_bell, len(samples), question_samples)):
+        if not insert(bell, start):
+            break
+        bell_ms.append(int(start * 1000 // ASR_SAMPLE_RATE))
+        if trap_every and index % trap_every == trap_every - 1:
+            insert(trap, start + question_samples // 2)
+    return audio, bell_ms
+
+
+def _best_of(repeat: int, function: Callable[[], T]) -> tuple[float, T]:
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(minutes: float, args: argparse.Namespace) -> dict:
+    audio, expected_ms = synthetic_exam(minutes, question_sec=args.question_sec, seed=args.seed)
+    splitter = BellAudioSplitter()
+    transcriber = StubTranscriber(
+        args.latency_ms,
+        batch_size=args.batch_size,
+        pack_target_ms=int(args.pack_target_sec * 1000),
+    )
+    transcriber._load_model()
+    # The first match decodes and caches the bell templates; keep that out of the timings.
+    splitter.find_question_starts(audio.slice_ms(0, 10_000))
+
+    bells_seconds, bells = _best_of(args.repeat, lambda: splitter.find_question_starts(audio))
+    split_seconds, segments = _best_of(args.repeat, lambda: splitter.split_audio(audio))
+    vad_seconds, planned = _best_of(args.repeat, lambda: [transcriber._plan_chunks(segment.pcm) for segment in segments])
+
+    transcriber._calls = 0
+    asr_seconds, records = _best_of(1, lambda: transcriber.recognize_many([segment.pcm for segment in segments]))
+    asr_calls = transcriber._calls
+
+    def text_stages():
+        for segment, segment_records in zip(segments, records):
+            AIExamService._apply_transcript(segment, transcriber.format_transcript(segment_records, segment.start_ms))
+        structured = AIExamService._build_structured_segments(segments)
+        questions = AIExamService._build_questions(structured, segments)
+        AIExamService._build_timestamps(questions)
+        return questions
+
+    text_seconds, questions = _best_of(args.repeat, text_stages)
+
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = splitter
+    service._reazon = transcriber
+    pipeline_metrics = PipelineMetrics()
+    started = time.perf_counter()
+    service.generate(audio, filename="synthetic.wav", pipeline_metrics=pipeline_metrics)
+    generate_seconds = time.perf_counter() - started
+
+    # Bells are detected at their onset give or take a few frames.
+    found = sum(1 for expected in expected_ms if any(abs(expected - got) <= 250 for got in bells))
+    return {
+        "minutes": minutes,
+        "audio_seconds": round(audio.duration_ms / 1000.0, 1),
+        "bells_inserted": len(expected_ms),
+        "bells_detected": len(bells),
+        "bells_matched": found,
+        "segments": len(segments),
+        "chunks": sum(len(chunks) for chunks in planned),
+        "asr_calls": asr_calls,
+        "questions": len(questions),
+        "seconds": {
+            "find_question_starts": round(bells_seconds, 4),
+            "split_audio": round(split_seconds, 4),
+            "vad": round(vad_seconds, 4),
+            "asr_stub": round(asr_seconds, 4),
+            "text_stages": round(text_seconds, 4),
+            "generate": round(generate_seconds, 4),
+        },
+        "generate_metrics": pipeline_metrics.to_dict(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[5.0, 30.0, 60.0])
+    parser.add_argument("--question-sec", type=float, default=40.0, help="Spacing of the inserted question bells.")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stub ASR latency per model call.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--pack-target-sec", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=1, help="Best-of-N for the CPU-bound stages.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = {
+        "commit": _commit(),
+        "pipeline_version": PIPELINE_VERSION,
+        "settings": {
+            "latency_ms": args.latency_ms,
+            "batch_size": args.batch_size,
+            "pack_target_sec": args.pack_target_sec,
+            "question_sec": args.question_sec,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "runs": [run(minutes, args) for minutes in args.minutes],
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
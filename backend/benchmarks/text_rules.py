@@ -0,0 +1,110 @@
+"""Time the text-structuring stage on transcripts stored in `ai_exam_cache`.
+
+Replays `_parse_formatted_segment` and the question helpers on every split
+segment of the completed cache rows (or of exported result JSON files),
+without touching audio or the ASR model.
+
+Usage (from backend/):
+    python -m benchmarks.text_rules --limit 50 --repeat 20
+    python -m benchmarks.text_rules --json exported_result.json --repeat 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from app.modules.ai_exam.service import (
+    _choose_correct_answer,
+    _estimate_question_difficulty,
+    _extract_numbered_answer_options,
+    _parse_formatted_segment,
+    _question_type,
+)
+
+
+async def _load_cached_segments(limit: int) -> list[dict]:
+    from sqlalchemy import or_, select
+
+    from app.db.session import AsyncSessionLocal
+    from app.modules.ai_exam.models import AIExamCache
+    from app.modules.ai_exam.result_codec import stored_result_bytes
+
+    table = AIExamCache.__table__
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(
+            select(table.c.result_blob, table.c.result_json)
+            .where(
+                table.c.status == "completed",
+                or_(table.c.result_blob.is_not(None), table.c.result_json.is_not(None)),
+            )
+            .order_by(table.c.created_at.desc())
+            .limit(limit)
+        )
+        return [
+            segment
+            for result_blob, result_json in rows
+            for segment in json.loads(stored_result_bytes(result_blob, result_json)).get("split_segments", [])
+        ]
+
+
+def _structure(segments: list[dict]) -> int:
+    questions = 0
+    for segment in segments:
+        raw_text = segment.get("transcript") or ""
+        _, script_text, question_texts, _, _ = _parse_formatted_segment(
+            segment.get("refined_transcript") or raw_text,
+            raw_text,
+        )
+        _extract_numbered_answer_options(raw_text)
+        for question_text in question_texts:
+            question_type = _question_type(question_text)
+            _choose_correct_answer(question_type, script_text, question_text)
+            _estimate_question_difficulty(script_text, question_text, [])
+            questions += 1
+    return questions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--json", type=Path, nargs="*", default=[], help="AIExamResult JSON files instead of the database.")
+    parser.add_argument("--limit", type=int, default=100, help="Most recent completed cache rows to load.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.json:
+        segments = [
+            segment
+            for path in args.json
+            for segment in json.loads(path.read_text(encoding="utf-8")).get("split_segments", [])
+        ]
+    else:
+        segments = asyncio.run(_load_cached_segments(args.limit))
+    if not segments:
+        raise SystemExit("No stored split segments found.")
+
+    _structure(segments)
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        questions = _structure(segments)
+    seconds = time.perf_counter() - started
+
+    print(
+        json.dumps(
+            {
+                "segments": len(segments),
+                "questions": questions,
+                "characters": sum(len(segment.get("transcript") or "") for segment in segments),
+                "repeat": args.repeat,
+                "seconds": round(seconds, 4),
+                "microseconds_per_segment": round(seconds / (args.repeat * len(segments)) * 1e6, 1),
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
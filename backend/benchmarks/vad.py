@@ -0,0 +1,85 @@
+"""Time the NumPy silence detector against pydub's `detect_nonsilent`.
+
+Runs both on a synthetic dialogue (speech-like bursts separated by pauses)
+of the requested length, or on real uploads, and checks the ranges match.
+
+Usage (from backend/):
+    python -m benchmarks.vad --minutes 60
+    python -m benchmarks.vad path/to/jlpt.mp3 --skip-pydub
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.modules.ai_exam.pcm import ASR_SAMPLE_RATE, PCMBuffer
+from app.modules.ai_exam.vad import detect_nonsilent, relative_silence_thresh
+
+
+def _synthetic_dialogue(minutes: float, seed: int = 0) -> PCMBuffer:
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * ASR_SAMPLE_RATE)
+    samples = rng.normal(0, 0.002, total).astype(np.float32)
+    cursor = 0
+    while cursor < total:
+        speech = int(rng.uniform(0.8, 6.0) * ASR_SAMPLE_RATE)
+        end = min(total, cursor + speech)
+        t = np.arange(end - cursor, dtype=np.float32) / ASR_SAMPLE_RATE
+        samples[cursor:end] += 0.2 * np.sin(2 * np.pi * rng.uniform(100, 260) * t) * (1 + np.sin(2 * np.pi * 4 * t))
+        cursor = end + int(rng.uniform(0.2, 2.5) * ASR_SAMPLE_RATE)
+    return PCMBuffer(samples=samples)
+
+
+def _time(function) -> tuple[float, list]:
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("audio", type=Path, nargs="*")
+    parser.add_argument("--minutes", type=float, default=60.0, help="Length of the synthetic input.")
+    parser.add_argument("--min-silence-ms", type=int, default=400)
+    parser.add_argument("--skip-pydub", action="store_true", help="pydub takes minutes on hour-long audio.")
+    args = parser.parse_args()
+
+    inputs = (
+        [(str(path), PCMBuffer.from_bytes(path.read_bytes())) for path in args.audio]
+        if args.audio
+        else [(f"synthetic-{args.minutes:g}min", _synthetic_dialogue(args.minutes))]
+    )
+    reports = []
+    for name, audio in inputs:
+        pcm = audio.to_int16()
+        threshold = relative_silence_thresh(pcm)
+        numpy_seconds, ranges = _time(
+            lambda: detect_nonsilent(pcm, audio.sample_rate, args.min_silence_ms, threshold).tolist()
+        )
+        report = {
+            "input": name,
+            "audio_seconds": round(len(pcm) / audio.sample_rate, 1),
+            "ranges": len(ranges),
+            "numpy_seconds": round(numpy_seconds, 3),
+        }
+        if not args.skip_pydub:
+            from pydub import AudioSegment
+            from pydub.silence import detect_nonsilent as pydub_detect_nonsilent
+
+            segment = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=audio.sample_rate, channels=1)
+            pydub_seconds, expected = _time(
+                lambda: pydub_detect_nonsilent(segment, min_silence_len=args.min_silence_ms, silence_thresh=threshold)
+            )
+            report["pydub_seconds"] = round(pydub_seconds, 3)
+            report["speedup"] = round(pydub_seconds / numpy_seconds, 1) if numpy_seconds else None
+            report["identical"] = expected == ranges
+        reports.append(report)
+
+    print(json.dumps(reports, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import typer
 import subprocess
 import os
 import asyncio
+from pathlib import Path
+from typing import Optional
 from sqlalchemy import create_engine, select
 from app.core.config import get_settings
 from app.db.base import Base
@@ -110,5 +112,78 @@ def createsuperuser(
         )
 
 
+
+@app.command()
+def replay_ai_exams(
+    output: Path = typer.Option(Path("ai_exam_replay.jsonl"), help="JSON-lines diff report to write."),
+    workers: int = typer.Option(0, help="Worker processes (0 = one per CPU core)."),
+    limit: Optional[int] = typer.Option(None, help="Replay only the oldest N cached jobs."),
+    include_unchanged: bool = typer.Option(False, help="Also write jobs whose questions did not change."),
+):
+    """Re-run the text stages over cached AI exam transcripts and report changed questions."""
+    from app.modules.ai_exam.replay import replay_cache
+
+    typer.echo("Replaying cached AI exam transcripts...")
+    summary = asyncio.run(
+        replay_cache(output, workers=workers, limit=limit, include_unchanged=include_unchanged)
+    )
+    typer.secho(
+        f"Replayed {summary['jobs']} job(s): {summary['changed']} changed "
+        f"({summary['changes']} field change(s)), {summary['failed']} failed. Report: {output}",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command()
+def gc_ai_blobs(
+    max_age_sec: Optional[int] = typer.Option(None, help="Defaults to AI_EXAM_BLOB_MAX_AGE_SEC."),
+    artifact_max_age_sec: Optional[int] = typer.Option(None, help="Defaults to AI_EXAM_ARTIFACT_MAX_AGE_SEC."),
+):
+    """Delete queued-audio blobs whose jobs died, and stage artifacts nobody has used lately."""
+    from app.core.config import BASE_DIR
+    from app.modules.ai_exam.artifacts import StageArtifactStore
+    from app.modules.ai_exam.blob_store import AudioBlobStore
+
+    store = AudioBlobStore(BASE_DIR / settings.AI_EXAM_BLOB_DIR)
+    removed = store.collect_garbage(max_age_sec if max_age_sec is not None else settings.AI_EXAM_BLOB_MAX_AGE_SEC)
+    typer.secho(
+        f"Removed {removed['blobs']} blob(s) ({removed['bytes']} bytes) and {removed['leases']} expired lease(s).",
+        fg=typer.colors.GREEN,
+    )
+    if settings.AI_EXAM_ARTIFACT_DIR:
+        # Also covers the segment ASR cache, which lives under the same directory.
+        artifacts = StageArtifactStore(BASE_DIR / settings.AI_EXAM_ARTIFACT_DIR)
+        removed = artifacts.collect_garbage(
+            artifact_max_age_sec if artifact_max_age_sec is not None else settings.AI_EXAM_ARTIFACT_MAX_AGE_SEC
+        )
+        typer.secho(
+            f"Removed {removed['artifacts']} stage artifact(s) ({removed['bytes']} bytes).",
+            fg=typer.colors.GREEN,
+        )
+
+
+@app.command()
+def serve_asr(
+    host: str = typer.Option("127.0.0.1", help="Keep on a private interface; the server has no auth."),
+    port: int = typer.Option(8100),
+):
+    """Run the ASR inference server that owns the ReazonSpeech and gender models."""
+    import uvicorn
+
+    from app.modules.ai_exam.asr_server import create_asr_app
+    from app.modules.ai_exam.service import create_transcriber
+
+    transcriber = create_transcriber(settings, use_server=False)
+    asr_app = create_asr_app(
+        transcriber,
+        max_segments=settings.AI_EXAM_ASR_SERVER_MAX_BATCH,
+        max_wait_ms=settings.AI_EXAM_ASR_SERVER_BATCH_WAIT_MS,
+        max_body_bytes=settings.AI_EXAM_ASR_SERVER_MAX_BODY_MB * 1024 * 1024,
+    )
+    typer.echo(f"Starting ASR server on {host}:{port}...")
+    # One process: the model is loaded once and every request goes through the same batcher.
+    uvicorn.run(asr_app, host=host, port=port, workers=1)
+
+
 if __name__ == "__main__":
     app()
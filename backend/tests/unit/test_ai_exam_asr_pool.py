@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from app.modules.ai_exam.asr_pool import ASRWorkerPool
+from app.modules.ai_exam.pcm import PCMBuffer
+
+
+class _EnvReportingTranscriber:
+    """Stands in for ReazonTranscriber inside the worker processes."""
+
+    def __init__(self, num_threads: int, **options):
+        self.num_threads = num_threads
+        self.options = options
+
+    def _load_model(self) -> None:
+        return None
+
+    def recognize_many(self, segments) -> list[list[dict]]:
+        return [
+            [
+                {
+                    "start_ms": 0,
+                    "end_ms": audio.duration_ms,
+                    "text": f"{self.num_threads}/{os.environ['OMP_NUM_THREADS']}/{self.options['gender_mode']}",
+                    "pid": os.getpid(),
+                }
+            ]
+            for audio in segments
+        ]
+
+
+def test_pool_round_trips_segments_in_order_through_warm_workers():
+    pool = ASRWorkerPool(
+        workers=2, threads_per_worker=2, gender_mode="off", transcriber_factory=_EnvReportingTranscriber
+    )
+    assert pool._executor is None  # nothing is spawned until the first segment
+
+    try:
+        segments = [PCMBuffer(samples=np.zeros(16 * length, dtype=np.float32)) for length in (100, 250, 400, 50)]
+        records = pool.recognize_many(segments)
+    finally:
+        pool.shutdown()
+
+    assert [chunks[0]["end_ms"] for chunks in records] == [100, 250, 400, 50]
+    assert {chunks[0]["text"] for chunks in records} == {"2/2/off"}
+    assert os.getpid() not in {chunks[0]["pid"] for chunks in records}
+
+
+def _report_daemon_state(results) -> None:
+    from app.modules.ai_exam.asr_pool import in_daemon_process
+
+    results.put(in_daemon_process())
+
+
+def test_daemonic_workers_transcribe_in_process_instead_of_starting_a_pool(monkeypatch):
+    import multiprocessing
+    from types import SimpleNamespace
+
+    from app.modules.ai_exam import asr_pool
+    from app.modules.ai_exam.service import ReazonTranscriber, create_transcriber
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_report_daemon_state, args=(results,), daemon=True)
+    child.start()
+    child.join(timeout=30)
+    assert results.get(timeout=5) is True
+
+    settings = SimpleNamespace(
+        AI_EXAM_ASR_SERVER_URL="",
+        AI_EXAM_ASR_WORKERS=2,
+        AI_EXAM_ASR_THREADS_PER_WORKER=1,
+        AI_EXAM_ASR_BATCH_SIZE=1,
+        AI_EXAM_GENDER_MODE="off",
+        AI_EXAM_SPEAKER_CLUSTERING=False,
+        AI_EXAM_ASR_PACK_TARGET_SEC=0,
+    )
+    assert isinstance(create_transcriber(settings), ASRWorkerPool)
+    monkeypatch.setattr(asr_pool, "in_daemon_process", lambda: True)
+    assert isinstance(create_transcriber(settings), ReazonTranscriber)
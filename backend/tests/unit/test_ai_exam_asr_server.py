@@ -0,0 +1,104 @@
+import threading
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.modules.ai_exam.asr_client import RemoteTranscriber
+from app.modules.ai_exam.asr_server import ASRBatcher, create_asr_app, decode_segments, encode_segments
+from app.modules.ai_exam.pcm import PCMBuffer
+
+
+class _CountingTranscriber:
+    """Stands in for ReazonTranscriber: one record per segment, holding its length."""
+
+    def __init__(self):
+        self.calls: list[int] = []
+        self.loaded = False
+
+    def _load_model(self) -> None:
+        self.loaded = True
+
+    def cache_params(self) -> dict:
+        return {"version": "test", "model_version": "stub"}
+
+    def recognize_many(self, segments):
+        self.calls.append(len(segments))
+        return [
+            [{"start_ms": 0, "end_ms": audio.duration_ms, "text": f"{len(audio.samples)}", "gender": "男"}]
+            for audio in segments
+        ]
+
+
+def _pcm(length: int) -> PCMBuffer:
+    return PCMBuffer(samples=np.full(length, 0.25, dtype=np.float32))
+
+
+def test_segments_round_trip_through_the_wire_format_as_int16():
+    segments = [_pcm(1600), PCMBuffer(samples=np.linspace(-1, 1, 8, dtype=np.float32), sample_rate=8000)]
+
+    body = encode_segments(segments)
+    decoded = decode_segments(body)
+
+    assert len(body) < 1600 * 2 + 8 * 2 + 2048  # two bytes per sample plus the npz headers
+    assert [audio.sample_rate for audio in decoded] == [16000, 8000]
+    assert decoded[1].samples.dtype == np.float32
+    np.testing.assert_allclose(decoded[1].samples, segments[1].samples, atol=1 / 32767)
+
+
+def test_batcher_merges_concurrent_requests_into_one_model_call():
+    transcriber = _CountingTranscriber()
+    batcher = ASRBatcher(transcriber, max_segments=64, max_wait_ms=200)
+    futures = []
+    threads = [
+        threading.Thread(target=lambda length=length: futures.append((length, batcher.submit([_pcm(length)] * 2))))
+        for length in (100, 200, 300)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {length: future.result(timeout=5) for length, future in futures}
+    batcher.close()
+
+    assert transcriber.calls == [6]
+    assert [[record[0]["text"] for record in records] for records in (results[100], results[300])] == [
+        ["100", "100"],
+        ["300", "300"],
+    ]
+
+
+def test_remote_transcriber_formats_records_recognized_by_the_server():
+    transcriber = _CountingTranscriber()
+    app = create_asr_app(transcriber, max_wait_ms=0)
+
+    with TestClient(app) as client:
+        remote = RemoteTranscriber("http://testserver", client=client)
+        transcripts = remote.transcribe_many([(_pcm(16000), 5000), (_pcm(8000), 9000)])
+        params = remote.cache_params()
+
+    assert transcriber.loaded
+    assert params == transcriber.cache_params()
+    assert [transcript["raw_text"] for transcript in transcripts] == ["16000", "8000"]
+    assert transcripts[1]["timestamped_raw_text"].startswith("00:09")
+
+
+def test_remote_transcriber_splits_segments_into_bounded_requests():
+    transcriber = _CountingTranscriber()
+    app = create_asr_app(transcriber, max_wait_ms=0)
+
+    with TestClient(app) as client:
+        remote = RemoteTranscriber("http://testserver", client=client, max_request_sec=1.5)
+        records = remote.recognize_many([_pcm(16000), _pcm(16000), _pcm(8000), _pcm(32000)])
+
+    assert transcriber.calls == [1, 2, 1]
+    assert [chunks[0]["text"] for chunks in records] == ["16000", "16000", "8000", "32000"]
+
+
+def test_asr_server_rejects_oversized_request_bodies():
+    app = create_asr_app(_CountingTranscriber(), max_wait_ms=0, max_body_bytes=1024)
+
+    with TestClient(app) as client:
+        response = client.post("/recognize", content=encode_segments([_pcm(4000)]))
+
+    assert response.status_code == 413
@@ -0,0 +1,105 @@
+import numpy as np
+from scipy import signal
+
+from app.modules.ai_exam.bell_matcher import BellTemplateMatcher, StreamingBellScanner, load_bell_template
+from app.modules.ai_exam.pcm import PCMBuffer
+from app.modules.ai_exam.service import BELL_2BAKU_PATH, BELL_SOUND_PATH
+
+SR = 16000
+
+
+def _reference_times(samples: np.ndarray, template: np.ndarray, threshold_percent: float, min_distance_sec: float):
+    correlation = signal.correlate(samples, template, mode="valid", method="fft")
+    peaks, _ = signal.find_peaks(
+        correlation,
+        height=float(np.max(correlation)) * threshold_percent,
+        distance=SR * min_distance_sec,
+    )
+    return [peak / SR for peak in peaks]
+
+
+def _exam_like_audio(bell1: np.ndarray, bell2: np.ndarray) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    t = np.arange(int(SR * 6)) / SR
+    speech = (0.15 * np.sin(2 * np.pi * 180 * t) * (1 + np.sin(2 * np.pi * 3 * t))).astype(np.float32)
+    parts = [np.zeros(SR // 2, dtype=np.float32)]
+    for bell in (bell1, bell2, bell1, bell1, bell2, bell1):
+        parts.extend([bell, speech, np.zeros(SR * 2, dtype=np.float32)])
+    audio = np.concatenate(parts)
+    return audio + rng.normal(0, 0.01, len(audio)).astype(np.float32)
+
+
+def test_matcher_agrees_with_full_rate_correlation_within_a_few_ms():
+    bell1 = load_bell_template(BELL_SOUND_PATH, SR)
+    bell2 = load_bell_template(BELL_2BAKU_PATH, SR)
+    samples = _exam_like_audio(bell1.samples, bell2.samples)
+    audio = PCMBuffer(samples=samples, sample_rate=SR)
+
+    matcher = BellTemplateMatcher(threshold_percent=0.8, min_distance_sec=5)
+    peaks = matcher.match(audio, [bell1, bell2])
+    for template in (bell1, bell2):
+        expected = _reference_times(samples, template.samples, 0.8, 5)
+        found = [peak.time_sec for peak in peaks[template.label]]
+
+        assert len(found) == len(expected)
+        assert max(abs(a - b) for a, b in zip(found, expected)) < 0.005
+
+
+def test_bell_templates_are_decoded_once_per_process():
+    assert load_bell_template(BELL_SOUND_PATH, SR) is load_bell_template(BELL_SOUND_PATH, SR)
+
+
+def test_streaming_scanner_finds_the_same_bells_block_by_block():
+    bell1 = load_bell_template(BELL_SOUND_PATH, SR)
+    bell2 = load_bell_template(BELL_2BAKU_PATH, SR)
+    samples = _exam_like_audio(bell1.samples, bell2.samples)
+
+    scanner = StreamingBellScanner([bell1, bell2], SR, min_distance_sec=5)
+    peaks = []
+    retained = []
+    for start in range(0, len(samples), SR * 3):
+        peaks.extend(scanner.push(samples[start:start + SR * 3]))
+        scanner.keep_from(scanner.total_samples)
+        retained.append(scanner.total_samples - scanner._queue.start)
+    peaks.extend(scanner.finish())
+
+    bell2_expected = _reference_times(samples, bell2.samples, 0.8, 5)
+    # The relative threshold also matches bell1 on top of bell2; the similarity threshold does not.
+    bell1_expected = [
+        time for time in _reference_times(samples, bell1.samples, 0.8, 5)
+        if all(abs(time - trap) > 0.1 for trap in bell2_expected)
+    ]
+    for template, expected in ((bell1, bell1_expected), (bell2, bell2_expected)):
+        found = [peak.time_sec for peak in peaks if peak.label == template.label]
+        assert len(found) == len(expected)
+        assert max(abs(a - b) for a, b in zip(found, expected)) < 0.005
+    # Only a bounded tail is retained once the caller has released earlier samples.
+    assert max(retained) < SR * 30
+
+
+def test_splitter_detects_optional_templates_in_the_same_pass(tmp_path):
+    import soundfile as sf
+
+    from app.modules.ai_exam.service import BellAudioSplitter
+
+    t = np.arange(int(SR * 1.5)) / SR
+    chime = (0.5 * np.sin(2 * np.pi * (300 + 200 * t) * t) * np.exp(-t)).astype(np.float32)
+    chime_path = tmp_path / "Bell_dau.wav"
+    sf.write(chime_path, chime, SR)
+    bell1 = load_bell_template(BELL_SOUND_PATH, SR)
+    silence = np.zeros(SR * 3, dtype=np.float32)
+    samples = np.concatenate([silence, chime, silence, bell1.samples, silence, chime, silence])
+
+    splitter = BellAudioSplitter(
+        threshold_percent=0.8,
+        min_distance_sec=1,
+        min_segment_length_ms=500,
+        extra_bell_paths=(chime_path,),
+        extra_trap_paths=(tmp_path / "missing.wav",),
+    )
+    peaks = splitter.detect_bells(PCMBuffer(samples=samples, sample_rate=SR))
+
+    assert set(peaks) == {"Bell_sound", "Bell_2baku", "Bell_dau"}
+    assert [round(peak.time_sec, 2) for peak in peaks["Bell_dau"]] == [3.0, 14.06]
+    assert all(peak.score > 0.95 for peak in peaks["Bell_dau"])
+    assert [round(peak.time_sec, 2) for peak in peaks["Bell_sound"]] == [7.5]
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.modules.ai_exam.blob_store import AudioBlobStore
+
+
+def _blob(data: bytes) -> tuple[str, bytes]:
+    return hashlib.sha256(data).hexdigest(), data
+
+
+def test_blob_is_kept_until_the_last_job_releases_it(tmp_path):
+    store = AudioBlobStore(tmp_path)
+    content_hash, data = _blob(b"full-audio")
+
+    store.put(content_hash, data, "job-1")
+    store.put(content_hash, data, "job-2")
+    store.release(content_hash, "job-1")
+    assert store.get(content_hash) == data
+
+    store.release(content_hash, "job-2")
+    with pytest.raises(RuntimeError):
+        store.get(content_hash)
+    with pytest.raises(ValueError):
+        store.put(content_hash, b"other-audio", "job-3")
+
+
+def test_collect_garbage_removes_only_stale_unleased_blobs(tmp_path):
+    store = AudioBlobStore(tmp_path)
+    stuck_hash, stuck = _blob(b"stuck")
+    active_hash, active = _blob(b"active")
+    store.put(stuck_hash, stuck, "crashed-job")
+    store.put(active_hash, active, "running-job")
+    old = time.time() - 3600
+    for path in (*(tmp_path / "blobs").glob("*/*"), tmp_path / "leases" / stuck_hash / "crashed-job"):
+        os.utime(path, (old, old))
+
+    removed = store.collect_garbage(max_age_sec=600)
+
+    assert removed == {"leases": 1, "blobs": 1, "bytes": len(stuck)}
+    assert store.get(active_hash) == active
+    with pytest.raises(RuntimeError):
+        store.get(stuck_hash)
+
+
+def test_put_file_moves_a_spooled_upload_and_drops_duplicates(tmp_path):
+    store = AudioBlobStore(tmp_path / "store")
+    content_hash, data = _blob(b"full-audio")
+    first, second = tmp_path / "first.mp3", tmp_path / "second.mp3"
+    first.write_bytes(data)
+    second.write_bytes(data)
+
+    store.put_file(content_hash, first, "job-1")
+    store.put_file(content_hash, second, "job-2")
+
+    assert not first.exists() and not second.exists()
+    assert store.get(content_hash) == data
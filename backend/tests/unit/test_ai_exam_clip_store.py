@@ -0,0 +1,75 @@
+import subprocess
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.modules.ai_exam.clip_store import LocalClipStorage, render_clips
+from app.modules.ai_exam.pcm import PCMBuffer
+
+SAMPLE_RATE = 16000
+
+
+def _tone(seconds: float) -> PCMBuffer:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return PCMBuffer(samples=(0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32))
+
+
+def _duration_sec(path) -> float:
+    return PCMBuffer.from_bytes(path.read_bytes()).duration_ms / 1000.0
+
+
+def test_clips_are_encoded_from_pcm_in_one_run(tmp_path):
+    clips = render_clips(_tone(10.0), [(0.0, 2.0), (3.5, 6.0), (8.0, 9.5)], tmp_path)
+
+    assert [round(_duration_sec(path), 1) for path in clips] == [2.0, 2.5, 1.5]
+
+
+def _mp3(seconds: float) -> bytes:
+    return subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libmp3lame", "-b:a", "128k", "-f", "mp3", "pipe:1"],
+        input=_tone(seconds).samples.tobytes(),
+        capture_output=True,
+        check=True,
+    ).stdout
+
+
+def test_mp3_uploads_are_stream_copied(tmp_path):
+    mp3 = _mp3(10.0)
+
+    (clip,) = render_clips(mp3, [(4.0, 7.0)], tmp_path, source_suffix=".mp3")
+
+    # Stream copy cuts on MP3 frames (~26-72 ms) and keeps the source bitrate.
+    assert abs(_duration_sec(clip) - 3.0) < 0.15
+    assert clip.stat().st_size > 3.0 * 128_000 / 8 * 0.9
+
+
+def test_clip_keys_cannot_escape_the_storage_root(tmp_path):
+    storage = LocalClipStorage(tmp_path, "/api/ai/clips")
+
+    assert storage.url("abc/10-25.mp3") == "/api/ai/clips/abc/10-25.mp3"
+    for key in ("../secret", "abc/../../etc/passwd", "/abs/path.mp3", "abc//x.mp3"):
+        with pytest.raises(ValueError):
+            storage.path(key)
+
+
+def test_clip_endpoint_serves_byte_ranges(tmp_path, monkeypatch):
+    from app.main import app
+    from app.modules.ai_exam import router as ai_router
+
+    storage = LocalClipStorage(tmp_path, "/api/ai/clips")
+    source = tmp_path / "rendered.mp3"
+    source.write_bytes(bytes(range(256)) * 8)
+    storage.put_file("hash/0-20.mp3", source)
+    monkeypatch.setattr(ai_router, "_clips", storage)
+
+    client = TestClient(app)
+    full = client.get("/api/ai/clips/hash/0-20.mp3")
+    partial = client.get("/api/ai/clips/hash/0-20.mp3", headers={"Range": "bytes=100-199"})
+
+    assert full.status_code == 200 and len(full.content) == 2048
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == "bytes 100-199/2048"
+    assert partial.content == full.content[100:200]
+    assert client.get("/api/ai/clips/hash/missing.mp3").status_code == 404
@@ -0,0 +1,64 @@
+import uuid
+
+import numpy as np
+from scipy import signal
+
+from app.modules.ai_exam.fingerprint import best_match, compute_fingerprint
+from app.modules.ai_exam.pcm import PCMBuffer
+
+SAMPLE_RATE = 16000
+
+
+def _tonal_speech(seed: int, seconds: float = 90.0) -> PCMBuffer:
+    """Syllable-like tone bursts with harmonics and random pitch, separated by short pauses."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    while sum(len(part) for part in parts) < seconds * SAMPLE_RATE:
+        length = int(rng.uniform(0.08, 0.35) * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        pitch = rng.uniform(120, 300) * (1 + rng.uniform(-0.2, 0.2) * t / t[-1])
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        burst = sum(np.sin(phase * harmonic) / harmonic for harmonic in range(1, 8))
+        parts.append(burst * np.hanning(length) * rng.uniform(0.1, 0.5))
+        parts.append(rng.normal(0, 0.002, int(rng.uniform(0.02, 0.3) * SAMPLE_RATE)))
+    return PCMBuffer(samples=np.concatenate(parts).astype(np.float32))
+
+
+def _reencoded(audio: PCMBuffer, trim_sec: float) -> PCMBuffer:
+    """Resample through 22.05 kHz, low-pass like a low-bitrate encoder, change gain and trim the start."""
+    samples = signal.resample_poly(audio.samples, 441, 320)
+    samples = signal.sosfilt(signal.butter(8, 5000, fs=22050, output="sos"), samples)
+    samples = signal.resample_poly(samples, 320, 441) * 0.6
+    samples += np.random.default_rng(99).normal(0, 0.001, len(samples))
+    return PCMBuffer(samples=samples[int(trim_sec * SAMPLE_RATE):].astype(np.float32))
+
+
+def _postings(audio_id: uuid.UUID, audio: PCMBuffer) -> tuple[list[tuple[uuid.UUID, int, int]], int]:
+    fingerprint = compute_fingerprint(audio)
+    postings = zip(fingerprint.hashes.tolist(), fingerprint.frames.tolist())
+    return [(audio_id, hash_value, frame) for hash_value, frame in postings], len(fingerprint)
+
+
+def test_reencoded_trimmed_copy_matches_its_original_at_the_trim_offset():
+    original_id, other_id = uuid.uuid4(), uuid.uuid4()
+    original_postings, original_count = _postings(original_id, _tonal_speech(1))
+    other_postings, other_count = _postings(other_id, _tonal_speech(2))
+    counts = {original_id: original_count, other_id: other_count}
+
+    query = compute_fingerprint(_reencoded(_tonal_speech(1), trim_sec=2.3))
+    match = best_match(query.sample(), original_postings + other_postings, counts, len(query))
+
+    assert match is not None
+    assert match.audio_id == original_id
+    assert match.confidence > 0.25
+    assert abs(match.offset_ms - 2300) <= 64
+
+
+def test_unrelated_audio_does_not_match():
+    original_id = uuid.uuid4()
+    postings, count = _postings(original_id, _tonal_speech(1))
+
+    query = compute_fingerprint(_tonal_speech(3))
+    match = best_match(query.sample(), postings, {original_id: count}, len(query))
+
+    assert match is None or match.confidence < 0.1
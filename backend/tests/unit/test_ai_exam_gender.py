@@ -0,0 +1,69 @@
+import numpy as np
+
+from app.modules.ai_exam.gender import (
+    PitchGenderClassifier,
+    cluster_speakers,
+    median_f0,
+)
+from app.modules.ai_exam.pcm import PCMBuffer
+from app.modules.ai_exam.service import ReazonTranscriber
+
+SAMPLE_RATE = 16000
+
+
+def _voice(f0: float, seconds: float = 1.5, seed: int = 0) -> PCMBuffer:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.03 * np.sin(2 * np.pi * 5 * t))) / SAMPLE_RATE
+    wave = sum(np.sin(k * phase) / k for k in range(1, 12))
+    wave = 0.2 * wave / np.abs(wave).max() + 0.005 * rng.standard_normal(len(t))
+    return PCMBuffer(samples=wave.astype(np.float32), sample_rate=SAMPLE_RATE)
+
+
+def test_median_f0_tracks_harmonic_voice_pitch():
+    for f0 in (95.0, 130.0, 210.0, 280.0):
+        assert abs(median_f0(_voice(f0)) - f0) < 3.0
+
+
+def test_median_f0_is_none_for_silence():
+    assert median_f0(PCMBuffer(samples=np.zeros(SAMPLE_RATE, dtype=np.float32))) is None
+
+
+def test_cluster_speakers_separates_two_voices_and_merges_one():
+    assert cluster_speakers([110.0, 220.0, None, 118.0, 240.0]) == [0, 1, None, 0, 1]
+    assert cluster_speakers([200.0, 210.0, 205.0]) == [0, 0, 0]
+
+
+def test_pitch_classifier_labels_dialogue_chunks():
+    chunks = [_voice(f0, seed=index) for index, f0 in enumerate((115.0, 230.0, 120.0, 245.0))]
+
+    assert PitchGenderClassifier().predict_many(chunks) == ["男", "女", "男", "女"]
+    assert PitchGenderClassifier(cluster_speakers=False).predict(chunks[1]) == "女"
+
+
+def test_accurate_mode_only_classifies_one_chunk_per_speaker_cluster():
+    transcriber = ReazonTranscriber(gender_mode="accurate")
+    calls: list[int] = []
+
+    def _fake_wav2vec2(audio: PCMBuffer) -> str:
+        calls.append(len(audio.samples))
+        f0 = median_f0(audio)
+        return "女" if f0 is None or f0 >= 165 else "男"
+
+    transcriber._predict_gender = _fake_wav2vec2
+    # Whispered or noisy speech has no pitch estimate and is classified on its own.
+    unvoiced = PCMBuffer(
+        samples=(0.05 * np.random.default_rng(3).standard_normal(SAMPLE_RATE // 2)).astype(np.float32),
+        sample_rate=SAMPLE_RATE,
+    )
+    assert median_f0(unvoiced) is None
+    chunks = [
+        _voice(110.0, seconds=1.0),
+        _voice(230.0, seconds=2.0),
+        unvoiced,
+        _voice(115.0, seconds=2.5),
+        _voice(225.0, seconds=1.0),
+    ]
+
+    assert transcriber._predict_genders(chunks) == ["男", "女", "女", "男", "女"]
+    assert sorted(calls) == [8000, 32000, 40000]
@@ -0,0 +1,53 @@
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.modules.ai_exam.ingest import spool_upload
+
+
+async def test_spool_upload_hashes_blocks_while_writing_them_to_disk(tmp_path):
+    data = bytes(range(256)) * 1000
+    upload = await spool_upload(
+        UploadFile(io.BytesIO(data), filename="exam.mp3"),
+        tmp_path,
+        max_bytes=len(data),
+        block_size=4096,
+    )
+
+    assert upload.content_hash == hashlib.sha256(data).hexdigest()
+    assert upload.size == len(data)
+    assert upload.path.suffix == ".mp3"
+    assert upload.read_bytes() == data
+
+
+async def test_spool_upload_rejects_oversized_files_and_removes_the_partial_spool(tmp_path):
+    with pytest.raises(HTTPException) as error:
+        await spool_upload(
+            UploadFile(io.BytesIO(b"x" * 10_000), filename="exam.mp3"),
+            tmp_path,
+            max_bytes=4096,
+            block_size=1024,
+        )
+
+    assert error.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("audio_format", ["wav", "mp3"])
+def test_spooled_files_decode_from_their_path_like_the_same_bytes(tmp_path, audio_format):
+    import numpy as np
+    from pydub.generators import Sine
+
+    from app.modules.ai_exam.pcm import PCMBuffer, iter_decoded_blocks
+
+    path = tmp_path / f"exam.{audio_format}"
+    Sine(440).to_audio_segment(duration=3000).export(path, format=audio_format)
+
+    from_path = PCMBuffer.from_bytes(path)
+    np.testing.assert_array_equal(from_path.samples, PCMBuffer.from_bytes(path.read_bytes()).samples)
+    streamed = np.concatenate(list(iter_decoded_blocks(path, block_size=16000)))
+    from_bytes = np.concatenate(list(iter_decoded_blocks(path.read_bytes(), block_size=16000)))
+    np.testing.assert_array_equal(streamed, from_bytes)
+    assert abs(from_path.duration_ms - 3000) < 100
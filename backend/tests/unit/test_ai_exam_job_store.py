@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+from app.modules.ai_exam.job_store import InMemoryJobStore, ProgressWriter
+from app.modules.ai_exam.schemas import AIJobStatusResponse, AISplitSegment
+
+
+def _segment(index: int) -> AISplitSegment:
+    return AISplitSegment(
+        segment_index=index,
+        file_name=f"segment_{index:02d}.wav",
+        start_time=0.0,
+        end_time=1.0,
+        transcript="",
+    )
+
+
+async def test_in_memory_job_store_updates_copies_and_evicts_after_ttl():
+    now = [0.0]
+    store = InMemoryJobStore(ttl_sec=60, clock=lambda: now[0])
+    await store.put(AIJobStatusResponse(job_id="job-1", status="pending"))
+
+    await store.update("job-1", status="processing", progress_message="Step 2/7")
+    await store.append_segment("job-1", _segment(1))
+    job = await store.get("job-1")
+    job.partial_segments.append(_segment(99))
+
+    stored = await store.get("job-1")
+    assert stored.status == "processing"
+    assert stored.progress_message == "Step 2/7"
+    assert [segment.segment_index for segment in stored.partial_segments] == [1]
+
+    now[0] = 59.0
+    assert await store.get("job-1") is not None
+    now[0] = 120.0
+    assert await store.get("job-1") is None
+    # Late writes for an expired job do not bring it back.
+    await store.update("job-1", progress_message="Step 7/7")
+    assert await store.get("job-1") is None
+
+
+async def test_progress_writer_coalesces_messages_without_blocking_the_worker_thread():
+    written: list[str] = []
+    segments: list[int] = []
+    release = asyncio.Event()
+
+    async def write_progress(message: str) -> None:
+        await release.wait()
+        written.append(message)
+
+    async def write_segment(segment: int) -> None:
+        segments.append(segment)
+
+    writer = ProgressWriter(asyncio.get_running_loop(), write_progress, write_segment)
+
+    def pipeline() -> float:
+        started = time.perf_counter()
+        for step in range(100):
+            writer.progress(f"step {step}")
+            writer.segment(step)
+        return time.perf_counter() - started
+
+    elapsed = await asyncio.to_thread(pipeline)
+    release.set()
+    await writer.aclose()
+
+    assert elapsed < 1.0
+    assert written[-1] == "step 99"
+    assert len(written) < 100
+    assert segments == list(range(100))
+
+
+async def test_progress_writer_keeps_running_after_a_failed_write():
+    written: list[str] = []
+
+    async def flaky(message: str) -> None:
+        if message == "bad":
+            raise RuntimeError("database unavailable")
+        written.append(message)
+
+    writer = ProgressWriter(asyncio.get_running_loop(), flaky)
+    writer.progress("bad")
+    await writer.aclose()
+    thread = threading.Thread(target=writer.progress, args=("good",))
+    thread.start()
+    thread.join()
+    await writer.aclose()
+
+    assert written == ["good"]
+
+
+async def test_job_version_changes_on_every_write_and_json_is_reused_between_writes():
+    store = InMemoryJobStore(ttl_sec=60)
+    await store.put(AIJobStatusResponse(job_id="job-1", status="pending"))
+    first_version, first_body = await store.get_json("job-1")
+
+    assert await store.get_version("job-1") == first_version
+    assert (await store.get_json("job-1"))[1] is first_body
+
+    await store.update("job-1", progress_message="Step 3/7")
+    version, body = await store.get_json("job-1")
+    assert version == first_version + 1
+    assert AIJobStatusResponse.model_validate_json(body).progress_message == "Step 3/7"
+
+    await store.delete("job-1")
+    assert await store.get_version("job-1") is None
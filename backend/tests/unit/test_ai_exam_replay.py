@@ -0,0 +1,48 @@
+import json
+
+from app.modules.ai_exam.replay import replay_rows
+from app.modules.ai_exam.schemas import AIExamResult
+from app.modules.ai_exam.service import AIExamService, ReazonTranscriber, SplitAudioChunk
+
+
+def _stored_result() -> str:
+    segments = []
+    for index, (number, line) in enumerate((("一番", "男の人は何時に会議をしますか"), ("二番", "女の人はどこへ行きますか"))):
+        records = [
+            {"start_ms": 0, "end_ms": 900, "text": number, "gender": "男"},
+            {"start_ms": 1000, "end_ms": 3000, "text": "会議は三時からです", "gender": "女"},
+            {"start_ms": 3100, "end_ms": 5000, "text": "わかりました駅で会いましょう", "gender": "男"},
+            {"start_ms": 5100, "end_ms": 7000, "text": line, "gender": "女"},
+        ]
+        segment = SplitAudioChunk(index + 1, f"segment_{index + 1}.wav", index * 30000, index * 30000 + 28000)
+        AIExamService._apply_transcript(segment, ReazonTranscriber.format_transcript(records, segment.start_ms))
+        segments.append(segment)
+    structured = AIExamService._build_structured_segments(segments, jlpt_level="N3")
+    questions = AIExamService._build_questions(structured, segments)
+    return AIExamResult(
+        raw_transcript=AIExamService._build_raw_transcript(segments),
+        refined_script=AIExamService._build_refined_script(structured),
+        split_segments=[AIExamService._to_split_segment(segment) for segment in segments],
+        timestamps=AIExamService._build_timestamps(questions),
+        questions=questions,
+    ).model_dump_json()
+
+
+def test_replay_of_unchanged_rules_reports_no_changes():
+    [report] = replay_rows([("cache-1", "n3.mp3", "N3", _stored_result())])
+
+    assert report["questions"] == 2
+    assert report["changes"] == []
+    assert "timestamps" not in report
+
+
+def test_replay_reports_field_changes_and_bad_rows():
+    stored = json.loads(_stored_result())
+    stored["questions"][1]["question_number"] = 7
+    stored["questions"][0]["question_text"] = "古い質問"
+
+    changed, broken = replay_rows([("cache-1", None, "N3", json.dumps(stored)), ("cache-2", None, "N3", "{")])
+
+    assert {(change["field"], change["old"], change["new"]) for change in changed["changes"]} >= {("question_number", 7, 2)}
+    assert {change["field"] for change in changed["changes"]} == {"question_number", "question_text"}
+    assert broken["error"].startswith("JSONDecodeError")
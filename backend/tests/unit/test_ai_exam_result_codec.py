@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from app.modules.ai_exam.result_codec import encode_job_status, load_result, store_result, stored_result_bytes
+from app.modules.ai_exam.schemas import AIExamResult, AIJobStatusResponse, AISplitSegment
+
+
+def _result() -> AIExamResult:
+    return AIExamResult(
+        audio_id="audio-1",
+        raw_transcript="一番 会議は三時からです",
+        refined_script="男: 会議は三時からです",
+        split_segments=[
+            AISplitSegment(segment_index=1, file_name="segment_01.wav", start_time=0.0, end_time=30.0, transcript="一番")
+        ],
+        questions=[],
+    )
+
+
+def test_results_are_stored_compressed_and_legacy_text_rows_still_load():
+    result = _result()
+    # Stands in for an AIExamCache row; only the two result columns are used.
+    cache = SimpleNamespace(result_blob=None, result_json=result.model_dump_json())
+    assert load_result(cache) == result
+
+    store_result(cache, result)
+    assert cache.result_json is None
+    assert len(cache.result_blob) < len(result.model_dump_json().encode("utf-8"))
+    assert load_result(cache) == result
+
+
+def test_spliced_job_status_matches_the_response_model():
+    result = _result()
+    segment = result.split_segments[0]
+    body = encode_job_status(
+        "job-1",
+        "done",
+        "完了",
+        result=stored_result_bytes(None, result.model_dump_json()),
+        partial_segments=[segment.model_dump_json().encode("utf-8")],
+    )
+
+    expected = AIJobStatusResponse(
+        job_id="job-1", status="done", progress_message="完了", partial_segments=[segment], result=result
+    )
+    assert AIJobStatusResponse.model_validate_json(body) == expected
@@ -1,6 +1,11 @@
+import os
 import tempfile
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
 
+import numpy as np
 from pydub import AudioSegment
 from pydub.generators import Sine
 
@@ -9,11 +14,17 @@ from app.modules.ai_exam.service import (
     BELL_2BAKU_PATH,
     BELL_SOUND_PATH,
     BellAudioSplitter,
+    ReazonTranscriber,
     SplitAudioChunk,
     _extract_numbered_answer_options,
     _extract_spoken_question_number,
     _parse_formatted_segment,
 )
+from app.modules.ai_exam import metrics
+from app.modules.ai_exam.artifacts import StageArtifactStore
+from app.modules.ai_exam.asr_cache import SegmentASRCache
+from app.modules.ai_exam.metrics import PipelineMetrics
+from app.modules.ai_exam.pcm import PCMBuffer
 
 
 def _load_bell(path: Path) -> AudioSegment:
@@ -72,10 +83,86 @@ def test_bell_splitter_falls_back_to_full_audio_when_no_bell_detected():
     assert segments[0].segment_index == 1
     assert segments[0].start_ms == 0
     assert segments[0].end_ms >= 2000
-    assert segments[0].audio_bytes
+    assert segments[0].pcm is not None
+    assert segments[0].pcm.duration_ms == segments[0].end_ms
+
+
+def test_bell_splitter_segments_are_views_of_one_decoded_buffer():
+    bell1 = _load_bell(BELL_SOUND_PATH)
+    bell2 = _load_bell(BELL_2BAKU_PATH)
+    tone = Sine(440).to_audio_segment(duration=1800).apply_gain(-12)
+    full_audio = (
+        AudioSegment.silent(duration=600)
+        + bell2
+        + AudioSegment.silent(duration=5000)
+        + bell1
+        + tone
+        + AudioSegment.silent(duration=2500)
+        + bell1
+        + tone
+    )
+    with tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
+        full_audio.export(tmp.name, format="wav")
+        buffer = PCMBuffer.from_bytes(Path(tmp.name).read_bytes())
+
+    splitter = BellAudioSplitter(
+        threshold_percent=0.8,
+        min_distance_sec=1,
+        trap_window_sec=4.0,
+        min_segment_length_ms=500,
+    )
+    segments = splitter.split_audio(buffer)
+
+    assert len(segments) == 2
+    for segment in segments:
+        assert np.shares_memory(segment.pcm.samples, buffer.samples)
+        assert segment.pcm.offset_ms == segment.start_ms
+        assert abs(segment.pcm.duration_ms - (segment.end_ms - segment.start_ms)) <= 1
+
+
+def test_streaming_split_matches_full_buffer_split():
+    bell1 = _load_bell(BELL_SOUND_PATH)
+    bell2 = _load_bell(BELL_2BAKU_PATH)
+    tone = Sine(440).to_audio_segment(duration=1800).apply_gain(-12)
+    full_audio = (
+        AudioSegment.silent(duration=600)
+        + bell1
+        + tone
+        + AudioSegment.silent(duration=600)
+        + bell2
+        + AudioSegment.silent(duration=500)
+        + bell1
+        + tone
+        + AudioSegment.silent(duration=5000)
+        + bell1
+        + tone
+        + AudioSegment.silent(duration=2500)
+        + bell1
+        + tone
+    )
+    with tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
+        full_audio.export(tmp.name, format="wav")
+        audio_bytes = Path(tmp.name).read_bytes()
+
+    options = dict(threshold_percent=0.8, min_distance_sec=1, trap_window_sec=4.0, min_segment_length_ms=500)
+    expected = BellAudioSplitter(**options).split_audio(audio_bytes, suffix=".wav")
+    streamed = list(
+        BellAudioSplitter(streaming=True, stream_block_sec=2.0, **options).iter_split_audio(audio_bytes, suffix=".wav")
+    )
+
+    assert len(streamed) == len(expected) == 3
+    for got, want in zip(streamed, expected):
+        assert got.segment_index == want.segment_index
+        assert abs(got.start_ms - want.start_ms) <= 5
+        assert abs(got.end_ms - want.end_ms) <= 5
+        assert got.pcm.offset_ms == got.start_ms
+        assert abs(got.pcm.duration_ms - (got.end_ms - got.start_ms)) <= 1
 
 
 class _FakeSplitter:
+    def iter_split_audio(self, audio_bytes: bytes, suffix: str = ".mp3"):
+        yield from self.split_audio(audio_bytes, suffix=suffix)
+
     def split_audio(self, audio_bytes: bytes, suffix: str = ".mp3"):
         return [
             SplitAudioChunk(
@@ -99,6 +186,12 @@ class _FakeReazon:
     def _load_model(self):
         return None
 
+    def transcribe_many(self, segments) -> list[dict]:
+        return [
+            self.transcribe(audio, base_offset_ms=base_offset_ms)
+            for audio, base_offset_ms in segments
+        ]
+
     def transcribe(self, audio_bytes: bytes, suffix: str = ".wav", base_offset_ms: int = 0) -> dict:
         if audio_bytes == b"segment-1":
             return {
@@ -129,12 +222,14 @@ def test_generate_uses_local_reazon_only_and_keeps_one_question_per_segment():
     service._reazon = _FakeReazon()
 
     progress_messages = []
+    partial_segments = []
     result = service.generate(
         audio_bytes=b"full-audio",
         filename="sample.mp3",
         jlpt_level="N2",
         cloudinary_public_id=None,
         progress_callback=progress_messages.append,
+        segment_callback=partial_segments.append,
     )
 
     assert len(result.split_segments) == 2
@@ -167,9 +262,13 @@ def test_generate_uses_local_reazon_only_and_keeps_one_question_per_segment():
     assert all(answer.content == "" for answer in result.questions[0].answers)
     assert result.questions[0].difficulty is not None
     assert [item.mondai_number for item in result.timestamps or []] == [1, 2]
+    assert [segment.segment_index for segment in partial_segments] == [1, 2]
+    assert partial_segments[0].transcript.startswith("二番")
+    # Per-batch "Transcribed N segment(s)" updates depend on how fast segments arrive.
+    progress_messages = [message for message in progress_messages if "Transcribed" not in message]
     assert progress_messages == [
         "Step 2/7: Detecting bell timestamps...",
-        "Step 3/7: Cutting question audio with PyDub...",
+        "Step 3/7: Cutting question audio...",
         "Step 4/7: ReazonSpeech transcribing split audio...",
         "Step 5/7: Formatting scripts with local Reazon rules...",
         "Step 6/7: Building local question drafts...",
@@ -177,6 +276,417 @@ def test_generate_uses_local_reazon_only_and_keeps_one_question_per_segment():
     ]
 
 
+class _SlowSplitter(_FakeSplitter):
+    def __init__(self):
+        self.first_transcribed = threading.Event()
+
+    def iter_split_audio(self, audio_bytes: bytes, suffix: str = ".mp3"):
+        first, second = self.split_audio(audio_bytes, suffix=suffix)
+        yield first
+        # The second bell is only "found" after the first segment has been transcribed.
+        assert self.first_transcribed.wait(timeout=5)
+        yield second
+
+
+class _SignallingReazon(_FakeReazon):
+    def __init__(self, splitter: _SlowSplitter):
+        self.splitter = splitter
+        self.batches = []
+
+    def transcribe_many(self, segments) -> list[dict]:
+        self.batches.append(len(segments))
+        results = super().transcribe_many(segments)
+        self.splitter.first_transcribed.set()
+        return results
+
+
+def test_generate_transcribes_segments_while_the_splitter_is_still_running():
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _SlowSplitter()
+    service._reazon = _SignallingReazon(service._splitter)
+
+    result = service.generate(audio_bytes=b"full-audio", filename="sample.mp3")
+
+    assert service._reazon.batches == [1, 1]
+    assert [segment.segment_index for segment in result.split_segments] == [1, 2]
+
+
+class _UploadingReazon(_FakeReazon):
+    def __init__(self, upload: Future):
+        self.upload = upload
+
+    def transcribe_many(self, segments) -> list[dict]:
+        # The upload only finishes once ASR is already running.
+        if not self.upload.done():
+            self.upload.set_result({"public_id": "exam-audio", "format": "mp3"})
+        return super().transcribe_many(segments)
+
+
+def test_generate_overlaps_the_cloudinary_upload_and_joins_it_for_clip_urls(monkeypatch):
+    import cloudinary
+
+    monkeypatch.setattr(cloudinary.config(), "cloud_name", "demo")
+    upload: Future = Future()
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _FakeSplitter()
+    service._reazon = _UploadingReazon(upload)
+
+    pipeline_metrics = PipelineMetrics()
+    result = service.generate(
+        audio_bytes=b"full-audio",
+        filename="sample.mp3",
+        pipeline_metrics=pipeline_metrics,
+        cloudinary_upload=upload,
+    )
+
+    assert all("exam-audio" in question.audio_url for question in result.questions)
+    assert "upload_wait" in pipeline_metrics.to_dict()["stages"]
+
+
+def test_local_clips_are_cut_from_the_original_upload_not_the_decoded_pcm(tmp_path):
+    import subprocess
+
+    from app.modules.ai_exam.clip_store import LocalClipStorage
+
+    tone = Sine(440).to_audio_segment(duration=12000).set_frame_rate(16000).set_channels(1)
+    upload = tmp_path / "upload.bin"
+    tone.export(upload, format="mp3", bitrate="128k")
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _FakeSplitter()
+    service._reazon = _FakeReazon()
+    service._clip_storage = LocalClipStorage(tmp_path / "clips", "/api/ai/clips")
+
+    result = service.generate(
+        audio_bytes=PCMBuffer.from_bytes(upload.read_bytes()),
+        filename="exam.mp3",
+        content_hash="upload-hash",
+        clip_source=upload,
+    )
+
+    assert all(question.audio_url for question in result.questions)
+    for question in result.questions:
+        clip = service._clip_storage.path(question.audio_url.removeprefix("/api/ai/clips/"))
+        probe = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=bit_rate", "-of", "csv=p=0", str(clip)],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        # Stream-copied at the upload's bitrate, not re-encoded at the 64 kbps clip bitrate.
+        assert int(probe.stdout.strip()) > 100_000
+
+
+def test_generate_queues_all_clip_transformations_in_one_batch(monkeypatch):
+    import cloudinary
+
+    monkeypatch.setattr(cloudinary.config(), "cloud_name", "demo")
+    calls = []
+
+    def warmer(public_id, audio_format, clips):
+        calls.append((public_id, audio_format, list(clips)))
+        return [index == 0 for index in range(len(clips))]
+
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _FakeSplitter()
+    service._reazon = _FakeReazon()
+    service._clip_warmer = warmer
+
+    pipeline_metrics = PipelineMetrics()
+    result = service.generate(
+        audio_bytes=b"full-audio",
+        filename="sample.mp3",
+        cloudinary_public_id="exam-audio",
+        pipeline_metrics=pipeline_metrics,
+    )
+
+    assert len(calls) == 1
+    public_id, audio_format, clips = calls[0]
+    assert (public_id, audio_format) == ("exam-audio", "mp3")
+    assert len(clips) == 2
+    assert [question.audio_warm_queued for question in result.questions] == [True, False]
+    assert result.clip_warm_ms is not None
+    assert pipeline_metrics.to_dict()["counters"]["clips_warm_queued"] == 1
+
+
+def test_failed_prewarm_keeps_clip_urls_and_marks_them_not_ready(monkeypatch):
+    import cloudinary
+
+    monkeypatch.setattr(cloudinary.config(), "cloud_name", "demo")
+
+    def warmer(public_id, audio_format, clips):
+        raise RuntimeError("rate limited")
+
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _FakeSplitter()
+    service._reazon = _FakeReazon()
+    service._clip_warmer = warmer
+
+    result = service.generate(audio_bytes=b"full-audio", filename="sample.mp3", cloudinary_public_id="exam-audio")
+
+    assert all(question.audio_url for question in result.questions)
+    assert [question.audio_warm_queued for question in result.questions] == [False, False]
+
+
+def test_warm_audio_clips_sends_one_eager_request_matching_the_clip_urls(monkeypatch):
+    import cloudinary.uploader
+    import cloudinary.utils
+
+    from app.shared.upload import warm_audio_clips
+
+    monkeypatch.setattr(cloudinary.config(), "cloud_name", "demo")
+    requests = []
+
+    def explicit(public_id, **options):
+        requests.append((public_id, options))
+        return {"eager": [{"status": "processing", "batch_id": "b1"}, {"status": "failed"}]}
+
+    monkeypatch.setattr(cloudinary.uploader, "explicit", explicit)
+
+    assert warm_audio_clips("exam-audio", "mp3", [(1.2, 4.5), (7.0, 9.9)]) == [True, False]
+    assert len(requests) == 1
+    public_id, options = requests[0]
+    assert public_id == "exam-audio" and options["resource_type"] == "video"
+    assert options["eager_async"] is True
+    eager = dict(options["eager"][0])
+    eager_url, _ = cloudinary.utils.cloudinary_url(
+        public_id, resource_type="video", format=eager.pop("format"), **eager
+    )
+    clip_url, _ = cloudinary.utils.cloudinary_url(
+        public_id, resource_type="video", format="mp3", start_offset=1.2, end_offset=4.5
+    )
+    assert eager_url == clip_url
+
+
+class _CountingSplitter(_FakeSplitter):
+    def __init__(self):
+        self.calls = 0
+
+    def cache_params(self) -> dict:
+        return {"version": "test"}
+
+    def iter_split_audio(self, audio_bytes: bytes, suffix: str = ".mp3"):
+        self.calls += 1
+        yield from super().iter_split_audio(audio_bytes, suffix=suffix)
+
+
+class _RecordingReazon:
+    def __init__(self):
+        self.recognized = []
+
+    def cache_params(self) -> dict:
+        return {"version": "test"}
+
+    def recognize_many(self, segments) -> list[list[dict]]:
+        self.recognized.extend(segments)
+        return [
+            [
+                {"start_ms": 0, "end_ms": 900, "text": "一番お店での会話です", "gender": "Unknown"},
+                {"start_ms": 1000, "end_ms": 2500, "text": "りんごを二つください", "gender": "女"},
+            ]
+            for _ in segments
+        ]
+
+
+def test_generate_reuses_stored_split_and_asr_artifacts(tmp_path):
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _CountingSplitter()
+    service._reazon = _RecordingReazon()
+    service._artifacts = StageArtifactStore(tmp_path)
+
+    first = service.generate(audio_bytes=b"full-audio", filename="sample.mp3")
+    second = service.generate(audio_bytes=b"full-audio", filename="sample.mp3", jlpt_level="N3")
+
+    assert service._splitter.calls == 1
+    assert service._reazon.recognized == [b"segment-1", b"segment-2"]
+    assert [segment.start_time for segment in second.split_segments] == [1.0, 7.0]
+    assert second.raw_transcript == first.raw_transcript
+    assert "00:08: りんごを二つください" in second.raw_transcript
+
+
+class _RenamedModelReazon(_RecordingReazon):
+    def cache_params(self) -> dict:
+        return {"version": "test-2"}
+
+
+def test_stored_bounds_with_an_asr_artifact_miss_slice_a_decoded_pcm_upload(tmp_path):
+    upload = PCMBuffer(samples=np.zeros(12 * 16000, dtype=np.float32))
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _CountingSplitter()
+    service._reazon = _RecordingReazon()
+    service._artifacts = StageArtifactStore(tmp_path)
+    service.generate(audio_bytes=upload, filename="sample.mp3", content_hash="upload-hash")
+
+    # A changed ASR model keeps the split boundaries but misses every ASR artifact.
+    service._reazon = _RenamedModelReazon()
+    result = service.generate(audio_bytes=upload, filename="sample.mp3", content_hash="upload-hash")
+
+    assert service._splitter.calls == 1
+    assert [segment.duration_ms for segment in service._reazon.recognized] == [4000, 4000]
+    assert all(np.shares_memory(segment.samples, upload.samples) for segment in service._reazon.recognized)
+    assert len(result.split_segments) == 2
+
+
+class _TimedSplitter(_CountingSplitter):
+    def iter_split_audio(self, audio_bytes: bytes, suffix: str = ".mp3"):
+        for segment in super().iter_split_audio(audio_bytes, suffix=suffix):
+            with metrics.stage("cutting"):
+                pass
+            yield segment
+
+
+def test_generate_records_stage_metrics_including_the_splitter_thread(tmp_path):
+    service = AIExamService.__new__(AIExamService)
+    service._splitter = _TimedSplitter()
+    service._reazon = _RecordingReazon()
+    service._artifacts = StageArtifactStore(tmp_path)
+
+    service.generate(audio_bytes=b"full-audio", filename="sample.mp3")
+    pipeline_metrics = PipelineMetrics()
+    service.generate(audio_bytes=b"full-audio", filename="sample.mp3", pipeline_metrics=pipeline_metrics)
+
+    recorded = pipeline_metrics.to_dict()
+    assert {"asr", "structuring", "questions"} <= set(recorded["stages"])
+    assert recorded["counters"] == {"asr_artifact_hits": 2, "segments": 2, "questions": 2}
+    assert sum(batch["segments"] for batch in recorded["asr_batches"]) == 2
+    first_run = PipelineMetrics()
+    service._artifacts = StageArtifactStore(tmp_path / "fresh")
+    service.generate(audio_bytes=b"full-audio", filename="sample.mp3", pipeline_metrics=first_run)
+    assert first_run.to_dict()["stages"]["cutting"]["calls"] == 2
+
+
+def test_stage_memory_is_measured_per_stage_not_as_the_process_high_water_mark():
+    pipeline_metrics = PipelineMetrics()
+    with pipeline_metrics.stage("allocate"):
+        block = np.ones(64 * 1024 * 1024 // 8)
+    del block
+    with pipeline_metrics.stage("small"):
+        pass
+
+    stages = pipeline_metrics.to_dict()["stages"]
+    if stages["allocate"]["rss_delta_mb"] is None:  # no /proc/self/statm on this platform
+        return
+    assert stages["allocate"]["rss_delta_mb"] > 48
+    assert abs(stages["small"]["rss_delta_mb"]) < 16
+
+
+class _FakeStream:
+    def __init__(self):
+        self.samples = 0
+        self.result = None
+
+    def accept_waveform(self, sample_rate, waveform):
+        self.samples = len(waveform)
+
+
+class _FakeBatchRecognizer:
+    def __init__(self):
+        self.batches: list[int] = []
+
+    def create_stream(self):
+        return _FakeStream()
+
+    def decode_streams(self, streams):
+        self.batches.append(len(streams))
+        for stream in streams:
+            stream.result = type("Result", (), {"text": f"音{stream.samples}"})()
+
+
+def _tone_bursts(burst_ms: list[int], gap_ms: int = 800) -> PCMBuffer:
+    audio = AudioSegment.silent(duration=gap_ms)
+    for duration in burst_ms:
+        audio += Sine(300).to_audio_segment(duration=duration).apply_gain(-6)
+        audio += AudioSegment.silent(duration=gap_ms)
+    with tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
+        audio.export(tmp.name, format="wav")
+        return PCMBuffer.from_bytes(Path(tmp.name).read_bytes())
+
+
+def test_transcribe_many_batches_chunks_across_segments_and_maps_them_back():
+    transcriber = ReazonTranscriber(batch_size=2)
+    transcriber._model = _FakeBatchRecognizer()
+
+    first = _tone_bursts([1000, 2000])
+    second = _tone_bursts([1500])
+    results = transcriber.transcribe_many([(first, 0), (second, 60000)])
+
+    assert transcriber._model.batches == [2, 1]
+    assert len(results[0]["timestamped_raw_text"].splitlines()) == 2
+    assert results[1]["timestamped_raw_text"].startswith("01:00: 音")
+    first_lengths = [int(line.split("音")[1]) for line in results[0]["timestamped_raw_text"].splitlines()]
+    assert first_lengths[0] < first_lengths[1]
+
+
+class _FakeTimedRecognizer(_FakeBatchRecognizer):
+    """Emits one token per tone burst, timed like the real decoder (including the pad)."""
+
+    def create_stream(self):
+        stream = _FakeStream()
+        stream.accept_waveform = lambda sample_rate, waveform: setattr(stream, "waveform", waveform)
+        return stream
+
+    def decode_streams(self, streams):
+        self.batches.append(len(streams))
+        for stream in streams:
+            loud = np.abs(stream.waveform[: len(stream.waveform) // 160 * 160]).reshape(-1, 160).max(axis=1) > 0.1
+            onsets = np.flatnonzero(loud & ~np.concatenate(([False], loud[:-1])))
+            tokens = [f"音{index}" for index in range(len(onsets))]
+            stream.result = type(
+                "Result",
+                (),
+                {"text": "".join(tokens), "tokens": tokens, "timestamps": [onset / 100 + 0.2 for onset in onsets]},
+            )()
+
+
+def test_packed_chunks_use_one_asr_input_and_keep_chunk_timestamps():
+    transcriber = ReazonTranscriber(batch_size=2, pack_target_ms=10000)
+    transcriber._model = _FakeTimedRecognizer()
+
+    result = transcriber.transcribe(_tone_bursts([1000, 2000, 1500]), base_offset_ms=60000)
+
+    assert transcriber._model.batches == [1]
+    assert result["raw_text"] == "音0音1音2"
+    assert result["timestamped_raw_text"].splitlines() == ["01:00: 音0", "01:02: 音1", "01:05: 音2"]
+
+
+def test_segment_cache_skips_inference_for_identical_segment_audio(tmp_path):
+    cache = SegmentASRCache(StageArtifactStore(tmp_path))
+    transcriber = ReazonTranscriber(batch_size=2, segment_cache=cache)
+    transcriber._model = _FakeBatchRecognizer()
+    segment = _tone_bursts([1000, 2000])
+
+    first = transcriber.transcribe(segment, base_offset_ms=0)
+    again = ReazonTranscriber(batch_size=2, segment_cache=cache).transcribe(
+        PCMBuffer(samples=segment.samples.copy()),
+        base_offset_ms=60000,
+    )
+
+    assert transcriber._model.batches == [2]
+    assert again["raw_text"] == first["raw_text"]
+    assert again["timestamped_raw_text"].startswith("01:00: 音")
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+
+def test_artifact_garbage_collection_evicts_only_entries_unused_for_max_age(tmp_path):
+    store = StageArtifactStore(tmp_path)
+    cache = SegmentASRCache(store)
+    store.put("split", "aa11", {"boundaries": [1]})
+    store.put("split", "bb22", {"boundaries": [2]})
+    cache.put(_tone_bursts([1000]), {}, [{"text": "音0"}])
+    old = time.time() - 3600
+    for path in tmp_path.glob("*/*/*"):
+        os.utime(path, (old, old))
+
+    assert store.get("split", "aa11") == {"boundaries": [1]}
+    removed = store.collect_garbage(max_age_sec=600)
+
+    assert removed["artifacts"] == 2
+    assert store.get("split", "aa11") == {"boundaries": [1]}
+    assert store.get("split", "bb22") is None
+    assert cache.get(_tone_bursts([1000]), {}) is None
+    assert list((tmp_path / SegmentASRCache.STAGE).iterdir()) == []
+
+
 def test_build_raw_transcript_falls_back_to_segment_start_timestamp():
     split_segments = [
         SplitAudioChunk(
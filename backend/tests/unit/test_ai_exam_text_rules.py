@@ -0,0 +1,32 @@
+from app.modules.ai_exam.service import _extract_announced_mondai_number, _is_question_sentence, _question_type
+from app.modules.ai_exam.text_rules import QUESTION_NUMBER_RULES, KeywordClassifier
+
+
+def test_question_number_rules_keep_the_declared_priority():
+    assert QUESTION_NUMBER_RULES.match("十二番会社で") == 12
+    assert QUESTION_NUMBER_RULES.match("第十番") == 10
+    assert QUESTION_NUMBER_RULES.match("れいを見てください") == 0
+    assert QUESTION_NUMBER_RULES.match("会社で一番") is None
+
+
+def test_keyword_classifier_prefers_family_order_over_position():
+    classifier = KeywordClassifier([("high", ["ab"]), ("low", ["a", "xa"])])
+
+    assert classifier.classify("xab") == "high"
+    assert classifier.classify("xa") == "low"
+    assert classifier.classify("b") is None
+    assert _question_type("どうして男の人は何時に来ましたか") == "time"
+    assert _question_type("男の人はどうしますか") == "method"
+
+
+def test_announced_mondai_number_prefers_the_highest_number():
+    assert _extract_announced_mondai_number("もんだい 二 です。問題三") == 3
+    assert _extract_announced_mondai_number("問題はありません") is None
+
+
+def test_question_sentence_needs_a_question_ending_or_keyword():
+    assert _is_question_sentence("今日はいい天気です。") is False
+    assert _is_question_sentence("男の人は何を買います。") is True
+    assert _is_question_sentence("そうですか。") is True
+    assert _is_question_sentence("女：何を買いますか。") is False
+    assert _is_question_sentence("") is False
@@ -0,0 +1,48 @@
+import numpy as np
+from pydub import AudioSegment
+from pydub.silence import detect_nonsilent as pydub_detect_nonsilent
+
+from app.modules.ai_exam.pcm import PCMBuffer
+from app.modules.ai_exam.vad import detect_nonsilent, relative_silence_thresh, split_on_silence
+
+SAMPLE_RATE = 16000
+
+
+def _speech_and_pauses(seed: int, sample_rate: int = SAMPLE_RATE) -> PCMBuffer:
+    rng = np.random.default_rng(seed)
+    parts = []
+    for index in range(int(rng.integers(2, 9))):
+        length = int(rng.integers(80, 2500) * sample_rate / 1000) + int(rng.integers(0, 16))
+        if index % 2:
+            parts.append(0.3 * np.sin(np.arange(length) * 0.05) + rng.normal(0, 0.02, length))
+        else:
+            parts.append(rng.normal(0, 0.002, length))
+    return PCMBuffer(samples=np.concatenate(parts).astype(np.float32), sample_rate=sample_rate)
+
+
+def test_detect_nonsilent_matches_pydub_to_the_millisecond():
+    for seed in range(12):
+        sample_rate = (8000, 16000, 22050)[seed % 3]
+        audio = _speech_and_pauses(seed, sample_rate)
+        pcm = audio.to_int16()
+        segment = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=sample_rate, channels=1)
+        threshold = relative_silence_thresh(pcm)
+
+        assert abs(threshold - (segment.dBFS - 14)) < 1e-9
+        expected = pydub_detect_nonsilent(segment, min_silence_len=400, silence_thresh=threshold)
+        assert detect_nonsilent(pcm, sample_rate, 400, threshold).tolist() == expected
+
+
+def test_split_on_silence_returns_views_of_the_segment():
+    audio = _speech_and_pauses(3)
+    chunks = split_on_silence(audio, min_silence_len=400, keep_silence=150, min_chunk_ms=300)
+
+    assert chunks
+    assert all(np.shares_memory(chunk.samples, audio.samples) for _, chunk in chunks)
+    assert all(chunk.offset_ms == start_ms for start_ms, chunk in chunks)
+
+
+def test_split_on_silence_keeps_fully_silent_audio_as_one_chunk():
+    audio = PCMBuffer(samples=np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    assert [(start, chunk.duration_ms) for start, chunk in split_on_silence(audio, 400, 150)] == [(0, 1000)]
@@ -275,6 +275,7 @@ export interface AIJobStatus {
   job_id: string
   status: 'pending' | 'processing' | 'done' | 'failed'
   progress_message: string
+  partial_segments?: AISplitSegment[]
   result?: AIExamResult
   error?: string
 }